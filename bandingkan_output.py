@@ -0,0 +1,243 @@
+"""
+Uji banding output (golden output): jalankan implementasi acuan dan implementasi kandidat
+pada input yang sama, lalu bandingkan setiap sheet sel demi sel (angka dengan toleransi).
+Dipakai sebelum mengaktifkan versi REKAP/SUMMARY yang dioptimasi: urutan baris, mask item
+pertama, baris Total Penghasilan nol, sampai seri skor fuzzy semuanya ikut terbanding.
+
+Implementasi ditulis sebagai path file .py (salinan main.py) atau 'git:<revisi>' untuk
+main.py di revisi git tertentu (harus revisi yang main.py-nya sudah bisa di-import, yaitu
+UI di dalam `if __name__ == "__main__":`). Match cache tidak dipakai, jadi kandidat tidak
+bisa "meminjam" hasil matching acuan.
+
+Input berupa folder struktur rekap_batch.py; tanpa --input dibuat data sintetis (data_sintetis.py).
+
+Contoh:
+    python bandingkan_output.py --kandidat main_cepat.py
+    python bandingkan_output.py --acuan git:HEAD~1 --kandidat main.py --input data/minggu-03 --xlsx
+"""
+import argparse
+import importlib.util
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import traceback
+
+import numpy as np
+import pandas as pd
+import streamlit.logger
+from streamlit import config as st_config
+
+# Sama seperti rekap_batch.py: main.py di-import tanpa server Streamlit
+st_config.get_config_options()
+streamlit.logger.set_log_level('error')
+
+import data_sintetis
+import main
+import rekap_batch
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+RTOL = 1e-9
+ATOL = 1e-6 # Rupiah: selisih di bawah ini dianggap pembulatan floating point
+MAKS_CONTOH = 5 # Contoh sel berbeda per sheet di laporan
+
+def muat_implementasi(spek, folder_tmp, nama_modul):
+    """Import main.py dari path atau 'git:<revisi>' sebagai modul terpisah bernama nama_modul."""
+    if spek.startswith('git:'):
+        revisi = spek[len('git:'):]
+        isi = subprocess.run(['git', 'show', f'{revisi}:main.py'], cwd=APP_DIR, check=True, capture_output=True).stdout
+        path = os.path.join(folder_tmp, f'{nama_modul}.py')
+        with open(path, 'wb') as f:
+            f.write(isi)
+    else:
+        path = os.path.abspath(spek)
+    spec = importlib.util.spec_from_file_location(nama_modul, path)
+    modul = importlib.util.module_from_spec(spec)
+    sys.modules[nama_modul] = modul # Dibutuhkan pickle/fork worker jika implementasi memakainya
+    spec.loader.exec_module(modul)
+    return modul
+
+def jalankan_implementasi(modul, marketplace, toko, files, dengan_xlsx=False):
+    """Jalankan pipeline satu toko × marketplace dengan fungsi-fungsi milik modul. Return (sheets, xlsx bytes/None)."""
+    katalog_df = main.tanpa_match_cache(modul.get_katalog_harga_online())
+    harga_custom_tlj_df = modul.get_harga_custom_tlj()
+    if marketplace == "Shopee":
+        sheets, date_range_str = modul.jalankan_rekap_shopee(
+            files['order'], files['income'], files['iklan'], files['seller'], toko,
+            katalog_df, main.tanpa_match_cache(modul.get_katalog_dama()), harga_custom_tlj_df,
+            dama_index=modul.get_dama_index()
+        )
+    else:
+        sheets, date_range_str = modul.jalankan_rekap_tiktok(
+            files['income'], files['semua_pesanan'], files['creator_order'], files['product_data'], toko,
+            katalog_df, harga_custom_tlj_df
+        )
+    xlsx = None
+    if dengan_xlsx:
+        output = io.BytesIO()
+        modul.tulis_excel_rekap(sheets, toko, marketplace, date_range_str, output)
+        xlsx = output.getvalue()
+    return sheets, xlsx
+
+def mask_sel_beda(a, b, rtol=RTOL, atol=ATOL):
+    """
+    Bandingkan dua kolom (posisi baris sama). Sel yang dua-duanya angka dibandingkan dengan
+    toleransi, sisanya sebagai teks; NaN/None dianggap sama dengan NaN/None. Return mask bool (numpy).
+    """
+    a = a.reset_index(drop=True)
+    b = b.reset_index(drop=True)
+    angka_a = pd.to_numeric(a, errors='coerce').to_numpy(dtype=float)
+    angka_b = pd.to_numeric(b, errors='coerce').to_numpy(dtype=float)
+    kosong_a, kosong_b = a.isna().to_numpy(), b.isna().to_numpy()
+    dua_angka = ~np.isnan(angka_a) & ~np.isnan(angka_b)
+
+    sama = np.zeros(len(a), dtype=bool)
+    sama[dua_angka] = np.isclose(angka_a[dua_angka], angka_b[dua_angka], rtol=rtol, atol=atol)
+    sama |= kosong_a & kosong_b
+    sisa = ~dua_angka & ~(kosong_a | kosong_b)
+    if sisa.any():
+        sama[sisa] = a[sisa].astype(str).to_numpy() == b[sisa].astype(str).to_numpy()
+    return ~sama
+
+def bandingkan_sheet(acuan, kandidat, rtol=RTOL, atol=ATOL, maks_contoh=MAKS_CONTOH):
+    """
+    Ringkasan beda dua DataFrame: bentuk, kolom hilang/baru, jumlah sel beda per kolom,
+    beberapa contoh sel, dan apakah isinya sama jika urutan baris diabaikan.
+    """
+    hasil = {'bentuk': (acuan.shape, kandidat.shape), 'kolom_hilang': [], 'kolom_baru': [],
+             'sel_beda': {}, 'contoh': [], 'hanya_urutan': False}
+
+    if list(acuan.columns) == list(kandidat.columns):
+        pasangan = [(str(kol), i, i) for i, kol in enumerate(acuan.columns)] # Posisi: aman untuk nama kolom ganda
+    else:
+        kolom_kandidat = {kol: i for i, kol in reversed(list(enumerate(kandidat.columns)))}
+        kolom_acuan = set(acuan.columns)
+        hasil['kolom_hilang'] = [str(k) for k in acuan.columns if k not in kolom_kandidat]
+        hasil['kolom_baru'] = [str(k) for k in kandidat.columns if k not in kolom_acuan]
+        pasangan = [(str(kol), i, kolom_kandidat[kol]) for i, kol in enumerate(acuan.columns) if kol in kolom_kandidat]
+
+    n = min(len(acuan), len(kandidat))
+    for nama, i_acuan, i_kandidat in pasangan:
+        a, b = acuan.iloc[:n, i_acuan], kandidat.iloc[:n, i_kandidat]
+        beda = np.flatnonzero(mask_sel_beda(a, b, rtol, atol))
+        if len(beda):
+            hasil['sel_beda'][nama] = len(beda)
+            for baris in beda[:max(0, maks_contoh - len(hasil['contoh']))]:
+                nilai_a, nilai_b = (x.item() if isinstance(x, np.generic) else x for x in (a.iloc[baris], b.iloc[baris]))
+                hasil['contoh'].append((int(baris), nama, nilai_a, nilai_b))
+
+    if hasil['sel_beda'] and acuan.shape == kandidat.shape and not hasil['kolom_hilang']:
+        # Isi sama tapi urutan baris berubah (mis. sort / groupby berbeda)?
+        urut = lambda df: df.astype(str).sort_values(list(df.columns)).reset_index(drop=True)
+        acuan_str = acuan.set_axis(range(acuan.shape[1]), axis=1)
+        kandidat_str = kandidat.set_axis(range(kandidat.shape[1]), axis=1)
+        hasil['hanya_urutan'] = urut(acuan_str).equals(urut(kandidat_str))
+    return hasil
+
+def sheet_sama(ringkasan):
+    bentuk_acuan, bentuk_kandidat = ringkasan['bentuk']
+    return (bentuk_acuan == bentuk_kandidat and not ringkasan['sel_beda']
+            and not ringkasan['kolom_hilang'] and not ringkasan['kolom_baru'])
+
+def bandingkan_sheets(sheets_acuan, sheets_kandidat, rtol=RTOL, atol=ATOL):
+    """Return {nama sheet: ringkasan atau pesan teks untuk sheet yang hanya ada di satu sisi}."""
+    hasil = {}
+    for nama in list(dict.fromkeys(list(sheets_acuan) + list(sheets_kandidat))):
+        if nama not in sheets_kandidat:
+            hasil[nama] = "sheet tidak ada di kandidat"
+        elif nama not in sheets_acuan:
+            hasil[nama] = "sheet baru di kandidat"
+        else:
+            hasil[nama] = bandingkan_sheet(sheets_acuan[nama], sheets_kandidat[nama], rtol, atol)
+    return hasil
+
+def format_laporan(judul, hasil_sheet):
+    """Baris-baris laporan ringkas untuk satu kombinasi; sheet yang sama persis cukup dihitung."""
+    baris = []
+    jumlah_sama = 0
+    for nama, ringkasan in hasil_sheet.items():
+        if isinstance(ringkasan, str):
+            baris.append(f"    ❌ {nama}: {ringkasan}")
+            continue
+        if sheet_sama(ringkasan):
+            jumlah_sama += 1
+            continue
+        (baris_a, kolom_a), (baris_b, kolom_b) = ringkasan['bentuk']
+        keterangan = []
+        if (baris_a, kolom_a) != (baris_b, kolom_b):
+            keterangan.append(f"bentuk {baris_a}x{kolom_a} → {baris_b}x{kolom_b}")
+        if ringkasan['kolom_hilang']:
+            keterangan.append(f"kolom hilang: {', '.join(ringkasan['kolom_hilang'])}")
+        if ringkasan['kolom_baru']:
+            keterangan.append(f"kolom baru: {', '.join(ringkasan['kolom_baru'])}")
+        if ringkasan['sel_beda']:
+            total = sum(ringkasan['sel_beda'].values())
+            per_kolom = ', '.join(f"{k} ({v})" for k, v in list(ringkasan['sel_beda'].items())[:6])
+            keterangan.append(f"{total} sel beda di {per_kolom}")
+        if ringkasan['hanya_urutan']:
+            keterangan.append("isi sama, hanya urutan baris berbeda")
+        baris.append(f"    ❌ {nama}: " + '; '.join(keterangan))
+        for i, kolom, nilai_a, nilai_b in ringkasan['contoh']:
+            baris.append(f"         baris {i}, '{kolom}': {nilai_a!r} → {nilai_b!r}")
+    status = "✅" if not baris else "❌"
+    return [f"{status} {judul}: {jumlah_sama}/{len(hasil_sheet)} sheet identik"] + baris
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Bandingkan output pipeline acuan vs kandidat sel demi sel.")
+    parser.add_argument('--acuan', default=os.path.join(APP_DIR, 'main.py'), help="Implementasi acuan: path .py atau git:<revisi> (default: main.py)")
+    parser.add_argument('--kandidat', required=True, help="Implementasi kandidat: path .py atau git:<revisi>")
+    parser.add_argument('--input', help="Folder input struktur rekap_batch.py (default: data sintetis)")
+    parser.add_argument('--pesanan', type=int, default=2000, help="Jumlah pesanan data sintetis (default: 2000)")
+    parser.add_argument('--toko', nargs='+', help="Hanya toko ini (default: semua)")
+    parser.add_argument('--xlsx', action='store_true', help="Bandingkan juga isi file xlsx hasil export")
+    parser.add_argument('--rtol', type=float, default=RTOL)
+    parser.add_argument('--atol', type=float, default=ATOL)
+    args = parser.parse_args(argv)
+
+    input_folder = os.path.abspath(args.input) if args.input else None
+    with tempfile.TemporaryDirectory(prefix='banding_') as folder_tmp:
+        if input_folder is None:
+            input_folder = os.path.join(folder_tmp, 'input')
+            print(f"Membuat data sintetis {args.pesanan:,} pesanan per toko...")
+            data_sintetis.buat_dataset(input_folder, jumlah_pesanan=args.pesanan,
+                                       daftar_toko=args.toko or data_sintetis.TOKO_DEFAULT)
+        # Katalog dibaca relatif terhadap folder aplikasi, sama seperti saat streamlit run
+        os.chdir(APP_DIR)
+        acuan = muat_implementasi(args.acuan, folder_tmp, 'main_acuan')
+        kandidat = muat_implementasi(args.kandidat, folder_tmp, 'main_kandidat')
+
+        tugas, _ = rekap_batch.siapkan_tugas(input_folder)
+        tugas = [t for t in tugas if not args.toko or t[1] in args.toko]
+        if not tugas:
+            print("Tidak ada kombinasi toko × marketplace yang filenya lengkap.")
+            return 1
+
+        ada_beda = False
+        for marketplace, toko, files in tugas:
+            judul = f"{marketplace} - {toko}"
+            try:
+                sheets_acuan, xlsx_acuan = jalankan_implementasi(acuan, marketplace, toko, files, args.xlsx)
+            except Exception:
+                print(f"⚠️ {judul}: acuan gagal, dilewati\n{traceback.format_exc(limit=3)}")
+                continue
+            try:
+                sheets_kandidat, xlsx_kandidat = jalankan_implementasi(kandidat, marketplace, toko, files, args.xlsx)
+            except Exception:
+                ada_beda = True
+                print(f"❌ {judul}: kandidat error\n{traceback.format_exc(limit=3)}")
+                continue
+
+            laporan = format_laporan(judul, bandingkan_sheets(sheets_acuan, sheets_kandidat, args.rtol, args.atol))
+            if args.xlsx:
+                # Dibaca apa adanya (header=None) supaya judul, header & baris total ikut terbanding
+                baca = lambda isi: pd.read_excel(io.BytesIO(isi), sheet_name=None, header=None)
+                laporan += format_laporan(f"{judul} [xlsx]", bandingkan_sheets(baca(xlsx_acuan), baca(xlsx_kandidat), args.rtol, args.atol))
+            ada_beda |= any(b.startswith("❌") for b in laporan)
+            print('\n'.join(laporan))
+
+    print("\nHasil: " + ("❌ ada perbedaan output." if ada_beda else "✅ output kandidat identik dengan acuan."))
+    return 1 if ada_beda else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
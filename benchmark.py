@@ -0,0 +1,262 @@
+"""
+Benchmark fungsi-fungsi pipeline rekap (matching harga beli, REKAP, SUMMARY, export xlsx)
+dengan data sintetis (data_sintetis.py) pada beberapa ukuran tetap. Dipakai sebagai pagar
+pengaman setiap optimasi: hasil dibandingkan dengan baseline, regresi → exit code 1.
+
+Per fungsi & ukuran dicatat median dan p95 waktu (beberapa pengulangan) serta puncak memori
+(tracemalloc, satu run terpisah yang sekaligus jadi warm-up). Input disalin ulang tiap run
+karena sebagian fungsi mengubah DataFrame masukannya. Match cache SQLite tidak dipakai
+(katalog tanpa katalog_hash) supaya yang terukur selalu pencocokan penuh.
+
+Contoh:
+    python benchmark.py --ukuran 1000 10000 --baseline bench_baseline.json   # baseline belum ada → dibuat
+    python benchmark.py --ukuran 1000 10000 --baseline bench_baseline.json   # bandingkan, gagal jika regresi > 25%
+    python benchmark.py --hanya process_summary get_harga_beli_fuzzy --ulang 9
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit.logger
+from streamlit import config as st_config
+
+# Sama seperti rekap_batch.py: main.py di-import tanpa server Streamlit
+st_config.get_config_options()
+streamlit.logger.set_log_level('error')
+
+import data_sintetis
+import main
+
+HASIL_PATH = 'bench_hasil.json'
+AMBANG_REGRESI = 0.25 # Median lebih lambat > 25% dari baseline = regresi
+MIN_SELISIH_DETIK = 0.02 # Selisih di bawah ini dianggap noise (fungsi yang sangat cepat)
+TOKO_SHOPEE = ("Human Store", "Pacific Bookstore", "DAMA.ID STORE")
+TOKO_TIKTOK = "Human Store"
+
+def salin(nilai):
+    return nilai.copy(deep=True) if isinstance(nilai, pd.DataFrame) else nilai
+
+def siapkan_data(jumlah_pesanan, folder, seed=0):
+    """
+    Tulis export sintetis satu ukuran ke folder, baca lewat loader pipeline, lalu jalankan
+    tahap-tahap awal sekali untuk mendapat input tahap berikutnya (REKAP → SUMMARY → export).
+    """
+    katalog_judul = data_sintetis.muat_judul_katalog()
+    for nomor_toko, toko in enumerate(TOKO_SHOPEE):
+        data_sintetis.buat_satu(folder, toko, nomor_toko, "Shopee", jumlah_pesanan, 1.5, 0.03,
+                                seed, datetime(2026, 1, 19), katalog_judul)
+    data_sintetis.buat_satu(folder, TOKO_TIKTOK, 0, "TikTok", jumlah_pesanan, 1.5, 0.03,
+                            seed, datetime(2026, 1, 19), katalog_judul)
+
+    data = {
+        'katalog': main.tanpa_match_cache(main.get_katalog_harga_online()),
+        'katalog_dama': main.tanpa_match_cache(main.get_katalog_dama()),
+        'harga_custom_tlj': main.get_harga_custom_tlj(),
+        'dama_index': main.get_dama_index(),
+    }
+
+    for toko in TOKO_SHOPEE:
+        folder_toko = os.path.join(folder, toko, "Shopee")
+        order_df, income_df, iklan_df, seller_df, date_range_str = main.baca_file_shopee(
+            os.path.join(folder_toko, 'Order.all.xlsx'), os.path.join(folder_toko, 'Income.sudah dilepas.xlsx'),
+            os.path.join(folder_toko, 'iklan produk.csv'), os.path.join(folder_toko, 'seller conversion.csv')
+        )
+        main.bersihkan_angka_shopee(order_df, income_df, iklan_df, seller_df)
+        data[toko] = {'order': order_df, 'income': income_df, 'seller': seller_df,
+                      'iklan': main.process_iklan(iklan_df), 'date_range_str': date_range_str}
+
+    args_rekap = lambda toko: (salin(data[toko]['order']), salin(data[toko]['income']), salin(data[toko]['seller']))
+    data["Human Store"]['rekap'] = main.process_rekap(*args_rekap("Human Store"), "Human Store")
+    data["Pacific Bookstore"]['rekap'] = main.process_rekap_pacific(*args_rekap("Pacific Bookstore"))
+    data["DAMA.ID STORE"]['rekap'] = main.process_rekap_dama(*args_rekap("DAMA.ID STORE"))
+
+    # Nama produk yang dicocokkan ke katalog, persis seperti yang sampai ke fungsi matching
+    data['nama_online'] = data["Human Store"]['rekap']['Nama Produk'].dropna().unique().tolist()
+    summary_dama = main.process_summary_dama(
+        salin(data["DAMA.ID STORE"]['rekap']), data["DAMA.ID STORE"]['iklan'], data['katalog_dama'],
+        data['harga_custom_tlj'], dama_index=data['dama_index']
+    )
+    kolom_nama = summary_dama.columns[1]
+    data['nama_dama'] = [n for n in summary_dama[kolom_nama].dropna().unique().tolist() if isinstance(n, str) and n.strip()]
+
+    folder_tiktok = os.path.join(folder, TOKO_TIKTOK, "TikTok")
+    order_details_df, reports_df, product_data_df, semua_pesanan_df, creator_order_df, _ = main.baca_file_tiktok(
+        os.path.join(folder_tiktok, 'Income.xlsx'), os.path.join(folder_tiktok, 'semua pesanan.xlsx'),
+        os.path.join(folder_tiktok, 'creator order-all.xlsx'), [os.path.join(folder_tiktok, 'Product Data.xlsx')],
+        TOKO_TIKTOK
+    )
+    data['tiktok'] = {'order_details': order_details_df, 'semua_pesanan': semua_pesanan_df,
+                      'creator_order': creator_order_df, 'product_data': product_data_df}
+    data['tiktok']['rekap'] = main.process_rekap_tiktok(
+        salin(order_details_df), salin(semua_pesanan_df), salin(creator_order_df), TOKO_TIKTOK
+    )
+
+    human = data["Human Store"]
+    summary_human = main.process_summary(salin(human['rekap']), human['iklan'], data['katalog'],
+                                         data['harga_custom_tlj'], store_type="Human Store")
+    data['sheets_export'] = {
+        'SUMMARY': summary_human, 'REKAP': human['rekap'], 'IKLAN': human['iklan'],
+        'sheet order-all': human['order'], 'sheet income dilepas': human['income'],
+        'sheet seller conversion': human['seller'],
+    }
+    return data
+
+def daftar_kasus(data):
+    """
+    (nama, fungsi, buat_args, baris_input). buat_args() menghasilkan argumen baru (salinan)
+    untuk tiap run, di luar waktu yang diukur.
+    """
+    katalog, katalog_dama, harga_custom_tlj = data['katalog'], data['katalog_dama'], data['harga_custom_tlj']
+    human, pacific, dama, tiktok = data["Human Store"], data["Pacific Bookstore"], data["DAMA.ID STORE"], data['tiktok']
+
+    def per_nama(fungsi, daftar_nama, katalog_df):
+        return [fungsi(nama, katalog_df) for nama in daftar_nama]
+
+    def export_xlsx(sheets):
+        main.tulis_excel_rekap(sheets, "Human Store", "Shopee", human['date_range_str'], io.BytesIO())
+
+    return [
+        ('get_harga_beli_fuzzy', per_nama, lambda: (main.get_harga_beli_fuzzy, data['nama_online'], katalog),
+         len(data['nama_online'])),
+        ('get_harga_beli_fuzzy_batch', main.get_harga_beli_fuzzy_batch, lambda: (data['nama_online'], katalog),
+         len(data['nama_online'])),
+        ('get_harga_beli_dama', per_nama, lambda: (main.get_harga_beli_dama, data['nama_dama'], katalog_dama),
+         len(data['nama_dama'])),
+        ('get_harga_beli_dama_batch', main.get_harga_beli_dama_batch,
+         lambda: (data['nama_dama'], katalog_dama, data['dama_index']), len(data['nama_dama'])),
+        ('process_rekap', main.process_rekap,
+         lambda: (salin(human['order']), salin(human['income']), salin(human['seller']), "Human Store"), len(human['order'])),
+        ('process_rekap_pacific', main.process_rekap_pacific,
+         lambda: (salin(pacific['order']), salin(pacific['income']), salin(pacific['seller'])), len(pacific['order'])),
+        ('process_rekap_dama', main.process_rekap_dama,
+         lambda: (salin(dama['order']), salin(dama['income']), salin(dama['seller'])), len(dama['order'])),
+        ('process_summary', main.process_summary,
+         lambda: (salin(human['rekap']), human['iklan'], katalog, harga_custom_tlj, "Human Store"), len(human['rekap'])),
+        ('process_summary_dama', main.process_summary_dama,
+         lambda: (salin(dama['rekap']), dama['iklan'], katalog_dama, harga_custom_tlj, None, data['dama_index']),
+         len(dama['rekap'])),
+        ('process_rekap_tiktok', main.process_rekap_tiktok,
+         lambda: (salin(tiktok['order_details']), salin(tiktok['semua_pesanan']), salin(tiktok['creator_order']), TOKO_TIKTOK),
+         len(tiktok['semua_pesanan'])),
+        ('process_summary_tiktok', main.process_summary_tiktok,
+         lambda: (salin(tiktok['rekap']), katalog, harga_custom_tlj, pd.DataFrame(), salin(tiktok['product_data']), TOKO_TIKTOK),
+         len(tiktok['rekap'])),
+        ('tulis_excel_rekap', export_xlsx, lambda: (data['sheets_export'],),
+         main.jumlah_baris(*data['sheets_export'].values())),
+    ]
+
+def ukur(fungsi, buat_args, ulang):
+    """Satu run tracemalloc (puncak memori + warm-up), lalu `ulang` run berwaktu. Return dict statistik."""
+    args = buat_args()
+    tracemalloc.start()
+    try:
+        fungsi(*args)
+        _, puncak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durasi = []
+    for _ in range(ulang):
+        args = buat_args()
+        mulai = time.perf_counter()
+        fungsi(*args)
+        durasi.append(time.perf_counter() - mulai)
+    return {
+        'median_detik': round(float(np.median(durasi)), 4),
+        'p95_detik': round(float(np.percentile(durasi, 95)), 4),
+        'peak_mb': round(puncak / (1024 * 1024), 1),
+        'ulang': ulang,
+    }
+
+def jalankan_benchmark(daftar_ukuran, ulang=5, seed=0, hanya=None, cetak=print):
+    """Return dict hasil {'<fungsi>@<pesanan>': {...}} untuk semua ukuran."""
+    hasil = {}
+    for jumlah_pesanan in daftar_ukuran:
+        with tempfile.TemporaryDirectory(prefix='bench_rekap_') as folder:
+            cetak(f"Menyiapkan data sintetis {jumlah_pesanan:,} pesanan...")
+            data = siapkan_data(jumlah_pesanan, folder, seed=seed)
+            for nama, fungsi, buat_args, baris_input in daftar_kasus(data):
+                if hanya and nama not in hanya:
+                    continue
+                statistik = ukur(fungsi, buat_args, ulang)
+                hasil[f"{nama}@{jumlah_pesanan}"] = {'fungsi': nama, 'pesanan': jumlah_pesanan,
+                                                      'baris_input': baris_input, **statistik}
+                cetak(f"  {nama:<28} median {statistik['median_detik']:>8.3f} dtk  p95 {statistik['p95_detik']:>8.3f} dtk  "
+                      f"peak {statistik['peak_mb']:>7.1f} MB  ({baris_input:,} baris)")
+    return hasil
+
+def simpan_hasil(hasil, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'waktu': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'mesin': f"{platform.machine()} ({os.cpu_count()} core)",
+            'hasil': hasil,
+        }, f, ensure_ascii=False, indent=2)
+
+def bandingkan(hasil, baseline, ambang=AMBANG_REGRESI, min_selisih=MIN_SELISIH_DETIK):
+    """
+    Bandingkan median terhadap baseline. Return list regresi (kunci, median baseline, median sekarang, rasio).
+    Kunci yang tidak ada di baseline dilewati (fungsi/ukuran baru).
+    """
+    regresi = []
+    for kunci, sekarang in hasil.items():
+        dasar = baseline.get(kunci)
+        if not dasar:
+            continue
+        lama, baru = dasar['median_detik'], sekarang['median_detik']
+        rasio = baru / lama if lama > 0 else float('inf')
+        if rasio > 1 + ambang and baru - lama > min_selisih:
+            regresi.append((kunci, lama, baru, rasio))
+    return regresi
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fungsi pipeline rekap dengan data sintetis.")
+    parser.add_argument('--ukuran', type=int, nargs='+', default=[1000, 10000], help="Jumlah pesanan per dataset (default: 1000 10000)")
+    parser.add_argument('--ulang', type=int, default=5, help="Run berwaktu per fungsi (default: 5)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--hanya', nargs='+', help="Hanya fungsi ini (nama fungsi, mis. process_summary)")
+    parser.add_argument('--output', default=HASIL_PATH, help=f"File JSON hasil (default: {HASIL_PATH})")
+    parser.add_argument('--baseline', help="File JSON baseline; jika belum ada, hasil run ini disimpan sebagai baseline")
+    parser.add_argument('--ambang', type=float, default=AMBANG_REGRESI, help="Toleransi perlambatan median (default: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    # Katalog & file pendukung dibaca relatif terhadap folder aplikasi
+    os.chdir(os.path.dirname(os.path.abspath(main.__file__)))
+
+    hasil = jalankan_benchmark(args.ukuran, ulang=args.ulang, seed=args.seed, hanya=args.hanya)
+    simpan_hasil(hasil, output)
+    print(f"\nHasil disimpan ke {output}")
+
+    if not baseline_path:
+        return 0
+    if not os.path.exists(baseline_path):
+        simpan_hasil(hasil, baseline_path)
+        print(f"Baseline belum ada, hasil run ini disimpan sebagai baseline: {baseline_path}")
+        return 0
+
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['hasil']
+    regresi = bandingkan(hasil, baseline, ambang=args.ambang)
+    if not regresi:
+        print(f"✅ Tidak ada regresi > {args.ambang:.0%} dibanding baseline.")
+        return 0
+    print(f"❌ {len(regresi)} regresi > {args.ambang:.0%} dibanding baseline:")
+    for kunci, lama, baru, rasio in regresi:
+        print(f"  - {kunci}: {lama:.3f} → {baru:.3f} dtk ({rasio:.2f}x)")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
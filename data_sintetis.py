@@ -0,0 +1,369 @@
+"""
+Generator file export Shopee/TikTok sintetis untuk uji skala (10 ribu, 100 ribu, 1 juta baris)
+tanpa menunggu data mega-sale asli. Judul produk diambil dari katalog HARGA ONLINE.xlsx supaya
+pencocokan harga beli ikut teruji. Dengan seed yang sama hasilnya selalu identik.
+Satu sheet xlsx maksimal 1.048.576 baris: untuk ~1 juta baris item, pakai ~650 ribu pesanan
+dengan rata-rata 1,5 produk per pesanan.
+
+Output mengikuti struktur folder rekap_batch.py:
+    <folder>/<Nama Toko>/Shopee/   Order.all.xlsx, Income.sudah dilepas.xlsx, iklan produk.csv, seller conversion.csv
+    <folder>/<Nama Toko>/TikTok/   Income.xlsx, semua pesanan.xlsx, creator order-all.xlsx, Product Data.xlsx
+
+Contoh:
+    python data_sintetis.py data_uji --pesanan 100000 --produk-per-pesanan 1.6 --retur 0.03
+    python data_sintetis.py data_uji_1jt --pesanan 650000 --toko "Human Store" --marketplace Shopee
+    python rekap_batch.py data_uji --output hasil_uji
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+KATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'HARGA ONLINE.xlsx')
+TOKO_DEFAULT = ("Human Store", "Pacific Bookstore", "DAMA.ID STORE", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu")
+MAKS_BARIS_EXCEL = 1_048_576 - 2 # Batas baris sheet xlsx, dikurangi header (+ baris deskripsi TikTok)
+
+def muat_judul_katalog(path=KATALOG_PATH):
+    """Judul, jenis kertas, kode ukuran (A5/A6/B5...) dan harga katalog dari HARGA ONLINE.xlsx."""
+    katalog = pd.read_excel(path)
+    katalog.columns = [str(c).strip() for c in katalog.columns]
+    katalog = katalog.dropna(subset=["JUDUL AL QUR'AN"])
+    return pd.DataFrame({
+        'judul': katalog["JUDUL AL QUR'AN"].astype(str).str.strip(),
+        'kertas': katalog['JENIS KERTAS'].fillna('').astype(str).str.strip(),
+        'ukuran': katalog['UKURAN'].fillna('').astype(str).str.split().str[0].fillna(''),
+        'harga': pd.to_numeric(katalog['KATALOG HARGA'], errors='coerce').fillna(15000),
+    }).reset_index(drop=True)
+
+def format_ribuan(angka):
+    """Angka → teks format Indonesia tanpa desimal ('25.000'), seperti kolom harga export Shopee."""
+    return pd.Series(np.round(angka).astype(np.int64)).map('{:,}'.format).str.replace(',', '.', regex=False)
+
+def buat_item_pesanan(jumlah_pesanan, produk_per_pesanan, katalog, rng, tanggal_mulai):
+    """
+    Baris item (satu produk dalam satu pesanan) untuk semua pesanan, dipakai bersama Shopee & TikTok.
+    Jumlah produk per pesanan ~ 1 + Poisson(produk_per_pesanan - 1).
+    """
+    jumlah_item = 1 + rng.poisson(max(produk_per_pesanan - 1, 0), jumlah_pesanan)
+    pesanan = np.repeat(np.arange(jumlah_pesanan), jumlah_item)
+    if len(pesanan) > MAKS_BARIS_EXCEL:
+        raise ValueError(f"{len(pesanan):,} baris item melebihi batas satu sheet Excel; kurangi jumlah pesanan.")
+
+    produk = rng.integers(0, len(katalog), len(pesanan))
+    pilih = katalog.iloc[produk].reset_index(drop=True)
+    # Harga jual per produk katalog = harga katalog + margin 30-60%, dibulatkan ke ratusan
+    harga_jual = np.round(katalog['harga'].to_numpy() * rng.uniform(1.3, 1.6, len(katalog)), -2)
+    harga = harga_jual[produk]
+    detik_pesanan = rng.integers(0, 7 * 24 * 3600, jumlah_pesanan)
+    return pd.DataFrame({
+        'pesanan': pesanan,
+        'nama_produk': "Al Quran " + pilih['judul'] + " " + pilih['ukuran'] + " | Wakaf Hadiah Hampers",
+        'variasi': (pilih['ukuran'] + "," + pilih['kertas']).str.strip(','),
+        'kode_ukuran': pilih['ukuran'],
+        'jumlah': 1 + rng.poisson(0.5, len(pesanan)),
+        'harga': harga,
+        'waktu': pd.Timestamp(tanggal_mulai) + pd.to_timedelta(detik_pesanan[pesanan], unit='s'),
+    })
+
+def tandai_retur(items, jumlah_pesanan, rasio_retur, rng):
+    """
+    Pilih pesanan retur. Pesanan multi-produk diretur sebagian (item pertama saja) separuh kemungkinan.
+    Return (pesanan_retur bool per pesanan, item_retur bool per item).
+    """
+    pesanan_retur = rng.random(jumlah_pesanan) < rasio_retur
+    parsial = pesanan_retur & (rng.random(jumlah_pesanan) < 0.5)
+    item_pertama = ~items['pesanan'].duplicated().to_numpy()
+    multi_item = np.bincount(items['pesanan'], minlength=jumlah_pesanan) > 1
+    p = items['pesanan'].to_numpy()
+    item_retur = pesanan_retur[p] & (~(parsial & multi_item)[p] | item_pertama)
+    return pesanan_retur, item_retur
+
+def buat_export_shopee(items, jumlah_pesanan, rasio_retur, rng, tanggal_mulai):
+    """DataFrame order-all, Penghasilan, Seller Fee, iklan & seller conversion Shopee."""
+    # No. Pesanan Shopee: yymmdd + 8 karakter alfanumerik. Indeks dikali bilangan prima (mod 36^8) → acak tapi unik
+    kode = (np.arange(jumlah_pesanan, dtype=np.int64) * 1_000_003 + 36 ** 6) % 36 ** 8
+    no_pesanan = np.array([f"{tanggal_mulai:%y%m%d}{np.base_repr(k, 36):0>8}" for k in kode])
+    pesanan_retur, item_retur = tandai_retur(items, jumlah_pesanan, rasio_retur, rng)
+    p = items['pesanan'].to_numpy()
+    subtotal = items['harga'].to_numpy() * items['jumlah'].to_numpy()
+
+    order_all = pd.DataFrame({
+        'No. Pesanan': no_pesanan[p],
+        'Status Pesanan': np.where(item_retur, 'Batal', 'Selesai'),
+        'Status Pembatalan/ Pengembalian': np.where(item_retur, 'Permintaan Disetujui', ''),
+        'Waktu Pesanan Dibuat': items['waktu'].dt.strftime('%Y-%m-%d %H:%M'),
+        'Nama Produk': items['nama_produk'],
+        'Nama Variasi': items['variasi'],
+        'Harga Awal': format_ribuan(items['harga'] * 1.1),
+        'Harga Setelah Diskon': format_ribuan(items['harga']),
+        'Jumlah': items['jumlah'],
+        'Subtotal Pesanan': format_ribuan(subtotal),
+    })
+
+    subtotal_pesanan = np.bincount(p, weights=subtotal, minlength=jumlah_pesanan)
+    subtotal_tidak_retur = np.bincount(p, weights=subtotal * ~item_retur, minlength=jumlah_pesanan)
+    voucher = np.where(rng.random(jumlah_pesanan) < 0.2, -np.round(subtotal_pesanan * 0.05, -2), 0)
+    waktu_pesanan = items.groupby('pesanan')['waktu'].first().to_numpy()
+    ongkir_retur = -rng.integers(8, 16, jumlah_pesanan) * 1000
+    dibayar = np.where(
+        pesanan_retur,
+        np.where(subtotal_tidak_retur > 0, subtotal_tidak_retur * 0.85, ongkir_retur), # retur penuh = minus ongkir
+        (subtotal_pesanan + voucher) * 0.85
+    )
+    penghasilan = pd.DataFrame({
+        'No.': np.arange(1, jumlah_pesanan + 1),
+        'Lihat berdasarkan': 'Order',
+        'No. Pesanan': no_pesanan,
+        'No. Pengajuan': np.where(pesanan_retur, [f"RR{i:010d}" for i in range(jumlah_pesanan)], ''),
+        'Username (Pembeli)': [f"pembeli{i % 5000}" for i in range(jumlah_pesanan)],
+        'Waktu Pesanan Dibuat': pd.DatetimeIndex(waktu_pesanan).strftime('%Y-%m-%d'),
+        'Tanggal Dana Dilepaskan': (pd.DatetimeIndex(waktu_pesanan) + timedelta(days=3)).strftime('%Y-%m-%d'),
+        'Metode pembayaran pembeli': rng.choice(['COD', 'ShopeePay', 'Transfer Bank', 'SPayLater'], jumlah_pesanan),
+        'Harga Asli Produk': subtotal_pesanan,
+        'Jumlah Dibayar Pembeli': np.round(dibayar),
+        'Penyesuaian Penjual - 1': voucher,
+        'Penyesuaian Penjual - 2': 0,
+        'Promo Gratis Ongkir dari Penjual': np.where(rng.random(jumlah_pesanan) < 0.1, -5000, 0),
+        'Biaya Administrasi': -np.round(subtotal_pesanan * 0.09),
+        'Biaya Proses Pesanan': -1250,
+    })
+    # Sebagian kecil baris penyesuaian (bukan 'Order'), harus tersaring oleh pipeline
+    penyesuaian = penghasilan.sample(frac=0.005, random_state=int(rng.integers(1 << 31))).assign(
+        **{'Lihat berdasarkan': 'Adjustment', 'Jumlah Dibayar Pembeli': -2500}
+    )
+    penghasilan = pd.concat([penghasilan, penyesuaian], ignore_index=True)
+
+    seller_fee = pd.DataFrame({
+        'No. Pesanan': no_pesanan,
+        'Biaya Layanan': -np.round(subtotal_pesanan * 0.045),
+    })
+
+    # Iklan: sebagian produk yang terjual, nama iklan kadang diberi akhiran '[n]' seperti export asli
+    nama_iklan = pd.Series(items['nama_produk'].unique())
+    nama_iklan = nama_iklan.sample(frac=0.4, random_state=int(rng.integers(1 << 31))).reset_index(drop=True)
+    akhiran = np.where(rng.random(len(nama_iklan)) < 0.3, [f" [{i}]" for i in range(len(nama_iklan))], '')
+    klik = rng.integers(10, 500, len(nama_iklan))
+    iklan = pd.DataFrame({
+        'Urutan': np.arange(1, len(nama_iklan) + 1),
+        'Nama Iklan': nama_iklan + akhiran,
+        'Status': 'Berjalan',
+        'Dilihat': klik * rng.integers(10, 40, len(nama_iklan)),
+        'Jumlah Klik': klik,
+        'Produk Terjual': rng.integers(0, 50, len(nama_iklan)),
+        'Omzet Penjualan': format_ribuan(klik * rng.integers(500, 3000, len(nama_iklan))),
+        'Biaya': format_ribuan(klik * rng.integers(100, 600, len(nama_iklan))),
+    })
+
+    # Seller conversion (komisi AMS): ~10% pesanan
+    dari_ams = rng.random(jumlah_pesanan) < 0.1
+    seller_conversion = pd.DataFrame({
+        'Kode Pesanan': no_pesanan[dari_ams],
+        'Pengeluaran(Rp)': format_ribuan(subtotal_pesanan[dari_ams] * 0.05),
+    })
+    return {
+        'order_all': order_all, 'penghasilan': penghasilan, 'seller_fee': seller_fee,
+        'iklan': iklan, 'seller_conversion': seller_conversion,
+    }
+
+def buat_export_tiktok(items, jumlah_pesanan, rasio_retur, rng):
+    """DataFrame Order details, semua pesanan, creator order-all & Product Data TikTok."""
+    order_id = np.array([str(576000000000000000 + i * 7919) for i in range(jumlah_pesanan)])
+    pesanan_retur, item_retur = tandai_retur(items, jumlah_pesanan, rasio_retur, rng)
+    p = items['pesanan'].to_numpy()
+    jumlah = items['jumlah'].to_numpy()
+    harga_asli = items['harga'].to_numpy()
+    diskon = np.where(rng.random(len(items)) < 0.3, np.round(harga_asli * 0.1, -2), 0) * jumlah
+    subtotal = harga_asli * jumlah
+    sku_id = 1729000000000000000 + pd.factorize(items['nama_produk'] + '|' + items['variasi'])[0]
+
+    jenis_batal = np.where(rng.random(jumlah_pesanan) < 0.5, 'Cancel', 'Return/Refund')
+    semua_pesanan = pd.DataFrame({
+        'Order ID': order_id[p],
+        'Order Status': np.where(pesanan_retur[p], 'Canceled', 'Completed'),
+        'Cancellation/Return Type': np.where(pesanan_retur[p], jenis_batal[p], ''),
+        'SKU ID': sku_id.astype(str),
+        'Product Name': items['nama_produk'],
+        'Variation': items['variasi'],
+        'Quantity': jumlah,
+        'SKU Unit Original Price': harga_asli,
+        'SKU Subtotal Before Discount': subtotal,
+        'SKU Seller Discount': diskon,
+        'SKU Subtotal After Discount': subtotal - diskon,
+        'Order Source': rng.choice(['Product detail page', 'LIVE', 'Video', 'Affiliate'], len(items)),
+        'Created Time': items['waktu'].dt.strftime('%d/%m/%Y %H:%M:%S'),
+    })
+
+    pendapatan = np.bincount(p, weights=subtotal - diskon, minlength=jumlah_pesanan)
+    waktu_pesanan = pd.DatetimeIndex(items.groupby('pesanan')['waktu'].first().to_numpy())
+    komisi_platform = -np.round(pendapatan * 0.08)
+    komisi_dinamis = -np.round(pendapatan * 0.05)
+    ongkir = -rng.integers(0, 5, jumlah_pesanan) * 1000
+    settlement = pendapatan + komisi_platform + komisi_dinamis + ongkir - 1250
+    order_details = pd.DataFrame({
+        'Order/adjustment ID': order_id,
+        'Type': 'Order',
+        'Order created time(UTC)': waktu_pesanan.strftime('%Y/%m/%d'),
+        'Order settled time(UTC)': (waktu_pesanan + timedelta(days=5)).strftime('%Y/%m/%d'),
+        'Currency': 'IDR',
+        'Total settlement amount': np.where(pesanan_retur, 0, settlement), # Pesanan batal/retur: settlement 0
+        'Total revenue': pendapatan,
+        'Platform commission fee': komisi_platform,
+        'Dynamic commission': komisi_dinamis,
+        'Pre-order service fee': 0,
+        'Affiliate Shop Ads commission': np.where(rng.random(jumlah_pesanan) < 0.05, -1500, 0),
+        'Shipping cost': ongkir,
+    })
+
+    # Creator order (format lama dengan kolom SKU): ~15% item lewat affiliate
+    dari_affiliate = rng.random(len(items)) < 0.15
+    creator_order = pd.DataFrame({
+        'ID Pesanan': order_id[p][dari_affiliate],
+        'Produk': items['nama_produk'][dari_affiliate],
+        'SKU': items['kode_ukuran'][dari_affiliate],
+        'Pembayaran Komisi Aktual': np.round((subtotal - diskon)[dari_affiliate] * 0.1),
+        'Perkiraan pembayaran komisi standar': np.round((subtotal - diskon)[dari_affiliate] * 0.1),
+    })
+
+    per_produk = semua_pesanan.groupby('Product Name', sort=False).agg(
+        pesanan=('Order ID', 'nunique'), pendapatan=('SKU Subtotal After Discount', 'sum')
+    ).reset_index()
+    biaya_iklan = np.round(per_produk['pendapatan'].to_numpy() * rng.uniform(0, 0.15, len(per_produk)), -2)
+    product_data = pd.DataFrame({
+        'ID Produk': (1730000000000000000 + np.arange(len(per_produk))).astype(str),
+        'Nama Produk': per_produk['Product Name'],
+        'Pesanan SKU': per_produk['pesanan'],
+        'Pendapatan kotor': per_produk['pendapatan'],
+        'Biaya': biaya_iklan,
+        'Biaya per pesanan': np.round(biaya_iklan / per_produk['pesanan'].clip(lower=1)),
+    })
+    return {
+        'order_details': order_details, 'semua_pesanan': semua_pesanan,
+        'creator_order': creator_order, 'product_data': product_data,
+    }
+
+def tulis_sheet(workbook, nama_sheet, df, startrow=0, baris_deskripsi=None):
+    """
+    Tulis DataFrame baris demi baris (header di startrow). Workbook dibuka dengan constant_memory,
+    jadi urutan tulis harus per baris; pandas.to_excel menulis per kolom sehingga tidak bisa dipakai.
+    """
+    worksheet = workbook.add_worksheet(nama_sheet)
+    worksheet.write_row(startrow, 0, [str(c) for c in df.columns])
+    baris = startrow + 1
+    if baris_deskripsi is not None:
+        worksheet.write_row(baris, 0, baris_deskripsi)
+        baris += 1
+    nilai = df.astype(object).where(df.notna(), None)
+    for i, isi in enumerate(nilai.itertuples(index=False, name=None), start=baris):
+        worksheet.write_row(i, 0, isi)
+    return worksheet
+
+def buka_workbook(path):
+    # constant_memory: xlsxwriter menulis per baris ke disk, file 1 juta baris tidak ditahan di RAM
+    return xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_numbers': False})
+
+def tulis_export_shopee(data, folder, tanggal_mulai):
+    os.makedirs(folder, exist_ok=True)
+    with buka_workbook(os.path.join(folder, 'Order.all.xlsx')) as workbook:
+        tulis_sheet(workbook, 'orders', data['order_all'])
+
+    tanggal_akhir = tanggal_mulai + timedelta(days=6)
+    with buka_workbook(os.path.join(folder, 'Income.sudah dilepas.xlsx')) as workbook:
+        # Periode di Summary B7 (awal) & B8 (akhir)
+        summary = workbook.add_worksheet('Summary')
+        summary.write('B1', 'Laporan Penghasilan')
+        summary.write('B5', 'Periode')
+        summary.write('B7', tanggal_mulai.strftime('%Y-%m-%d'))
+        summary.write('B8', tanggal_akhir.strftime('%Y-%m-%d'))
+        tulis_sheet(workbook, 'Penghasilan', data['penghasilan'], startrow=2)
+        tulis_sheet(workbook, 'Seller Fee', data['seller_fee'], startrow=2)
+
+    # CSV iklan: 7 baris keterangan sebelum header, sama seperti export Shopee Ads
+    with open(os.path.join(folder, 'iklan produk.csv'), 'w', encoding='utf-8', newline='') as f:
+        f.write("Laporan Iklan Produk\nNama Toko,Sintetis\n\n"
+                f"Periode,{tanggal_mulai:%d/%m/%Y} - {tanggal_akhir:%d/%m/%Y}\n\nDibuat oleh data_sintetis.py\n\n")
+        data['iklan'].to_csv(f, index=False)
+    data['seller_conversion'].to_csv(os.path.join(folder, 'seller conversion.csv'), index=False)
+
+def tulis_export_tiktok(data, folder, tanggal_mulai):
+    os.makedirs(folder, exist_ok=True)
+    tanggal_akhir = tanggal_mulai + timedelta(days=6)
+    with buka_workbook(os.path.join(folder, 'Income.xlsx')) as workbook:
+        tulis_sheet(workbook, 'Order details', data['order_details'])
+        # Periode di Reports F2, format '2026/01/19-2026/01/25'
+        tulis_sheet(workbook, 'Reports', pd.DataFrame({
+            'Report': ['Income'], 'Shop': ['Sintetis'], 'Currency': ['IDR'],
+            'Total settlement': [data['order_details']['Total settlement amount'].sum()],
+            'Orders': [len(data['order_details'])],
+            'Period': [f"{tanggal_mulai:%Y/%m/%d}-{tanggal_akhir:%Y/%m/%d}"],
+        }))
+
+    # Semua pesanan: baris deskripsi tepat di bawah header, seperti export TikTok
+    semua_pesanan = data['semua_pesanan']
+    deskripsi = ['Platform unique order ID.'] + ['Keterangan kolom'] * (semua_pesanan.shape[1] - 1)
+    with buka_workbook(os.path.join(folder, 'semua pesanan.xlsx')) as workbook:
+        tulis_sheet(workbook, 'OrderSKUList', semua_pesanan, baris_deskripsi=deskripsi)
+
+    with buka_workbook(os.path.join(folder, 'creator order-all.xlsx')) as workbook:
+        tulis_sheet(workbook, 'Sheet1', data['creator_order'])
+    with buka_workbook(os.path.join(folder, 'Product Data.xlsx')) as workbook:
+        tulis_sheet(workbook, 'Sheet1', data['product_data'])
+
+def buat_satu(folder, toko, nomor_toko, nama_marketplace, jumlah_pesanan, produk_per_pesanan, rasio_retur,
+              seed, tanggal_mulai, katalog):
+    """Buat & tulis export satu toko × marketplace. Return folder yang ditulis."""
+    # Seed berbeda per toko & marketplace, tetap bisa diulang persis
+    rng = np.random.default_rng([seed, nomor_toko, 0 if nama_marketplace == "Shopee" else 1])
+    items = buat_item_pesanan(jumlah_pesanan, produk_per_pesanan, katalog, rng, tanggal_mulai)
+    folder_toko = os.path.join(folder, toko, nama_marketplace)
+    if nama_marketplace == "Shopee":
+        data = buat_export_shopee(items, jumlah_pesanan, rasio_retur, rng, tanggal_mulai)
+        tulis_export_shopee(data, folder_toko, tanggal_mulai)
+    else:
+        data = buat_export_tiktok(items, jumlah_pesanan, rasio_retur, rng)
+        tulis_export_tiktok(data, folder_toko, tanggal_mulai)
+    return folder_toko
+
+def buat_dataset(folder, jumlah_pesanan=10_000, produk_per_pesanan=1.5, rasio_retur=0.03, seed=0,
+                 daftar_toko=TOKO_DEFAULT, marketplace=("Shopee", "TikTok"), tanggal_mulai=datetime(2026, 1, 19),
+                 katalog=None, workers=1):
+    """
+    Tulis satu set export sintetis per toko × marketplace. Return list folder yang ditulis.
+    Penulisan xlsx yang paling lama, jadi workers > 1 memproses tiap kombinasi di process terpisah.
+    """
+    katalog = muat_judul_katalog() if katalog is None else katalog
+    tugas = [(folder, toko, nomor_toko, nama_marketplace, jumlah_pesanan, produk_per_pesanan, rasio_retur,
+              seed, tanggal_mulai, katalog)
+             for nomor_toko, toko in enumerate(daftar_toko) for nama_marketplace in marketplace]
+    if workers <= 1:
+        return [buat_satu(*args) for args in tugas]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tugas))) as executor:
+        return list(executor.map(buat_satu, *zip(*tugas)))
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Buat file export Shopee/TikTok sintetis untuk uji skala.")
+    parser.add_argument('folder', help="Folder tujuan (struktur <Toko>/<Marketplace>/ seperti input rekap_batch.py)")
+    parser.add_argument('--pesanan', type=int, default=10_000, help="Jumlah pesanan per toko (default: 10000)")
+    parser.add_argument('--produk-per-pesanan', type=float, default=1.5, help="Rata-rata produk per pesanan (default: 1.5)")
+    parser.add_argument('--retur', type=float, default=0.03, help="Rasio pesanan retur/batal (default: 0.03)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--toko', nargs='+', default=list(TOKO_DEFAULT), help="Nama toko (default: semua toko)")
+    parser.add_argument('--marketplace', nargs='+', default=["Shopee", "TikTok"], choices=["Shopee", "TikTok"])
+    parser.add_argument('--mulai', default='2026-01-19', help="Tanggal awal periode mingguan (YYYY-MM-DD)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Jumlah process paralel (default: jumlah core)")
+    args = parser.parse_args(argv)
+
+    ditulis = buat_dataset(
+        args.folder, jumlah_pesanan=args.pesanan, produk_per_pesanan=args.produk_per_pesanan,
+        rasio_retur=args.retur, seed=args.seed, daftar_toko=args.toko, marketplace=args.marketplace,
+        tanggal_mulai=datetime.strptime(args.mulai, '%Y-%m-%d'), workers=args.workers
+    )
+    for folder in ditulis:
+        print(folder)
+
+if __name__ == "__main__":
+    main_cli()
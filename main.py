@@ -8,24 +8,73 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import io
+import os
 import time
 import re
+import hashlib
+import importlib.util
+import inspect
+import sqlite3
+import multiprocessing
+import threading
+import json
+import pickle
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from rapidfuzz import fuzz
-import pdfplumber
+from rapidfuzz.process import cdist
 from openpyxl import load_workbook
-
-try:
-    import easyocr
-    from PIL import Image
-    import numpy as np
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+from xlsxwriter.utility import xl_range, xl_col_to_name
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+import ocr_worker
+
+# --- DEPENDENSI OPSIONAL (DICEK TANPA IMPORT, DIMUAT SAAT PERTAMA DIPAKAI) ---
+# easyocr menarik torch (beberapa detik), pdfplumber menarik pdfminer: keduanya
+# tidak dipakai mode Bulanan / Multi-Toko / Akumulasi, jadi jangan di-import di awal.
+FITUR_OPSIONAL = {
+    'ocr': ['easyocr', 'PIL'],
+    'pdf': ['pdfplumber'],
+}
+
+def modul_tersedia(nama_modul):
+    # find_spec hanya mencari lokasi paket, tidak mengeksekusi isinya
+    try:
+        return importlib.util.find_spec(nama_modul) is not None
+    except (ImportError, ValueError):
+        return False
+
+def fitur_tersedia(fitur):
+    if fitur not in fitur_tersedia.status:
+        fitur_tersedia.status[fitur] = all(modul_tersedia(m) for m in FITUR_OPSIONAL[fitur])
+    return fitur_tersedia.status[fitur]
+fitur_tersedia.status = {}
+
+OCR_AVAILABLE = fitur_tersedia('ocr')
+if not OCR_AVAILABLE:
     st.warning("Library OCR tidak terinstall. Fitur penjualan offline membutuhkan: pip install easyocr pillow numpy")
     
 
 # --- FUNGSI-FUNGSI PEMROSESAN ---
 
+def apply_per_nilai_unik(series, fungsi):
+    """
+    Setara series.apply(fungsi), tapi fungsi hanya dijalankan sekali per nilai unik
+    (factorize → apply ke nilai unik → disebar balik lewat kode). REKAP 20rb baris
+    biasanya hanya punya ratusan nama produk berbeda. NaN/None ikut diproses sebagai satu nilai.
+    """
+    if series.empty:
+        return series.apply(fungsi) # Tanpa nilai untuk disimpulkan, dtype kosong ikut aturan apply
+    kode, _ = pd.factorize(series, use_na_sentinel=False)
+    # Ambil nilai asli kemunculan pertama (factorize menyamakan None dengan NaN)
+    _, posisi_pertama = np.unique(kode, return_index=True)
+    hasil_unik = pd.Series(series.to_numpy(dtype=object)[posisi_pertama], dtype=object).apply(fungsi)
+    hasil = hasil_unik.take(kode)
+    hasil.index = series.index
+    hasil.name = series.name
+    return hasil
+
 def get_pretty_date_range(start_date, end_date):
     try:
         dt_start = pd.to_datetime(start_date)
@@ -45,26 +94,58 @@ def get_pretty_date_range(start_date, end_date):
     except:
         return ""
 
+# Format angka per kolom untuk bersihkan_kolom_angka (karakter di luar pola dibuang):
+#   'id'    : desimal ',' (income/iklan Shopee: "-1234,5" → -1234.5)
+#   'digit' : hanya digit (order-all Shopee: "Rp35.750" → 35750)
+#   'titik' : desimal '.', boleh minus (TikTok: "-1234.56" → -1234.56)
+POLA_FORMAT_ANGKA = {
+    'id': r'[^\d,\-]',
+    'digit': r'\D',
+    'titik': r'[^\d\.\-]',
+}
+
+def bersihkan_kolom_angka(df, spec):
+    """
+    Membersihkan banyak kolom uang sekaligus. spec = {nama kolom: format (lihat POLA_FORMAT_ANGKA)}.
+    - Kolom yang tidak ada dilewati; kolom yang sudah numerik hanya di-fillna(0)
+    - Kolom teks dengan format sama digabung lalu dibersihkan dalam satu pass regex
+    Return DataFrame numerik (float64/int64) berindex sama dengan df; df sendiri tidak diubah.
+    """
+    hasil = {}
+    kolom_teks_per_format = {}
+    for col, fmt in spec.items():
+        if col not in df.columns:
+            continue
+        if pd.api.types.is_numeric_dtype(df[col]):
+            hasil[col] = df[col].fillna(0)
+        else:
+            kolom_teks_per_format.setdefault(fmt, []).append(col)
+
+    n_baris = len(df)
+    for fmt, cols in kolom_teks_per_format.items():
+        gabungan = pd.concat([df[col].astype(str) for col in cols], ignore_index=True)
+        gabungan = gabungan.str.replace(POLA_FORMAT_ANGKA[fmt], '', regex=True)
+        if fmt == 'id':
+            gabungan = gabungan.str.replace(',', '.', regex=False)
+        gabungan = gabungan.to_numpy(dtype=object)
+        for i, col in enumerate(cols):
+            # to_numeric per kolom agar tipe hasil (int64/float64) tetap per kolom
+            potongan = pd.Series(gabungan[i * n_baris:(i + 1) * n_baris], index=df.index)
+            hasil[col] = pd.to_numeric(potongan, errors='coerce').fillna(0)
+        del gabungan
+
+    return pd.DataFrame({col: hasil[col] for col in spec if col in hasil}, index=df.index)
+
 def clean_and_convert_to_numeric(column):
-    """Menghapus semua karakter non-digit (kecuali titik dan minus) dan mengubah kolom menjadi numerik."""
-    if column.dtype == 'object':
-        column = column.astype(str).str.replace(r'[^\d,\-]', '', regex=True)
-        column = column.str.replace(',', '.', regex=False)
-    return pd.to_numeric(column, errors='coerce').fillna(0)
+    """Menghapus semua karakter non-digit (kecuali koma dan minus) dan mengubah kolom menjadi numerik."""
+    return bersihkan_kolom_angka(column.to_frame(name='nilai'), {'nilai': 'id'})['nilai'].rename(column.name)
 
 def clean_order_all_numeric(column):
     """
     Fungsi khusus untuk membersihkan kolom di file order-all.
-    Menghapus semua karakter non-digit dari string.
+    Menghapus semua karakter non-digit dari string ('.', ',', spasi, 'Rp', dll).
     """
-    # Karena kita akan memastikan kolom dibaca sebagai string,
-    # kita bisa langsung membersihkannya dengan aman.
-    # Regex `\D` berarti "karakter apa pun yang bukan digit".
-    # Ini akan menghapus '.' , ',' , spasi, 'Rp', dll.
-    cleaned_column = column.astype(str).str.replace(r'\D', '', regex=True)
-    
-    # Ubah string angka yang sudah bersih (misal: "35750") ke tipe data numerik.
-    return pd.to_numeric(cleaned_column, errors='coerce').fillna(0)
+    return bersihkan_kolom_angka(column.to_frame(name='nilai'), {'nilai': 'digit'})['nilai'].rename(column.name)
 
 def clean_columns(df):
     """Menghapus spasi di awal dan akhir dari semua nama kolom DataFrame."""
@@ -160,82 +241,209 @@ def extract_paper_and_size_variation(var_str):
     
     return ' '.join(unique_parts) # Gabungkan bagian yang relevan
 
-def parse_offline_sales_image(image_file):
+# --- OCR PENJUALAN OFFLINE (CACHE PER HASH GAMBAR + PROCESS POOL) ---
+
+OCR_CACHE_PATH = 'ocr_cache.sqlite'
+OCR_CACHE_VERSI = f'easyocr:id,en:{ocr_worker.VERSI_PREPROSES}' # Ganti jika bahasa/parameter OCR berubah agar cache lama tidak terpakai
+
+def hitung_hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def buka_ocr_cache():
+    conn = sqlite3.connect(OCR_CACHE_PATH, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS ocr_cache ("
+        "image_hash TEXT, versi TEXT, teks TEXT, "
+        "PRIMARY KEY (image_hash, versi))"
+    )
+    return conn
+
+def baca_ocr_cache(image_hash):
+    """Ambil teks OCR tersimpan untuk gambar ini; None jika belum ada / cache tidak bisa dibaca."""
+    try:
+        conn = buka_ocr_cache()
+        try:
+            row = conn.execute(
+                "SELECT teks FROM ocr_cache WHERE image_hash = ? AND versi = ?",
+                (image_hash, OCR_CACHE_VERSI)
+            ).fetchone()
+        finally:
+            conn.close()
+    except Exception:
+        return None
+    return row[0] if row else None
+
+def simpan_ocr_cache(image_hash, teks):
+    try:
+        conn = buka_ocr_cache()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO ocr_cache VALUES (?, ?, ?)", (image_hash, OCR_CACHE_VERSI, teks))
+        finally:
+            conn.close()
+    except Exception:
+        pass # Cache hanya optimasi, kegagalan tulis tidak boleh menghentikan proses
+
+def jumlah_worker_ocr():
+    # Jumlah core yang benar-benar boleh dipakai proses ini (hormati CPU affinity / container)
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+@st.cache_resource(show_spinner=False)
+def get_ocr_executor():
+    """
+    Process pool OCR, satu easyocr.Reader per worker, maksimal = jumlah core.
+    Pakai 'forkserver' (ocr_worker.KonteksOCR): worker di-fork dari proses server yang hanya
+    meng-import ocr_worker, bukan dari proses Streamlit yang thread-nya sedang jalan
+    (fork di sana bisa deadlock di child) dan tanpa menjalankan ulang main.py.
+    Worker dibuat saat ada tugas, bukan sekaligus. Tanpa 'forkserver' (Windows) jatuh ke satu thread.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(
+            max_workers=jumlah_worker_ocr(),
+            mp_context=ocr_worker.KonteksOCR(),
+            initializer=ocr_worker.init_worker
+        )
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='ocr')
+
+@st.cache_resource(show_spinner=False)
+def get_ocr_jobs():
+    return {} # image_hash -> Future, diambil (pop) saat hasilnya dipakai
+
+def mulai_ocr_latar(uploaded_images):
+    """
+    Antrekan OCR gambar yang belum pernah diproses ke process pool.
+    Dipanggil segera setelah upload, sehingga OCR sudah berjalan sebelum tombol proses ditekan.
     """
-    Mengekstrak data penjualan offline dari gambar WhatsApp menggunakan EasyOCR.
+    if not OCR_AVAILABLE or not uploaded_images:
+        return
+    jobs = get_ocr_jobs()
+    for image_file in uploaded_images:
+        image_bytes = image_file.getvalue()
+        image_hash = hitung_hash_bytes(image_bytes)
+        if image_hash in jobs or baca_ocr_cache(image_hash) is not None:
+            continue
+        jobs[image_hash] = get_ocr_executor().submit(ocr_worker.jalankan_ocr, image_bytes)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def ambil_teks_ocr(image_hash, _image_bytes):
+    """
+    Teks OCR per hash gambar (LRU di memori → cache disk → process pool).
+    Hasil worker yang sudah diantrekan dipakai langsung, tidak di-OCR ulang.
+    """
+    future = get_ocr_jobs().pop(image_hash, None)
+    if future is None:
+        teks = baca_ocr_cache(image_hash)
+        if teks is not None:
+            return teks
+        future = get_ocr_executor().submit(ocr_worker.jalankan_ocr, _image_bytes)
+    try:
+        teks = future.result()
+    except BrokenProcessPool:
+        get_ocr_executor.clear() # Worker mati (mis. kehabisan memori): pool dibuat ulang di pemanggilan berikutnya
+        raise
+    simpan_ocr_cache(image_hash, teks)
+    return teks
+
+def parse_teks_penjualan_offline(full_text):
+    """
+    Mengekstrak data penjualan offline dari teks hasil OCR.
     BISA MENGEMBALIKAN LIST JIKA MULTIPLE PRODUK TERDETEKSI.
     Returns: list of dict dengan keys: nama_produk, eksemplar, pesanan, harga_satuan
     """
-    if not OCR_AVAILABLE:
-        st.error("OCR tidak tersedia. Install dengan: pip install easyocr pillow numpy")
-        return []
+    # Cari pattern multiple produk (bisa by "Pembelian offline" atau bubble terpisah)
+    # Split by keywords yang menandai awal produk baru
+    produk_sections = re.split(r'(?=[Pp]embelian\s+[Oo]ffline|[Nn]ama\s+[Pp]roduk\s*:)', full_text)
+    produk_sections = [s.strip() for s in produk_sections if s.strip()]
     
-    try:
-        # Inisialisasi reader (singleton pattern)
-        if not hasattr(parse_offline_sales_image, 'reader'):
-            parse_offline_sales_image.reader = easyocr.Reader(['id', 'en'], gpu=False)
-        
-        # Buka gambar dan convert ke numpy array
-        image = Image.open(image_file)
-        image_np = np.array(image)
+    all_products = []
+    
+    for section in produk_sections:
+        # Skip jika bukan section produk valid
+        if not re.search(r'[Nn]ama\s*[Pp]roduk', section):
+            continue
         
-        # OCR dengan bounding box untuk deteksi posisi
-        results = parse_offline_sales_image.reader.readtext(image_np, detail=1, paragraph=False)
+        result = {}
         
-        # Gabungkan text dengan posisi
-        texts_with_bbox = [(r[1], r[0]) for r in results]  # (text, bbox)
-        full_text = ' '.join([t[0] for t in texts_with_bbox])
+        # Cari Nama Produk
+        nama_match = re.search(r'[Nn]ama\s*[Pp]roduk\s*[:：]\s*(.+?)(?=[Ee]ksemplar|[Pp]esanan|$)', section, re.DOTALL)
+        if nama_match:
+            result['nama_produk'] = nama_match.group(1).strip().replace('\n', ' ')
+        else:
+            continue  # Skip jika tidak ada nama produk
         
-        # Cari pattern multiple produk (bisa by "Pembelian offline" atau bubble terpisah)
-        # Split by keywords yang menandai awal produk baru
-        produk_sections = re.split(r'(?=[Pp]embelian\s+[Oo]ffline|[Nn]ama\s+[Pp]roduk\s*:)', full_text)
-        produk_sections = [s.strip() for s in produk_sections if s.strip()]
+        # Cari Eksemplar
+        eksemplar_match = re.search(r'[Ee]ksemplar\s*[:：]\s*(\d+)', section)
+        result['eksemplar'] = int(eksemplar_match.group(1)) if eksemplar_match else 0
         
-        all_products = []
+        # Cari Pesanan
+        pesanan_match = re.search(r'[Pp]esanan\s*[:：]\s*(\d+)', section)
+        result['pesanan'] = int(pesanan_match.group(1)) if pesanan_match else 1
         
-        for section in produk_sections:
-            # Skip jika bukan section produk valid
-            if not re.search(r'[Nn]ama\s*[Pp]roduk', section):
-                continue
-            
-            result = {}
-            
-            # Cari Nama Produk
-            nama_match = re.search(r'[Nn]ama\s*[Pp]roduk\s*[:：]\s*(.+?)(?=[Ee]ksemplar|[Pp]esanan|$)', section, re.DOTALL)
-            if nama_match:
-                result['nama_produk'] = nama_match.group(1).strip().replace('\n', ' ')
-            else:
-                continue  # Skip jika tidak ada nama produk
-            
-            # Cari Eksemplar
-            eksemplar_match = re.search(r'[Ee]ksemplar\s*[:：]\s*(\d+)', section)
-            result['eksemplar'] = int(eksemplar_match.group(1)) if eksemplar_match else 0
-            
-            # Cari Pesanan
-            pesanan_match = re.search(r'[Pp]esanan\s*[:：]\s*(\d+)', section)
-            result['pesanan'] = int(pesanan_match.group(1)) if pesanan_match else 1
-            
-            # Cari Harga Satuan
-            harga_match = re.search(r'[Hh]arga\s*[Ss]atuan\s*[:：]\s*(\d+(?:[.,]\d+)*)', section)
-            if harga_match:
-                harga_str = harga_match.group(1).replace('.', '').replace(',', '')
-                result['harga_satuan'] = int(harga_str)
-            else:
-                result['harga_satuan'] = 0
-            
-            # Hitung derived values
-            result['jumlah_terjual'] = result['eksemplar']
-            result['total_penjualan'] = result['jumlah_terjual'] * result['harga_satuan']
-            
-            all_products.append(result)
+        # Cari Harga Satuan
+        harga_match = re.search(r'[Hh]arga\s*[Ss]atuan\s*[:：]\s*(\d+(?:[.,]\d+)*)', section)
+        if harga_match:
+            harga_str = harga_match.group(1).replace('.', '').replace(',', '')
+            result['harga_satuan'] = int(harga_str)
+        else:
+            result['harga_satuan'] = 0
         
-        return all_products  # <-- RETURN LIST
+        # Hitung derived values
+        result['jumlah_terjual'] = result['eksemplar']
+        result['total_penjualan'] = result['jumlah_terjual'] * result['harga_satuan']
         
-    except Exception as e:
-        st.error(f"Gagal memproses gambar {image_file.name}: {e}")
-        import traceback
-        st.error(traceback.format_exc())
+        all_products.append(result)
+    
+    return all_products  # <-- RETURN LIST
+
+def ocr_batch_gambar(uploaded_images):
+    """
+    OCR sekumpulan gambar penjualan offline secara paralel (process pool).
+    Returns: list sejajar urutan input berisi (list produk, error) per gambar; error None jika sukses.
+    """
+    if not OCR_AVAILABLE:
+        error = RuntimeError("OCR tidak tersedia. Install dengan: pip install easyocr pillow numpy")
+        return [([], error) for _ in uploaded_images]
+
+    # Semua gambar yang belum ada di cache masuk pool sekaligus, baru hasilnya ditunggu satu per satu
+    mulai_ocr_latar(uploaded_images)
+
+    hasil = []
+    for image_file in uploaded_images:
+        try:
+            image_bytes = image_file.getvalue()
+            full_text = ambil_teks_ocr(hitung_hash_bytes(image_bytes), image_bytes)
+            hasil.append((parse_teks_penjualan_offline(full_text), None))
+        except Exception as e:
+            hasil.append(([], e))
+    return hasil
+
+def parse_offline_sales_image(image_file):
+    """
+    Mengekstrak data penjualan offline dari satu gambar WhatsApp menggunakan EasyOCR.
+    Returns: list of dict (lihat parse_teks_penjualan_offline)
+    """
+    (all_products, error), = ocr_batch_gambar([image_file])
+    if error is not None:
+        st.error(f"Gagal memproses gambar {image_file.name}: {error}")
         return []
+    return all_products
+
+def baca_teks_penjualan_offline(uploaded_txt_files, pasted_text):
+    """
+    Kumpulkan input teks penjualan offline (paste chat / file .txt export WhatsApp).
+    Whitespace dirapikan jadi satu spasi agar bentuknya sama dengan gabungan teks hasil OCR.
+    Returns: list of (label sumber, teks)
+    """
+    sumber_teks = []
+    if pasted_text and pasted_text.strip():
+        sumber_teks.append(("teks WhatsApp", ' '.join(pasted_text.split())))
+    for txt_file in uploaded_txt_files or []:
+        teks = txt_file.getvalue().decode('utf-8-sig', errors='replace')
+        sumber_teks.append((f"file {txt_file.name}", ' '.join(teks.split())))
+    return sumber_teks
 
 def create_offline_summary_row(offline_data, store_type, katalog_df, harga_custom_tlj_df, nomor_urut):
     """
@@ -305,7 +513,210 @@ def create_offline_summary_row(offline_data, store_type, katalog_df, harga_custo
     
     return row
     
-def process_rekap(order_df, income_df, seller_conv_df, store_type):
+# --- ATURAN VARIASI PRODUK KHUSUS (REKAP SHOPEE) ---
+# Tabel (pola nama produk, strategi ambil variasi, parameter). Urutan = prioritas:
+# jika beberapa pola muncul di nama produk, aturan paling atas yang dipakai.
+# Strategi:
+#   'full'                      -> seluruh string variasi
+#   'setelah_koma'              -> bagian setelah koma pertama (tanpa koma: seluruh variasi)
+#   'setelah_koma_kecuali_warna'-> seperti 'setelah_koma', tapi variasi tanpa koma yang berisi warna diabaikan
+#   'jenis_kertas'              -> kata kunci pertama (parameter) yang muncul di variasi
+#   'paket_satuan'              -> 'PAKET ISI X' / 'SATUAN', variasi berwarna (parameter) dikosongkan,
+#                                  selain itu ukuran/jenis kertas dari variasi
+#   'hapus_kurung'              -> variasi tanpa bagian dalam kurung
+#   'grosir'                    -> label grosir berdasarkan harga satuan (parameter: {harga: label})
+UKURAN_JENIS_KEYWORDS = {'QPP', 'A5', 'B5', 'A6', 'A7', 'HVS', 'KORAN'}
+
+ATURAN_VARIASI_HUMAN = [
+    ("CUSTOM AL QURAN MENGENANG/WAFAT 40/100/1000 HARI | Jakarta", 'full', None),
+    ("AL QUR'AN GOLD TERMURAH", 'full', None),
+    ("Alquran Cover Emas Kertas HVS Al Aqeel Gold Murah", 'full', None),
+    ("AL-QUR'AN SAKU A7 MAHEER HAFALAN AL QUR'AN", 'full', None),
+    ("AL-QURAN AL AQEEL SILVER TERMURAH", 'full', None),
+    ("Paket Wakaf Murah 50 pcs Alquran Al Aqeel | Alquran 18 Baris", 'full', None),
+    ("Paket Wakaf Murah 50 pcs Alquran Al Aqeel | Alquran 18 Baris | Jakarta", 'full', None),
+    ("Al-Qur'an Custom Foto Nama | GARUT | Alquran Untuk Wakaf Tasyakuran Tahlilan A5 & A6 Tebal dan Jelas", 'full', None),
+    ("Custom Al-Qur'an Mengenang Wafat Ukuran A5 A6 | Semarang", 'full', None),
+    ("Paket Wakaf Hemat Isi 50 Alquran Al Aqeel Murah Kertas Koran / HVS | Semarang", 'full', None),
+    ("Alquran Cover Metalik Gold A7 Al Aqeel kertas HVS 18 baris Murah Souvenir | MEDAN", 'full', None),
+    ("Alquran A6 Al Aqeel kertas HVS Murah Wakaf Souvenir Hampers | MEDAN", 'full', None),
+    ("Alquran Bombay A5 kertas koran Al Aqeel Murah Wakaf | MEDAN", 'full', None),
+    ("Al Qur'an Cover Metalik Gold A7 Al Aqeel kertas HVS 18 Baris Murah Souvenir Medan", 'full', None),
+    ("Al Qur'an A6 Al Aqeel kertas HVS Murah Wakaf Souvenir Hampers Medan", 'full', None),
+    ("Al Qur'an Bombay A5 Kertas Koran Al Aqeel Murah wakaf Medan", 'full', None),
+    ("Alquran Al Aqeel A6 Kertas HVS Terjangkau | Rasm Utsmani Bombay | Yogjakarta", 'full', None),
+    ("Alquran Wakaf Al Aqeel A5 Kertas Koran Terjangkau | Rasm Utsmani Bombay | Yogjakarta", 'full', None),
+    ("Alquran Al Aqeel A7 Gold Kertas HVS | Alquran Souvenir Metalik | Yogyakarta", 'full', None),
+    ("Al-Qur'an Custom Foto Nama | Yogyakarta | Alquran Untuk Tahlilan A5 & A6 Tebal dan Jelas", 'full', None),
+    # TAHLILAN (Ambil setelah koma)
+    ("AL QUR'AN EDISI TAHLILAN 30 Juz + Doa Tahlil | Pengganti Buku Yasin | Al Aqeel A6 Pastel HVS Edisi Tahlilan | Jakarta", 'setelah_koma', None),
+    ("Al-Qur'an Edisi Tahlilan Al Aqeel A6 Kertas HVS 18 Baris | GARUT | Alquran Untuk Wakaf Hadiah Souvenir Hampers", 'setelah_koma', None),
+    ("Al-Qur'an Edisi Tahlilan A6 | Custom Pengganti Yasin | 30 Juz Dengan Yasin Tahlil Terjemah | Semarang", 'setelah_koma', None),
+    ("Alquran Edisi Tahlilan A6 Pengganti Buku Yasin Terjemah | MEDAN", 'setelah_koma', None),
+    ("Alquran Al Aqeel Edisi Tahlilan A6 HVS | Custom Pengganti Yasin | 30 Juz Dengan Yasin Tahlil Terjemahan | Yogyakarta", 'setelah_koma', None),
+    # AL ALEEM (jenis kertas saja)
+    ("AL-QUR'AN TERJEMAH HC AL ALEEM A5", 'jenis_kertas', ['QPP', 'HVS', 'KORAN']),
+    # NON TERJEMAH (paket / satuan)
+    ("AL QUR'AN NON TERJEMAH Al AQEEL A5 KERTAS KORAN WAKAF", 'paket_satuan', ["BIRU", "COKLAT", "HIJAU", "MERAH", "RANDOM", "NAVY", "MAROON"]),
+    ("AL QUR'AN A6 NON TERJEMAH HVS WARNA PASTEL", 'paket_satuan', ["BIRU", "COKLAT", "HIJAU", "MERAH", "RANDOM", "NAVY", "MAROON"]),
+]
+
+ATURAN_VARIASI_PACIFIC = [
+    ("CUSTOM AL QURAN MENGENANG", 'full', None),
+    ("Alquran Custom Nama Foto | SURABAYA | Al-Quran untuk Wakaf Tasyakuran Tahlil Yasin Hadiah Hampers Islami", 'full', None),
+    ("AL QUR'AN GOLD TERMURAH", 'full', None),
+    ("Alquran Cover Emas Kertas HVS Al Aqeel Gold Murah", 'full', None),
+    ("AL-QUR'AN SAKU A7 MAHEER HAFALAN AL QUR'AN", 'full', None),
+    ("Alquran GOLD Hard Cover Al Aqeel Kertas HVS | SURABAYA | Alquran untuk Pengajian Wakaf Hadiah Islami Hampers", 'full', None),
+    ("AL QUR'AN EDISI TAHLILAN 30 Juz + Doa Tahlil | Pengganti Buku Yasin | Al Aqeel A6 Pastel HVS Edisi Tahlilan", 'full', None),
+    # Contoh: "A5 KORAN (MERAH)" menjadi "A5 KORAN"
+    ("PAKET MURAH ALQURAN AL AQEEL MUSHAF NON TERJEMAHAN | SURABAYA | al quran Wakaf/Shodaqoh hadiah hampers islami", 'hapus_kurung', None),
+    # Format variasi: "WARNA, SPESIFIKASI" (misal: "Merah, sisipan 1 halaman")
+    ("Alquran Edisi Tahlilan Lebih Mulia Daripada Buku Yasin Biasa | Al Aqeel A6 Kertas HVS | SURABAYA |", 'setelah_koma_kecuali_warna',
+     ['MERAH', 'COKLAT', 'BIRU', 'UNGU', 'HIJAU', 'RANDOM', 'HITAM']),
+    ("Al Quran Saku Pastel Al Aqeel A6 Kertas HVS | SURABAYA | Alquran Untuk Wakaf Hadiah Islami Hampers", 'grosir',
+     {19500: "GROSIR 1-2", 19200: "GROSIR 3-4", 18900: "GROSIR 5-6", 18600: "GROSIR > 7"}),
+    ("Al Quran Untuk Wakaf Al Aqeel A5 Kertas Koran 18 Baris | SURABAYA | Alquran Hadiah Islami Hampers", 'grosir',
+     {21800: "GROSIR 1-2", 21550: "GROSIR 3-4", 21300: "GROSIR 5-6", 21000: "GROSIR > 7"}),
+    ("Al Qur'an Untuk Wakaf Al Aqeel A5 Kertas Koran 18 Baris", 'paket_satuan', []),
+]
+
+def compile_aturan_variasi(aturan):
+    """
+    Kompilasi tabel aturan jadi satu regex alternasi (lookahead, agar pola yang
+    saling tumpang tindih tetap terdeteksi). Prioritas pola = urutan di tabel.
+    """
+    prioritas = {}
+    for i, (pola, _, _) in enumerate(aturan):
+        prioritas.setdefault(pola, i)
+    pola_urut = sorted(prioritas, key=prioritas.get)
+    regex = re.compile('(?=(' + '|'.join(re.escape(p) for p in pola_urut) + '))')
+    return {'aturan': aturan, 'regex': regex, 'prioritas': prioritas}
+
+def cari_aturan_variasi(aturan_compiled, nama_produk_clean):
+    """Index aturan berprioritas tertinggi yang polanya ada di nama produk (-1 jika tidak ada)."""
+    prioritas = aturan_compiled['prioritas']
+    cocok = [prioritas[m.group(1)] for m in aturan_compiled['regex'].finditer(nama_produk_clean)]
+    return min(cocok) if cocok else -1
+
+def ambil_bagian_variasi(strategi, parameter, var_str, harga_satuan):
+    """Hitung bagian variasi yang ditempel ke Nama Produk, vektor untuk satu strategi."""
+    var_upper = var_str.str.upper()
+    ada_koma = var_str.str.contains(',', regex=False)
+
+    if strategi == 'full':
+        return var_str
+    if strategi == 'hapus_kurung':
+        return var_str.str.replace(r'\(.*?\)', '', regex=True).str.strip()
+    if strategi == 'grosir':
+        return harga_satuan.map(parameter).fillna('')
+    if strategi == 'jenis_kertas':
+        return pd.Series(np.select([var_upper.str.contains(k, regex=False) for k in parameter], parameter, ''), index=var_str.index)
+
+    setelah_koma = var_str.str.split(',', n=1).str[-1].str.strip()
+    if strategi == 'setelah_koma':
+        return setelah_koma.where(ada_koma, var_str)
+
+    ada_warna = pd.Series(False, index=var_str.index)
+    if parameter:
+        ada_warna = var_upper.str.contains('|'.join(re.escape(w) for w in parameter), regex=True)
+    if strategi == 'setelah_koma_kecuali_warna':
+        return pd.Series(np.select([ada_koma, ~ada_warna], [setelah_koma, var_str], ''), index=var_str.index)
+
+    # 'paket_satuan'
+    paket = var_upper.str.extract(r'(PAKET\s*ISI\s*\d+)', expand=False)
+    bagian = var_upper.str.split(',').explode().str.strip()
+    ukuran_jenis = bagian[bagian.isin(UKURAN_JENIS_KEYWORDS)].groupby(level=0).first()
+    fallback = ukuran_jenis.reindex(var_str.index).fillna('').where(ada_koma, var_str)
+    return pd.Series(np.select(
+        [paket.notna(), var_upper.str.contains('SATUAN', regex=False), ada_warna],
+        [paket, 'SATUAN', ''],
+        fallback
+    ), index=var_str.index)
+
+def terapkan_aturan_variasi(rekap_df, kondisi, aturan_compiled):
+    """
+    Gabungkan Nama Produk dengan bagian variasi relevan untuk baris produk khusus.
+    Aturan dicari sekali per nama unik, lalu tiap strategi dijalankan vektor.
+    Butuh kolom 'Nama Produk Clean Temp'; rekap_df diubah di tempat.
+    """
+    target = kondisi & rekap_df['Nama Variasi'].notna()
+    if not target.any():
+        return
+    posisi = np.flatnonzero(target.to_numpy())
+    nama_asli = rekap_df['Nama Produk'].iloc[posisi].reset_index(drop=True)
+    nama_clean = rekap_df['Nama Produk Clean Temp'].iloc[posisi].reset_index(drop=True)
+    var_str = rekap_df['Nama Variasi'].iloc[posisi].astype(str).str.strip().reset_index(drop=True)
+
+    # Harga satuan (untuk aturan grosir): hapus titik/koma lalu jadikan integer
+    harga_satuan = pd.Series(0, index=var_str.index)
+    if 'Harga Setelah Diskon' in rekap_df.columns:
+        harga_raw = rekap_df['Harga Setelah Diskon'].iloc[posisi].astype(str).reset_index(drop=True)
+        harga_num = pd.to_numeric(harga_raw.str.replace('.', '', regex=False).str.replace(',', '', regex=False), errors='coerce')
+        harga_satuan = harga_num.where(np.isfinite(harga_num), 0).fillna(0).astype('int64')
+
+    aturan_per_nama = {nama: cari_aturan_variasi(aturan_compiled, nama) for nama in nama_clean.unique()}
+    index_aturan = nama_clean.map(aturan_per_nama)
+
+    bagian_variasi = pd.Series('', index=var_str.index, dtype=object)
+    for i in index_aturan[index_aturan >= 0].unique():
+        _, strategi, parameter = aturan_compiled['aturan'][i]
+        baris = index_aturan == i
+        bagian_variasi[baris] = ambil_bagian_variasi(strategi, parameter, var_str[baris], harga_satuan[baris])
+
+    # Gabungkan HANYA jika bagian variasi tidak kosong
+    ditempel = bagian_variasi.astype(str) != ''
+    nama_baru = nama_asli.astype(str) + ' (' + bagian_variasi.astype(str) + ')'
+    rekap_df.iloc[posisi[ditempel.to_numpy()], rekap_df.columns.get_loc('Nama Produk')] = nama_baru[ditempel].to_numpy()
+
+ATURAN_VARIASI_HUMAN_COMPILED = compile_aturan_variasi(ATURAN_VARIASI_HUMAN)
+ATURAN_VARIASI_PACIFIC_COMPILED = compile_aturan_variasi(ATURAN_VARIASI_PACIFIC)
+
+def klasifikasi_retur(rekap_df, order_df):
+    """
+    Klasifikasi retur untuk REKAP Shopee, dipakai bersama oleh process_rekap,
+    process_rekap_pacific dan process_rekap_dama.
+    Pesanan yang punya 'No. Pengajuan' dicek ke order-all: FULL jika semua item
+    'Permintaan Disetujui', PARTIAL jika hanya sebagian.
+    Return (full_return_orders, partial_return_orders, partial_return_items).
+    partial_return_items berisi item yang diretur (No. Pesanan, Nama Produk, Nama Variasi)
+    beserta '__return_count__' = jumlah item retur di pesanan tersebut.
+    """
+    kolom_item = ['No. Pesanan', 'Nama Produk', 'Nama Variasi']
+    no_pengajuan = rekap_df['No. Pengajuan']
+    potential_return_orders = rekap_df.loc[
+        no_pengajuan.notna() & (no_pengajuan != 'nan') & (no_pengajuan != ''),
+        'No. Pesanan'
+    ].unique()
+
+    order_retur = order_df[order_df['No. Pesanan'].isin(potential_return_orders)]
+    disetujui = order_retur['Status Pembatalan/ Pengembalian'] == 'Permintaan Disetujui'
+
+    # Hitung total item & item retur yang disetujui per pesanan
+    per_order = disetujui.groupby(order_retur['No. Pesanan']).agg(['size', 'sum'])
+    total_items, returned_items_count = per_order['size'], per_order['sum']
+    full_return_orders = set(per_order.index[(returned_items_count > 0) & (returned_items_count == total_items)])
+    partial_index = per_order.index[(returned_items_count > 0) & (returned_items_count < total_items)]
+    partial_return_orders = set(partial_index)
+
+    partial_return_items = order_retur.loc[
+        disetujui & order_retur['No. Pesanan'].isin(partial_index), kolom_item
+    ].drop_duplicates()
+    partial_return_items['__return_count__'] = partial_return_items['No. Pesanan'].map(returned_items_count)
+    return full_return_orders, partial_return_orders, partial_return_items
+
+def mask_item_retur_parsial(rekap_df, partial_return_items):
+    """Mask baris rekap_df yang (No. Pesanan, Nama Produk, Nama Variasi)-nya termasuk item retur parsial."""
+    kolom_item = ['No. Pesanan', 'Nama Produk', 'Nama Variasi']
+    kiri = rekap_df[kolom_item].astype(object).reset_index(drop=True)
+    kiri['__pos__'] = np.arange(len(kiri))
+    kanan = partial_return_items[kolom_item].astype(object)
+    posisi_cocok = kiri.merge(kanan, on=kolom_item, how='inner')['__pos__']
+    mask = np.zeros(len(rekap_df), dtype=bool)
+    mask[posisi_cocok.to_numpy()] = True
+    return pd.Series(mask, index=rekap_df.index)
+
+def process_rekap(order_df, income_df, seller_conv_df, store_type, peringatan=st.warning):
     """
     Fungsi untuk memproses dan membuat sheet 'REKAP' dengan file 'income' sebagai data utama.
     """
@@ -369,56 +780,8 @@ def process_rekap(order_df, income_df, seller_conv_df, store_type):
         rekap_df['No. Pengajuan'] = np.nan # Buat kolomnya jika tidak ada
     rekap_df['No. Pengajuan'] = rekap_df['No. Pengajuan'].astype(str).str.strip()
     
-    # 2. Dapatkan daftar No. Pesanan yang punya 'No. Pengajuan'
-    potential_return_orders = rekap_df[
-        rekap_df['No. Pengajuan'].notna() & 
-        (rekap_df['No. Pengajuan'] != 'nan') & 
-        (rekap_df['No. Pengajuan'] != '')
-    ]['No. Pesanan'].unique()
-    
-    # 3. Siapkan list untuk menampung No. Pesanan Full vs Partial
-    full_return_orders = set()
-    partial_return_orders = set()
-    
-    # 4. Siapkan dict untuk menyimpan item-item yang diretur sebagian
-    #    Format: { 'No. Pesanan': { 'keys': set(...), 'count': X } }
-    partial_return_items_map = {}
-    
-    # 5. Iterasi HANYA pada No. Pesanan yang berpotensi retur
-    for order_id in potential_return_orders:
-        # 6. Cek di order_all_df (order_df ASLI)
-        order_details = order_df[order_df['No. Pesanan'] == order_id]
-        
-        if order_details.empty:
-            continue 
-            
-        total_items_in_order = len(order_details)
-        
-        # 7. Cek 'Status Pembatalan/ Pengembalian'
-        returned_items = order_details[order_details['Status Pembatalan/ Pengembalian'] == 'Permintaan Disetujui']
-        returned_items_count = len(returned_items)
-        
-        if returned_items_count == 0:
-            # Punya No. Pengajuan tapi tidak ada 'Permintaan Disetujui'
-            continue 
-            
-        # 8. Tentukan Tipe Retur
-        if returned_items_count > 0 and returned_items_count == total_items_in_order:
-            # FULL RETURN
-            full_return_orders.add(order_id)
-        elif returned_items_count > 0 and returned_items_count < total_items_in_order:
-            # PARTIAL RETURN
-            partial_return_orders.add(order_id)
-            
-            # 9. Simpan (Nama Produk, Nama Variasi) dari item yang diretur
-            returned_item_keys = [
-                (row['Nama Produk'], row['Nama Variasi']) 
-                for _, row in returned_items.iterrows()
-            ]
-            partial_return_items_map[order_id] = {
-                'keys': set(returned_item_keys),
-                'count': returned_items_count # Simpan jumlah item retur
-            }
+    # 2. Klasifikasi retur FULL vs PARTIAL per No. Pesanan (lihat klasifikasi_retur)
+    full_return_orders, partial_return_orders, partial_return_items = klasifikasi_retur(rekap_df, order_df)
     
     # REVISI 2: Gabungkan Nama Produk dan Variasi untuk produk spesifik
     produk_khusus_raw = [
@@ -470,118 +833,8 @@ def process_rekap(order_df, income_df, seller_conv_df, store_type):
         kondisi = pd.Series([False] * len(rekap_df), index=rekap_df.index)
     
     if 'Nama Variasi' in rekap_df.columns:
-        new_product_names = rekap_df.loc[kondisi, 'Nama Produk'].copy()
-    
-        for idx in new_product_names.index:
-            nama_produk_asli = rekap_df.loc[idx, 'Nama Produk'] # Ambil nama produk asli (belum bersih)
-            nama_produk_clean = rekap_df.loc[idx, 'Nama Produk Clean Temp'] # Ambil nama produk bersih
-            nama_variasi_ori = rekap_df.loc[idx, 'Nama Variasi']
-    
-            if pd.notna(nama_variasi_ori):
-                var_str = str(nama_variasi_ori).strip()
-                part_to_append = ''
-    
-                # --- LOGIKA KHUSUS UNTUK PRODUK CUSTOM ---
-                produk_yang_ambil_full_variasi = [
-                    "CUSTOM AL QURAN MENGENANG/WAFAT 40/100/1000 HARI | Jakarta", 
-                    "AL QUR'AN GOLD TERMURAH",
-                    "Alquran Cover Emas Kertas HVS Al Aqeel Gold Murah",
-                    "AL-QUR'AN SAKU A7 MAHEER HAFALAN AL QUR'AN",
-                    "AL-QURAN AL AQEEL SILVER TERMURAH",
-                    "Paket Wakaf Murah 50 pcs Alquran Al Aqeel | Alquran 18 Baris",
-                    "Paket Wakaf Murah 50 pcs Alquran Al Aqeel | Alquran 18 Baris | Jakarta",
-                    "Al-Qur'an Custom Foto Nama | GARUT | Alquran Untuk Wakaf Tasyakuran Tahlilan A5 & A6 Tebal dan Jelas",
-                    "Custom Al-Qur'an Mengenang Wafat Ukuran A5 A6 | Semarang",
-                    "Paket Wakaf Hemat Isi 50 Alquran Al Aqeel Murah Kertas Koran / HVS | Semarang",
-                    "Alquran Cover Metalik Gold A7 Al Aqeel kertas HVS 18 baris Murah Souvenir | MEDAN",
-                    "Alquran A6 Al Aqeel kertas HVS Murah Wakaf Souvenir Hampers | MEDAN",
-                    "Alquran Bombay A5 kertas koran Al Aqeel Murah Wakaf | MEDAN",
-                    "Al Qur'an Cover Metalik Gold A7 Al Aqeel kertas HVS 18 Baris Murah Souvenir Medan",
-                    "Al Qur'an A6 Al Aqeel kertas HVS Murah Wakaf Souvenir Hampers Medan",
-                    "Al Qur'an Bombay A5 Kertas Koran Al Aqeel Murah wakaf Medan",
-                    "Alquran Al Aqeel A6 Kertas HVS Terjangkau | Rasm Utsmani Bombay | Yogjakarta",
-                    "Alquran Wakaf Al Aqeel A5 Kertas Koran Terjangkau | Rasm Utsmani Bombay | Yogjakarta",
-                    "Alquran Al Aqeel A7 Gold Kertas HVS | Alquran Souvenir Metalik | Yogyakarta",
-                    "Al-Qur'an Custom Foto Nama | Yogyakarta | Alquran Untuk Tahlilan A5 & A6 Tebal dan Jelas"
-                ]
-                if any(produk in nama_produk_clean for produk in produk_yang_ambil_full_variasi):
-                    # REVISI: Ambil seluruh string variasi, jangan di-split
-                    part_to_append = var_str
-                # --- AKHIR LOGIKA KHUSUS ---
-                # 3. TAHLILAN (Ambil setelah koma)
-                elif "AL QUR'AN EDISI TAHLILAN 30 Juz + Doa Tahlil | Pengganti Buku Yasin | Al Aqeel A6 Pastel HVS Edisi Tahlilan | Jakarta" in nama_produk_clean:
-                    if ',' in var_str:
-                        part_to_append = var_str.split(',', 1)[-1].strip() # Ambil setelah koma
-                    else:
-                        part_to_append = var_str # Fallback jika tidak ada koma (misal "Tidak custom")
-
-                elif "Al-Qur'an Edisi Tahlilan Al Aqeel A6 Kertas HVS 18 Baris | GARUT | Alquran Untuk Wakaf Hadiah Souvenir Hampers" in nama_produk_clean:
-                    if ',' in var_str:
-                        part_to_append = var_str.split(',', 1)[-1].strip() # Ambil setelah koma
-                    else:
-                        part_to_append = var_str # Fallback jika tidak ada koma (misal "Tidak custom")
-
-                elif "Al-Qur'an Edisi Tahlilan A6 | Custom Pengganti Yasin | 30 Juz Dengan Yasin Tahlil Terjemah | Semarang" in nama_produk_clean:
-                    if ',' in var_str:
-                        part_to_append = var_str.split(',', 1)[-1].strip() # Ambil setelah koma
-                    else:
-                        part_to_append = var_str # Fallback jika tidak ada koma (misal "Tidak custom")
-
-                elif "Alquran Edisi Tahlilan A6 Pengganti Buku Yasin Terjemah | MEDAN" in nama_produk_clean:
-                    if ',' in var_str:
-                        part_to_append = var_str.split(',', 1)[-1].strip() # Ambil setelah koma
-                    else:
-                        part_to_append = var_str # Fallback jika tidak ada koma (misal "Tidak custom")
-
-                elif "Alquran Al Aqeel Edisi Tahlilan A6 HVS | Custom Pengganti Yasin | 30 Juz Dengan Yasin Tahlil Terjemahan | Yogyakarta" in nama_produk_clean:
-                    if ',' in var_str:
-                        part_to_append = var_str.split(',', 1)[-1].strip() # Ambil setelah koma
-                    else:
-                        part_to_append = var_str # Fallback jika tidak ada koma (misal "Tidak custom")
-
-                # 4. AL ALEEM (QPP Only)
-                elif "AL-QUR'AN TERJEMAH HC AL ALEEM A5" in nama_produk_clean:
-                    if 'QPP' in var_str.upper():
-                        part_to_append = 'QPP'
-                    elif 'HVS' in var_str.upper():
-                        part_to_append = 'HVS'
-                    elif 'KORAN' in var_str.upper():
-                        part_to_append = 'KORAN'
-                    # else: part_to_append tetap ''
-                        
-                elif "AL QUR'AN NON TERJEMAH Al AQEEL A5 KERTAS KORAN WAKAF" in nama_produk_clean or "AL QUR'AN A6 NON TERJEMAH HVS WARNA PASTEL" in nama_produk_clean:
-                    var_upper = var_str.upper()
-                    # Cari "PAKET ISI X" atau "SATUAN"
-                    paket_match = re.search(r'(PAKET\s*ISI\s*\d+)', var_upper)
-                    satuan_match = 'SATUAN' in var_upper
-                    colors_to_remove = ["BIRU", "COKLAT", "HIJAU", "MERAH", "RANDOM", "NAVY", "MAROON"]
-                    
-                    if paket_match:
-                        part_to_append = paket_match.group(1) # Hasilnya 'PAKET ISI 7'
-                    elif satuan_match:
-                        part_to_append = 'SATUAN'
-                    elif any(color in var_upper for color in colors_to_remove):
-                    # JIKA mengandung warna tapi BUKAN paket/satuan, kosongkan variasinya
-                        part_to_append = ""
-                    else:
-                        # --- LOGIKA FALLBACK TAMBAHAN ---
-                        # Jika bukan PAKET/SATUAN, jalankan logika generik
-                        if ',' in var_str:
-                            parts = [p.strip().upper() for p in var_str.split(',')]
-                            size_keywords = {'QPP', 'A5', 'B5', 'A6', 'A7', 'HVS', 'KORAN'}
-                            relevant_parts = [p for p in parts if p in size_keywords]
-                            if relevant_parts:
-                                part_to_append = relevant_parts[0]
-                        else:
-                            part_to_append = var_str
-
-                # --- Akhir Logika Lama ---
-    
-                # Gabungkan HANYA jika part_to_append tidak kosong
-                if part_to_append:
-                    new_product_names.loc[idx] = f"{nama_produk_asli} ({part_to_append})"
-    
-        rekap_df.loc[kondisi, 'Nama Produk'] = new_product_names
+        # Nama Produk + bagian variasi relevan, sesuai ATURAN_VARIASI_HUMAN
+        terapkan_aturan_variasi(rekap_df, kondisi, ATURAN_VARIASI_HUMAN_COMPILED)
     
     if 'Nama Produk Clean Temp' in rekap_df.columns:
         rekap_df.drop(columns=['Nama Produk Clean Temp'], inplace=True)
@@ -604,7 +857,7 @@ def process_rekap(order_df, income_df, seller_conv_df, store_type):
             inplace=True
         )
     else:
-        st.warning("Kolom 'Biaya Layanan' tidak ditemukan di file Income.")
+        peringatan("Kolom 'Biaya Layanan' tidak ditemukan di file Income.")
         biaya_layanan_map = pd.DataFrame(columns=['No. Pesanan', 'Biaya Layanan Income'])
         
     # 1. Pastikan Total Harga Produk ada dan numerik
@@ -628,8 +881,9 @@ def process_rekap(order_df, income_df, seller_conv_df, store_type):
     rekap_df['Total Penghasilan Dibagi'] = (rekap_df['Total Penghasilan'] / product_count_per_order).fillna(0)
 
     # Bersihkan kolom keuangan yang akan kita gunakan (aman jika sudah numerik)
-    rekap_df['Voucher dari Penjual'] = clean_and_convert_to_numeric(rekap_df['Voucher disponsor oleh Penjual'])
-    rekap_df['Promo Gratis Ongkir dari Penjual'] = clean_and_convert_to_numeric(rekap_df['Promo Gratis Ongkir dari Penjual'])
+    angka_penjual = bersihkan_kolom_angka(rekap_df, {'Voucher disponsor oleh Penjual': 'id', 'Promo Gratis Ongkir dari Penjual': 'id'})
+    rekap_df['Voucher dari Penjual'] = angka_penjual['Voucher disponsor oleh Penjual']
+    rekap_df['Promo Gratis Ongkir dari Penjual'] = angka_penjual['Promo Gratis Ongkir dari Penjual']
     # Pastikan kolom ongkir retur dibersihkan TANPA abs()
 
     # Buat kolom 'Dibagi' untuk alokasi per produk
@@ -763,10 +1017,9 @@ def process_rekap(order_df, income_df, seller_conv_df, store_type):
         rekap_df['Jumlah Pengembalian Dana ke Pembeli'] = 0
         
         # Buat kolom baru untuk jumlah retur per pesanan
-        # Map-kan 'count' dari dict yang kita buat
-        rekap_df['__return_count__'] = rekap_df['No. Pesanan'].map(
-            lambda x: partial_return_items_map.get(x, {}).get('count', 1) # default 1 utk hindari /0
-        )
+        # Map-kan jumlah item retur per pesanan dari klasifikasi_retur
+        return_count_per_order = partial_return_items.groupby('No. Pesanan')['__return_count__'].first()
+        rekap_df['__return_count__'] = rekap_df['No. Pesanan'].map(return_count_per_order).fillna(1) # default 1 utk hindari /0
         
         # Hitung nilai pengembalian per item retur
         rekap_df['Pengembalian Dana Per Item'] = (
@@ -774,15 +1027,7 @@ def process_rekap(order_df, income_df, seller_conv_df, store_type):
         ).fillna(0)
         
         # 2. Identifikasi baris-baris yang merupakan item retur parsial
-        def is_partial_return_item(row):
-            order_id = row['No. Pesanan']
-            if order_id not in partial_return_items_map:
-                return False
-            
-            item_key = (row['Nama Produk'], row['Nama Variasi'])
-            return item_key in partial_return_items_map[order_id]['keys']
-
-        kondisi_partial_item = rekap_df.apply(is_partial_return_item, axis=1)
+        kondisi_partial_item = mask_item_retur_parsial(rekap_df, partial_return_items)
         
         # 3. Terapkan logika untuk item-item tersebut
         if kondisi_partial_item.any():
@@ -821,7 +1066,7 @@ def process_rekap(order_df, income_df, seller_conv_df, store_type):
 
     return rekap_final.fillna(0)
 
-def process_rekap_pacific(order_df, income_df, seller_conv_df):
+def process_rekap_pacific(order_df, income_df, seller_conv_df, peringatan=st.warning):
     """
     Fungsi untuk memproses sheet 'REKAP' KHUSUS untuk Pacific Bookstore.
     Perbedaan utama: Biaya Layanan dihitung dari Total Harga Produk.
@@ -852,56 +1097,8 @@ def process_rekap_pacific(order_df, income_df, seller_conv_df):
         rekap_df['No. Pengajuan'] = np.nan # Buat kolomnya jika tidak ada
     rekap_df['No. Pengajuan'] = rekap_df['No. Pengajuan'].astype(str).str.strip()
     
-    # 2. Dapatkan daftar No. Pesanan yang punya 'No. Pengajuan'
-    potential_return_orders = rekap_df[
-        rekap_df['No. Pengajuan'].notna() & 
-        (rekap_df['No. Pengajuan'] != 'nan') & 
-        (rekap_df['No. Pengajuan'] != '')
-    ]['No. Pesanan'].unique()
-    
-    # 3. Siapkan list untuk menampung No. Pesanan Full vs Partial
-    full_return_orders = set()
-    partial_return_orders = set()
-    
-    # 4. Siapkan dict untuk menyimpan item-item yang diretur sebagian
-    #    Format: { 'No. Pesanan': { 'keys': set(...), 'count': X } }
-    partial_return_items_map = {}
-    
-    # 5. Iterasi HANYA pada No. Pesanan yang berpotensi retur
-    for order_id in potential_return_orders:
-        # 6. Cek di order_all_df (order_df ASLI)
-        order_details = order_df[order_df['No. Pesanan'] == order_id]
-        
-        if order_details.empty:
-            continue 
-            
-        total_items_in_order = len(order_details)
-        
-        # 7. Cek 'Status Pembatalan/ Pengembalian'
-        returned_items = order_details[order_details['Status Pembatalan/ Pengembalian'] == 'Permintaan Disetujui']
-        returned_items_count = len(returned_items)
-        
-        if returned_items_count == 0:
-            # Punya No. Pengajuan tapi tidak ada 'Permintaan Disetujui'
-            continue 
-            
-        # 8. Tentukan Tipe Retur
-        if returned_items_count > 0 and returned_items_count == total_items_in_order:
-            # FULL RETURN
-            full_return_orders.add(order_id)
-        elif returned_items_count > 0 and returned_items_count < total_items_in_order:
-            # PARTIAL RETURN
-            partial_return_orders.add(order_id)
-            
-            # 9. Simpan (Nama Produk, Nama Variasi) dari item yang diretur
-            returned_item_keys = [
-                (row['Nama Produk'], row['Nama Variasi']) 
-                for _, row in returned_items.iterrows()
-            ]
-            partial_return_items_map[order_id] = {
-                'keys': set(returned_item_keys),
-                'count': returned_items_count # Simpan jumlah item retur
-            }
+    # 2. Klasifikasi retur FULL vs PARTIAL per No. Pesanan (lihat klasifikasi_retur)
+    full_return_orders, partial_return_orders, partial_return_items = klasifikasi_retur(rekap_df, order_df)
     
     # REVISI 2: Gabungkan Nama Produk dan Variasi untuk produk spesifik
     produk_khusus_raw = [
@@ -935,112 +1132,8 @@ def process_rekap_pacific(order_df, income_df, seller_conv_df):
         kondisi = pd.Series([False] * len(rekap_df), index=rekap_df.index)
     
     if 'Nama Variasi' in rekap_df.columns:
-        new_product_names = rekap_df.loc[kondisi, 'Nama Produk'].copy()
-    
-        for idx in new_product_names.index:
-            nama_produk_asli = rekap_df.loc[idx, 'Nama Produk'] # Ambil nama produk asli (belum bersih)
-            nama_produk_clean = rekap_df.loc[idx, 'Nama Produk Clean Temp'] # Ambil nama produk bersih
-            nama_variasi_ori = rekap_df.loc[idx, 'Nama Variasi']
-    
-            if pd.notna(nama_variasi_ori):
-                var_str = str(nama_variasi_ori).strip()
-                part_to_append = ''
-                
-                val_raw = rekap_df.loc[idx, 'Harga Setelah Diskon']
-                
-                # 2. Bersihkan dan ubah ke integer agar bisa dibandingkan dengan angka
-                try:
-                    # Menghilangkan titik/koma jika ada dan konversi ke int
-                    harga_satuan = int(float(str(val_raw).replace('.', '').replace(',', '')))
-                except:
-                    harga_satuan = 0
-    
-                # --- LOGIKA KHUSUS UNTUK PRODUK CUSTOM ---
-                produk_yang_ambil_full_variasi = [
-                    "CUSTOM AL QURAN MENGENANG",
-                    "Alquran Custom Nama Foto | SURABAYA | Al-Quran untuk Wakaf Tasyakuran Tahlil Yasin Hadiah Hampers Islami",
-                    "AL QUR'AN GOLD TERMURAH",
-                    "Alquran Cover Emas Kertas HVS Al Aqeel Gold Murah",
-                    "AL-QUR'AN SAKU A7 MAHEER HAFALAN AL QUR'AN",
-                    "Alquran GOLD Hard Cover Al Aqeel Kertas HVS | SURABAYA | Alquran untuk Pengajian Wakaf Hadiah Islami Hampers",
-                    "AL QUR'AN EDISI TAHLILAN 30 Juz + Doa Tahlil | Pengganti Buku Yasin | Al Aqeel A6 Pastel HVS Edisi Tahlilan" # (Sesuaikan string ini)
-                ]
-                if any(produk in nama_produk_clean for produk in produk_yang_ambil_full_variasi):
-                    # REVISI: Ambil seluruh string variasi, jangan di-split
-                    part_to_append = var_str
-                # --- AKHIR LOGIKA KHUSUS ---
-                elif "PAKET MURAH ALQURAN AL AQEEL MUSHAF NON TERJEMAHAN | SURABAYA | al quran Wakaf/Shodaqoh hadiah hampers islami" in nama_produk_clean:
-                    # Menghapus apapun yang ada di dalam kurung ( ) termasuk kurungnya
-                    # Contoh: "A5 KORAN (MERAH)" menjadi "A5 KORAN"
-                    part_to_append = re.sub(r'\(.*?\)', '', var_str).strip()
-                elif "Alquran Edisi Tahlilan Lebih Mulia Daripada Buku Yasin Biasa | Al Aqeel A6 Kertas HVS | SURABAYA |" in nama_produk_clean:
-                    # Asumsi format variasi: "WARNA, SPESIFIKASI" (misal: "Merah, sisipan 1 halaman")
-                    if ',' in var_str:
-                        # Ambil bagian SETELAH koma pertama (Spesifikasi)
-                        spesifikasi = var_str.split(',', 1)[-1].strip()
-                        part_to_append = spesifikasi
-                    else:
-                        # Jika tidak ada koma, mungkin formatnya beda atau cuma 1 kata.
-                        # Cek apakah ini WARNA (jika ya, abaikan). Jika bukan warna, anggap spesifikasi.
-                        warna_keywords = ['MERAH', 'COKLAT', 'BIRU', 'UNGU', 'HIJAU', 'RANDOM', 'HITAM']
-                        is_warna = any(w in var_str.upper() for w in warna_keywords)
-                        
-                        if not is_warna:
-                            part_to_append = var_str # Ambil jika bukan warna
-                        else:
-                            part_to_append = '' # Abaikan jika cuma warna
-
-                            
-                elif "Al Quran Saku Pastel Al Aqeel A6 Kertas HVS | SURABAYA | Alquran Untuk Wakaf Hadiah Islami Hampers" in nama_produk_clean:
-                    if harga_satuan == 19500:
-                        part_to_append = "GROSIR 1-2"
-                    elif harga_satuan == 19200:
-                        part_to_append = "GROSIR 3-4"
-                    elif harga_satuan == 18900:
-                        part_to_append = "GROSIR 5-6"
-                    elif harga_satuan == 18600:
-                        part_to_append = "GROSIR > 7"
-                
-                elif "Al Quran Untuk Wakaf Al Aqeel A5 Kertas Koran 18 Baris | SURABAYA | Alquran Hadiah Islami Hampers" in nama_produk_clean:
-                    if harga_satuan == 21800:
-                        part_to_append = "GROSIR 1-2"
-                    elif harga_satuan == 21550:
-                        part_to_append = "GROSIR 3-4"
-                    elif harga_satuan == 21300:
-                        part_to_append = "GROSIR 5-6"
-                    elif harga_satuan == 21000:
-                        part_to_append = "GROSIR > 7"
-    
-            
-                elif "Al Qur'an Untuk Wakaf Al Aqeel A5 Kertas Koran 18 Baris" in nama_produk_clean:
-                    var_upper = var_str.upper()
-                    # Cari "PAKET ISI X" atau "SATUAN"
-                    paket_match = re.search(r'(PAKET\s*ISI\s*\d+)', var_upper)
-                    satuan_match = 'SATUAN' in var_upper
-                    
-                    if paket_match:
-                        part_to_append = paket_match.group(1) # Hasilnya 'PAKET ISI 7'
-                    elif satuan_match:
-                        part_to_append = 'SATUAN'
-                    else:
-                        # --- LOGIKA FALLBACK TAMBAHAN ---
-                        # Jika bukan PAKET/SATUAN, jalankan logika generik
-                        if ',' in var_str:
-                            parts = [p.strip().upper() for p in var_str.split(',')]
-                            size_keywords = {'QPP', 'A5', 'B5', 'A6', 'A7', 'HVS', 'KORAN'}
-                            relevant_parts = [p for p in parts if p in size_keywords]
-                            if relevant_parts:
-                                part_to_append = relevant_parts[0]
-                        else:
-                            part_to_append = var_str
-
-                # --- Akhir Logika Lama ---
-    
-                # Gabungkan HANYA jika part_to_append tidak kosong
-                if part_to_append:
-                    new_product_names.loc[idx] = f"{nama_produk_asli} ({part_to_append})"
-    
-        rekap_df.loc[kondisi, 'Nama Produk'] = new_product_names
+        # Nama Produk + bagian variasi relevan, sesuai ATURAN_VARIASI_PACIFIC
+        terapkan_aturan_variasi(rekap_df, kondisi, ATURAN_VARIASI_PACIFIC_COMPILED)
     
     if 'Nama Produk Clean Temp' in rekap_df.columns:
         rekap_df.drop(columns=['Nama Produk Clean Temp'], inplace=True)
@@ -1061,7 +1154,7 @@ def process_rekap_pacific(order_df, income_df, seller_conv_df):
             inplace=True
         )
     else:
-        st.warning("Kolom 'Biaya Layanan' tidak ditemukan di file Income.")
+        peringatan("Kolom 'Biaya Layanan' tidak ditemukan di file Income.")
         biaya_layanan_map = pd.DataFrame(columns=['No. Pesanan', 'Biaya Layanan Income'])
 
     # --- LOGIKA BARU UNTUK Pacifik Bookstore ---
@@ -1078,8 +1171,9 @@ def process_rekap_pacific(order_df, income_df, seller_conv_df):
     rekap_df['Biaya Layanan Gratis Ongkir Dibagi'] = rekap_df['Biaya Layanan Income'] / product_count_per_order
 
     # Bersihkan kolom keuangan yang akan kita gunakan (aman jika sudah numerik)
-    rekap_df['Voucher dari Penjual'] = clean_and_convert_to_numeric(rekap_df['Voucher disponsor oleh Penjual'])
-    rekap_df['Promo Gratis Ongkir dari Penjual'] = clean_and_convert_to_numeric(rekap_df['Promo Gratis Ongkir dari Penjual'])
+    angka_penjual = bersihkan_kolom_angka(rekap_df, {'Voucher disponsor oleh Penjual': 'id', 'Promo Gratis Ongkir dari Penjual': 'id'})
+    rekap_df['Voucher dari Penjual'] = angka_penjual['Voucher disponsor oleh Penjual']
+    rekap_df['Promo Gratis Ongkir dari Penjual'] = angka_penjual['Promo Gratis Ongkir dari Penjual']
 
     # Buat kolom 'Dibagi' untuk alokasi per produk
     rekap_df['Voucher dari Penjual Dibagi'] = (rekap_df['Voucher dari Penjual'] / product_count_per_order).fillna(0).abs()
@@ -1201,10 +1295,9 @@ def process_rekap_pacific(order_df, income_df, seller_conv_df):
         rekap_df['Jumlah Pengembalian Dana ke Pembeli'] = 0
         
         # Buat kolom baru untuk jumlah retur per pesanan
-        # Map-kan 'count' dari dict yang kita buat
-        rekap_df['__return_count__'] = rekap_df['No. Pesanan'].map(
-            lambda x: partial_return_items_map.get(x, {}).get('count', 1) # default 1 utk hindari /0
-        )
+        # Map-kan jumlah item retur per pesanan dari klasifikasi_retur
+        return_count_per_order = partial_return_items.groupby('No. Pesanan')['__return_count__'].first()
+        rekap_df['__return_count__'] = rekap_df['No. Pesanan'].map(return_count_per_order).fillna(1) # default 1 utk hindari /0
         
         # Hitung nilai pengembalian per item retur
         rekap_df['Pengembalian Dana Per Item'] = (
@@ -1212,15 +1305,7 @@ def process_rekap_pacific(order_df, income_df, seller_conv_df):
         ).fillna(0)
         
         # 2. Identifikasi baris-baris yang merupakan item retur parsial
-        def is_partial_return_item(row):
-            order_id = row['No. Pesanan']
-            if order_id not in partial_return_items_map:
-                return False
-            
-            item_key = (row['Nama Produk'], row['Nama Variasi'])
-            return item_key in partial_return_items_map[order_id]['keys']
-
-        kondisi_partial_item = rekap_df.apply(is_partial_return_item, axis=1)
+        kondisi_partial_item = mask_item_retur_parsial(rekap_df, partial_return_items)
         
         # 3. Terapkan logika untuk item-item tersebut
         if kondisi_partial_item.any():
@@ -1257,7 +1342,7 @@ def process_rekap_pacific(order_df, income_df, seller_conv_df):
 
     return rekap_final.fillna(0)
 
-def process_rekap_dama(order_df, income_df, seller_conv_df):
+def process_rekap_dama(order_df, income_df, seller_conv_df, peringatan=st.warning):
     """
     Fungsi untuk memproses sheet 'REKAP' KHUSUS untuk DAMA.ID STORE (Shopee).
     Biaya Adm, Layanan, dan Proses dihitung berdasarkan Total Harga Produk.
@@ -1387,56 +1472,8 @@ def process_rekap_dama(order_df, income_df, seller_conv_df):
         rekap_df['No. Pengajuan'] = np.nan # Buat kolomnya jika tidak ada
     rekap_df['No. Pengajuan'] = rekap_df['No. Pengajuan'].astype(str).str.strip()
     
-    # 2. Dapatkan daftar No. Pesanan yang punya 'No. Pengajuan'
-    potential_return_orders = rekap_df[
-        rekap_df['No. Pengajuan'].notna() & 
-        (rekap_df['No. Pengajuan'] != 'nan') & 
-        (rekap_df['No. Pengajuan'] != '')
-    ]['No. Pesanan'].unique()
-    
-    # 3. Siapkan list untuk menampung No. Pesanan Full vs Partial
-    full_return_orders = set()
-    partial_return_orders = set()
-    
-    # 4. Siapkan dict untuk menyimpan item-item yang diretur sebagian
-    #    Format: { 'No. Pesanan': { 'keys': set(...), 'count': X } }
-    partial_return_items_map = {}
-    
-    # 5. Iterasi HANYA pada No. Pesanan yang berpotensi retur
-    for order_id in potential_return_orders:
-        # 6. Cek di order_all_df (order_df ASLI)
-        order_details = order_df[order_df['No. Pesanan'] == order_id]
-        
-        if order_details.empty:
-            continue 
-            
-        total_items_in_order = len(order_details)
-        
-        # 7. Cek 'Status Pembatalan/ Pengembalian'
-        returned_items = order_details[order_details['Status Pembatalan/ Pengembalian'] == 'Permintaan Disetujui']
-        returned_items_count = len(returned_items)
-        
-        if returned_items_count == 0:
-            # Punya No. Pengajuan tapi tidak ada 'Permintaan Disetujui'
-            continue 
-            
-        # 8. Tentukan Tipe Retur
-        if returned_items_count > 0 and returned_items_count == total_items_in_order:
-            # FULL RETURN
-            full_return_orders.add(order_id)
-        elif returned_items_count > 0 and returned_items_count < total_items_in_order:
-            # PARTIAL RETURN
-            partial_return_orders.add(order_id)
-            
-            # 9. Simpan (Nama Produk, Nama Variasi) dari item yang diretur
-            returned_item_keys = [
-                (row['Nama Produk'], row['Nama Variasi']) 
-                for _, row in returned_items.iterrows()
-            ]
-            partial_return_items_map[order_id] = {
-                'keys': set(returned_item_keys),
-                'count': returned_items_count # Simpan jumlah item retur
-            }
+    # 2. Klasifikasi retur FULL vs PARTIAL per No. Pesanan (lihat klasifikasi_retur)
+    full_return_orders, partial_return_orders, partial_return_items = klasifikasi_retur(rekap_df, order_df)
     
     if not seller_conv_df.empty:
         seller_conv_df['Kode Pesanan'] = seller_conv_df['Kode Pesanan'].astype(str)
@@ -1459,7 +1496,7 @@ def process_rekap_dama(order_df, income_df, seller_conv_df):
             inplace=True
         )
     else:
-        st.warning("Kolom 'Biaya Layanan' tidak ditemukan di file Income.")
+        peringatan("Kolom 'Biaya Layanan' tidak ditemukan di file Income.")
         biaya_layanan_map = pd.DataFrame(columns=['No. Pesanan', 'Biaya Layanan Income'])
 
     # --- LOGIKA PERHITUNGAN BIAYA UNTUK DAMA.ID STORE ---
@@ -1474,8 +1511,9 @@ def process_rekap_dama(order_df, income_df, seller_conv_df):
     rekap_df['Biaya Layanan Gratis Ongkir Dibagi'] = rekap_df['Biaya Layanan Income'] / product_count_per_order
 
     # Bersihkan kolom keuangan yang akan kita gunakan (aman jika sudah numerik)
-    rekap_df['Voucher dari Penjual'] = clean_and_convert_to_numeric(rekap_df['Voucher disponsor oleh Penjual'])
-    rekap_df['Promo Gratis Ongkir dari Penjual'] = clean_and_convert_to_numeric(rekap_df['Promo Gratis Ongkir dari Penjual'])
+    angka_penjual = bersihkan_kolom_angka(rekap_df, {'Voucher disponsor oleh Penjual': 'id', 'Promo Gratis Ongkir dari Penjual': 'id'})
+    rekap_df['Voucher dari Penjual'] = angka_penjual['Voucher disponsor oleh Penjual']
+    rekap_df['Promo Gratis Ongkir dari Penjual'] = angka_penjual['Promo Gratis Ongkir dari Penjual']
 
     # Buat kolom 'Dibagi' untuk alokasi per produk
     rekap_df['Voucher dari Penjual Dibagi'] = (rekap_df['Voucher dari Penjual'] / product_count_per_order).fillna(0).abs()
@@ -1597,10 +1635,9 @@ def process_rekap_dama(order_df, income_df, seller_conv_df):
         rekap_df['Jumlah Pengembalian Dana ke Pembeli'] = 0
         
         # Buat kolom baru untuk jumlah retur per pesanan
-        # Map-kan 'count' dari dict yang kita buat
-        rekap_df['__return_count__'] = rekap_df['No. Pesanan'].map(
-            lambda x: partial_return_items_map.get(x, {}).get('count', 1) # default 1 utk hindari /0
-        )
+        # Map-kan jumlah item retur per pesanan dari klasifikasi_retur
+        return_count_per_order = partial_return_items.groupby('No. Pesanan')['__return_count__'].first()
+        rekap_df['__return_count__'] = rekap_df['No. Pesanan'].map(return_count_per_order).fillna(1) # default 1 utk hindari /0
         
         # Hitung nilai pengembalian per item retur
         rekap_df['Pengembalian Dana Per Item'] = (
@@ -1608,15 +1645,7 @@ def process_rekap_dama(order_df, income_df, seller_conv_df):
         ).fillna(0)
         
         # 2. Identifikasi baris-baris yang merupakan item retur parsial
-        def is_partial_return_item(row):
-            order_id = row['No. Pesanan']
-            if order_id not in partial_return_items_map:
-                return False
-            
-            item_key = (row['Nama Produk'], row['Nama Variasi'])
-            return item_key in partial_return_items_map[order_id]['keys']
-
-        kondisi_partial_item = rekap_df.apply(is_partial_return_item, axis=1)
+        kondisi_partial_item = mask_item_retur_parsial(rekap_df, partial_return_items)
         
         # 3. Terapkan logika untuk item-item tersebut
         if kondisi_partial_item.any():
@@ -1680,81 +1709,226 @@ def process_iklan(iklan_df):
     iklan_final = pd.concat([iklan_agg, total_row], ignore_index=True)
     return iklan_final
 
-def get_harga_beli_fuzzy(nama_produk, katalog_df, score_threshold_primary=80, score_threshold_fallback=75):
+# --- MATCH CACHE (SQLITE, BERTAHAN ANTAR RUN MINGGUAN) ---
+
+MATCH_CACHE_PATH = 'match_cache.sqlite'
+
+def get_katalog_hash(katalog_df):
+    """Hash isi file katalog yang dipasang loader di attrs (None = katalog tidak di-cache)."""
+    return katalog_df.attrs.get('katalog_hash')
+
+def tanpa_match_cache(katalog_df):
+    """Salinan katalog tanpa katalog_hash: matching selalu dihitung penuh (untuk benchmark & uji banding)."""
+    katalog_df = katalog_df.copy()
+    katalog_df.attrs.pop('katalog_hash', None)
+    return katalog_df
+
+def buka_match_cache():
+    conn = sqlite3.connect(MATCH_CACHE_PATH, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS match_cache ("
+        "mesin TEXT, nama TEXT, variasi TEXT, katalog_hash TEXT, "
+        "baris INTEGER, skor REAL, harga REAL, "
+        "PRIMARY KEY (mesin, nama, variasi, katalog_hash))"
+    )
+    return conn
+
+def baca_match_cache(mesin, katalog_hash, daftar_kunci):
     """
-    REVISI 3: Mencari harga beli dari satu dataframe katalog saja.
+    Ambil hasil matching tersimpan untuk versi katalog ini.
+    Return {(nama, variasi): (baris, skor, harga)}; kosong jika cache tidak bisa dibaca.
     """
+    if not katalog_hash or not daftar_kunci:
+        return {}
     try:
-        search_name = str(nama_produk).strip()
-        if not search_name:
-            return 0
-
-        # Logika fuzzy matching langsung ke katalog_df
-        s = search_name.upper()
-        s_clean = re.sub(r'[^A-Z0-9\s×xX\-]', ' ', s)
-        s_clean = re.sub(r'\s+', ' ', s_clean).strip()
-
-        # 1) Deteksi ukuran
-        ukuran_found = None
-        ukuran_patterns = [
-            r'\bA[0-9]\b', r'\bB[0-9]\b', r'\b\d{1,3}\s*[x×X]\s*\d{1,3}\b', r'\b\d{1,3}\s*CM\b'
-        ]
-        for pat in ukuran_patterns:
-            m = re.search(pat, s_clean)
-            if m:
-                ukuran_found = m.group(0).replace(' ', '').upper()
-                break
+        conn = buka_match_cache()
+        try:
+            rows = conn.execute(
+                "SELECT nama, variasi, baris, skor, harga FROM match_cache WHERE mesin = ? AND katalog_hash = ?",
+                (mesin, katalog_hash)
+            ).fetchall()
+        finally:
+            conn.close()
+    except Exception:
+        return {}
+    diminta = set(daftar_kunci)
+    return {(nama, variasi): (baris, skor, harga) for nama, variasi, baris, skor, harga in rows if (nama, variasi) in diminta}
+
+def simpan_match_cache(mesin, katalog_hash, hasil_baru):
+    """Simpan hasil matching baru; entri dari versi katalog atau versi matcher lama ikut dibuang."""
+    if not katalog_hash or not hasil_baru:
+        return
+    try:
+        conn = buka_match_cache()
+        try:
+            with conn:
+                conn.execute("DELETE FROM match_cache WHERE mesin = ? AND katalog_hash != ?", (mesin, katalog_hash))
+                conn.execute("DELETE FROM match_cache WHERE mesin NOT LIKE ?", (f"%:{VERSI_MATCHER}:%",))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO match_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(mesin, nama, variasi, katalog_hash, baris, skor, harga)
+                     for (nama, variasi), (baris, skor, harga) in hasil_baru.items()]
+                )
+        finally:
+            conn.close()
+    except Exception:
+        pass # Cache hanya optimasi, kegagalan tulis tidak boleh menghentikan proses
+
+# Pola ukuran & peta jenis kertas untuk pencocokan nama produk ke katalog HARGA ONLINE
+UKURAN_PATTERNS_KATALOG = [
+    r'\bA[0-9]\b', r'\bB[0-9]\b', r'\b\d{1,3}\s*[x×X]\s*\d{1,3}\b', r'\b\d{1,3}\s*CM\b'
+]
+JENIS_KERTAS_MAP = {
+    'HVS': 'HVS', 'QPP': 'QPP', 'KORAN': 'KORAN', 'KK': 'KORAN', # Map KK ke KORAN
+    'GLOSSY':'GLOSSY','DUPLEX':'DUPLEX','ART':'ART','COVER':'COVER',
+    'MATT':'MATT','MATTE':'MATTE','CTP':'CTP','BOOK PAPER':'BOOK PAPER',
+    'ART PAPER': 'ART PAPER', 'ART PAPER': 'Art Paper'
+}
+
+def parse_nama_untuk_katalog(nama_produk):
+    """
+    Membersihkan nama produk lalu mendeteksi ukuran & jenis kertas.
+    Return (s_clean, ukuran_found, jenis_found), atau None jika nama kosong.
+    """
+    search_name = str(nama_produk).strip()
+    if not search_name:
+        return None
 
-        # 2) Deteksi jenis kertas
-        jenis_kertas_map = {
-            'HVS': 'HVS', 'QPP': 'QPP', 'KORAN': 'KORAN', 'KK': 'KORAN', # Map KK ke KORAN
-            'GLOSSY':'GLOSSY','DUPLEX':'DUPLEX','ART':'ART','COVER':'COVER',
-            'MATT':'MATT','MATTE':'MATTE','CTP':'CTP','BOOK PAPER':'BOOK PAPER',
-            'ART PAPER': 'ART PAPER', 'ART PAPER': 'Art Paper'
-        }
-        jenis_kertas_tokens_to_search = list(jenis_kertas_map.keys()) # Cari semua keys (termasuk KK)
-        
-        jenis_found = None
-        s_clean_words = set(s_clean.split()) # Pisah kata-kata di nama produk
-        
-        for token_to_find in jenis_kertas_tokens_to_search:
-            if token_to_find in s_clean_words: # Cek jika token ada sebagai kata utuh
-                jenis_found = jenis_kertas_map[token_to_find] # Ambil nilai dari map (misal KORAN jika KK ditemukan)
-                break # Ambil yang pertama ditemukan
-
-        # 3) Filter kandidat
-        candidates = katalog_df.copy()
-        if ukuran_found:
-            candidates = candidates[candidates['UKURAN_NORM'].str.contains(re.escape(ukuran_found), na=False)]
-        if jenis_found and not candidates.empty:
-            candidates = candidates[candidates['JENIS_KERTAS_NORM'].str.contains(jenis_found, na=False)]
-
-        if candidates.empty:
-            candidates = katalog_df.copy()
-
-        # 4) Fuzzy matching
-        best_score, best_price, best_title = 0, 0, ""
-        for _, row in candidates.iterrows():
-            title = str(row['JUDUL_NORM'])
-            score = fuzz.token_set_ratio(s_clean, title)
-            if score > best_score or (score == best_score and len(title) > len(best_title)):
-                best_score, best_price, best_title = score, row.get('KATALOG_HARGA_NUM', 0), title
-
-        if best_score >= score_threshold_primary and best_price > 0:
-            return float(best_price)
-
-        # 5) Fallback ke seluruh katalog jika perlu
-        best_score2, best_price2 = best_score, best_price
-        for _, row in katalog_df.iterrows():
-            title = str(row['JUDUL_NORM'])
-            score = fuzz.token_set_ratio(s_clean, title)
-            if score > best_score2 or (score == best_score2 and len(title) > len(best_title)):
-                best_score2, best_price2, best_title = score, row.get('KATALOG_HARGA_NUM', 0), title
-
-        if best_score2 >= score_threshold_fallback and best_price2 > 0:
-            return float(best_price2)
+    s = search_name.upper()
+    s_clean = re.sub(r'[^A-Z0-9\s×xX\-]', ' ', s)
+    s_clean = re.sub(r'\s+', ' ', s_clean).strip()
+
+    # 1) Deteksi ukuran
+    ukuran_found = None
+    for pat in UKURAN_PATTERNS_KATALOG:
+        m = re.search(pat, s_clean)
+        if m:
+            ukuran_found = m.group(0).replace(' ', '').upper()
+            break
+
+    # 2) Deteksi jenis kertas (kata utuh, ambil yang pertama ditemukan)
+    jenis_found = None
+    s_clean_words = set(s_clean.split())
+    for token_to_find in JENIS_KERTAS_MAP:
+        if token_to_find in s_clean_words:
+            jenis_found = JENIS_KERTAS_MAP[token_to_find]
+            break
+
+    return s_clean, ukuran_found, jenis_found
+
+def get_harga_beli_fuzzy_batch(daftar_nama_produk, katalog_df, score_threshold_primary=80, score_threshold_fallback=75):
+    """
+    Versi batch dari get_harga_beli_fuzzy: semua nama produk diskor sekaligus
+    terhadap JUDUL_NORM dengan satu matriks cdist. Filter ukuran/jenis kertas
+    jadi mask boolean di atas matriks tersebut. Hasil harga sama persis dengan
+    pencarian per baris (threshold primary/fallback & judul terpanjang menang saat seri).
+    Nama yang sudah pernah dicocokkan ke versi katalog yang sama diambil dari match cache.
+    """
+    daftar_nama_produk = list(daftar_nama_produk)
+    hasil = [0] * len(daftar_nama_produk)
+    if katalog_df is None or katalog_df.empty or not daftar_nama_produk:
+        return hasil
+
+    # Parse setiap nama, nama yang sama cukup dicocokkan sekali
+    def parse_aman(nama):
+        try:
+            return parse_nama_untuk_katalog(nama)
+        except Exception:
+            return None
+    parsed = apply_per_nilai_unik(pd.Series(daftar_nama_produk, dtype=object), parse_aman).tolist()
+    query_unik = list(dict.fromkeys(p for p in parsed if p is not None))
+    if not query_unik:
+        return hasil
+
+    # Kunci cache: (nama bersih, ukuran|jenis kertas hasil deteksi)
+    mesin = f"ONLINE:{VERSI_MATCHER}:{score_threshold_primary}:{score_threshold_fallback}"
+    katalog_hash = get_katalog_hash(katalog_df)
+    kunci_query = {q: (q[0], f"{q[1] or ''}|{q[2] or ''}") for q in query_unik}
+    cache = baca_match_cache(mesin, katalog_hash, list(kunci_query.values()))
+    hasil_query = {q: cache[kunci_query[q]] for q in query_unik if kunci_query[q] in cache}
+    query_baru = [q for q in query_unik if q not in hasil_query]
+
+    if query_baru:
+        try:
+            judul = katalog_df['JUDUL_NORM'].astype(str).tolist()
+            panjang_judul = np.array([len(t) for t in judul])
+            if 'KATALOG_HARGA_NUM' in katalog_df.columns:
+                harga = katalog_df['KATALOG_HARGA_NUM'].to_numpy()
+            else:
+                harga = np.zeros(len(katalog_df))
+            semua_baris = np.ones(len(katalog_df), dtype=bool)
+            skor_matrix = cdist([q[0] for q in query_baru], judul, scorer=fuzz.token_set_ratio, dtype=np.float64, workers=-1)
+        except Exception:
+            return hasil
+
+        # Mask kandidat per ukuran / jenis kertas (dihitung sekali per nilai unik)
+        mask_ukuran, mask_jenis = {}, {}
+
+        def cari_terbaik(skor, mask):
+            # Skor tertinggi, seri -> judul terpanjang, seri lagi -> baris pertama
+            idx = np.flatnonzero(mask)
+            skor_kandidat = skor[idx]
+            top = skor_kandidat.max()
+            idx_top = idx[skor_kandidat == top]
+            terbaik = idx_top[np.argmax(panjang_judul[idx_top])]
+            if top == 0 and panjang_judul[terbaik] == 0:
+                return -1
+            return terbaik
+
+        hasil_baru = {}
+        for j, q in enumerate(query_baru):
+            try:
+                s_clean, ukuran_found, jenis_found = q
+                skor = skor_matrix[j]
+
+                # 3) Filter kandidat
+                mask = semua_baris
+                if ukuran_found:
+                    if ukuran_found not in mask_ukuran:
+                        mask_ukuran[ukuran_found] = katalog_df['UKURAN_NORM'].str.contains(re.escape(ukuran_found), na=False).to_numpy(dtype=bool)
+                    mask = mask & mask_ukuran[ukuran_found]
+                if jenis_found and mask.any():
+                    if jenis_found not in mask_jenis:
+                        mask_jenis[jenis_found] = katalog_df['JENIS_KERTAS_NORM'].str.contains(jenis_found, na=False).to_numpy(dtype=bool)
+                    mask = mask & mask_jenis[jenis_found]
+                if not mask.any():
+                    mask = semua_baris
+
+                # 4) Fuzzy matching di kandidat
+                best = cari_terbaik(skor, mask)
+                best_score = skor[best] if best >= 0 else 0
+                best_price = harga[best] if best >= 0 else 0
+                if best_score >= score_threshold_primary and best_price > 0:
+                    hasil_baru[q] = (int(best), float(best_score), float(best_price))
+                    continue
+
+                # 5) Fallback ke seluruh katalog, hanya ganti jika lebih baik dari hasil kandidat
+                best2 = cari_terbaik(skor, semua_baris)
+                if best2 >= 0 and (best < 0 or (skor[best2], panjang_judul[best2]) > (skor[best], panjang_judul[best])):
+                    best = best2
+                best_score2 = skor[best] if best >= 0 else 0
+                best_price2 = harga[best] if best >= 0 else 0
+                if best_score2 >= score_threshold_fallback and best_price2 > 0:
+                    hasil_baru[q] = (int(best), float(best_score2), float(best_price2))
+                else:
+                    hasil_baru[q] = (int(best), float(best_score2), 0)
+            except Exception:
+                hasil_query[q] = (-1, 0.0, 0)
 
-        return 0
+        hasil_query.update(hasil_baru)
+        simpan_match_cache(mesin, katalog_hash, {kunci_query[q]: v for q, v in hasil_baru.items()})
+
+    for i, p in enumerate(parsed):
+        if p is not None:
+            hasil[i] = hasil_query[p][2]
+    return hasil
+
+def get_harga_beli_fuzzy(nama_produk, katalog_df, score_threshold_primary=80, score_threshold_fallback=75):
+    """
+    REVISI 4: Mencari harga beli satu produk, memakai engine batch.
+    """
+    try:
+        return get_harga_beli_fuzzy_batch([nama_produk], katalog_df, score_threshold_primary, score_threshold_fallback)[0]
     except Exception:
         return 0
 
@@ -1799,6 +1973,37 @@ def get_eksemplar_multiplier(nama_produk):
         return 1
     return 1
 
+def hitung_eksemplar_kolom(nama_produk, jumlah_terjual):
+    """
+    Versi kolom calculate_eksemplar (hasil sama persis), tanpa loop Python per baris.
+    Prioritas faktor: PAKET ISI X → SATUAN (1) → paket wakaf hemat isi 50 pcs (50) → 1.
+    """
+    nama_produk_upper = nama_produk.astype(str).str.upper()
+    paket_isi = nama_produk_upper.str.extract(r'PAKET\s*ISI\s*(\d+)', expand=False)
+    satuan = nama_produk_upper.str.contains('SATUAN', regex=False)
+    paket_khusus = nama_produk_upper.str.contains(r"PAKET.*WAKAF.*HEMAT.*MURAH.*ISI.*50.*PCS", regex=True)
+    faktor = np.select(
+        [paket_isi.notna().to_numpy(), satuan.to_numpy(), paket_khusus.to_numpy()],
+        [paket_isi.fillna('0').astype(np.int64).to_numpy(), 1, 50],
+        default=1
+    )
+    return jumlah_terjual * faktor
+
+def get_eksemplar_multiplier_kolom(nama_produk, dama=False):
+    """
+    Versi kolom get_eksemplar_multiplier / get_eksemplar_multiplier_dama (dama=True).
+    Return array int sejajar dengan Series nama_produk.
+    """
+    nama_produk_upper = nama_produk.astype(str).str.upper()
+    angka = nama_produk_upper.str.extract(r'(?:PAKET\s*ISI|PAKET|ISI)\s*(\d+)', expand=False)
+    kondisi = [nama_produk.isna().to_numpy(), angka.notna().to_numpy()]
+    pilihan = [1, angka.fillna('0').astype(np.int64).to_numpy()]
+    if dama:
+        # Khusus Dama: B5 (Bigbos) dihitung 1
+        kondisi.insert(1, nama_produk_upper.str.contains('BIGBOS', regex=False).to_numpy())
+        pilihan.insert(1, 1)
+    return np.select(kondisi, pilihan, default=1)
+
 def normalize_product_name_human_store(nama_produk):
     """
     Normalisasi nama produk Human Store:
@@ -2094,14 +2299,13 @@ def process_summary(rekap_df, iklan_final_df, katalog_df, harga_custom_tlj_df, s
             mask_summary = summary_df['Nama Produk'].str.contains(produk_base, case=False, na=False, regex=False)
             indices = summary_df[mask_summary].index
             
-            for idx in indices:
-                p_name = summary_df.at[idx, 'Nama Produk']
-                # Hitung jumlah baris yang memiliki Nama Produk yang SAMA PERSIS (untuk pembagi)
-                count_same = (summary_df['Nama Produk'] == p_name).sum()
-                mult = get_eksemplar_multiplier(p_name)
-                
-                # Rumus: (Multiplier * Biaya) / Denom / Count
-                summary_df.at[idx, 'Iklan Klik'] = (mult * total_biaya_iklan) / denom / count_same
+            p_names = summary_df.loc[indices, 'Nama Produk']
+            # Hitung jumlah baris yang memiliki Nama Produk yang SAMA PERSIS (untuk pembagi)
+            count_same = p_names.map(summary_df['Nama Produk'].value_counts()).to_numpy()
+            mult = get_eksemplar_multiplier_kolom(p_names)
+            
+            # Rumus: (Multiplier * Biaya) / Denom / Count
+            summary_df.loc[indices, 'Iklan Klik'] = (mult * total_biaya_iklan) / denom / count_same
             
             # Hapus dari iklan_data agar tidak terproses logika standar di bawah
             iklan_data = iklan_data[~iklan_data['Nama Iklan'].str.contains(produk_base, case=False, na=False, regex=False)]
@@ -2231,10 +2435,7 @@ def process_summary(rekap_df, iklan_final_df, katalog_df, harga_custom_tlj_df, s
     #     lambda row: (row['Nama Produk'], row['Jumlah Terjual']), 
     #     axis=1
     # )
-    summary_df['Jumlah Eksemplar'] = summary_df.apply(
-        lambda row: calculate_eksemplar(row['Nama Produk'], row['Jumlah Terjual']), 
-        axis=1
-    )
+    summary_df['Jumlah Eksemplar'] = hitung_eksemplar_kolom(summary_df['Nama Produk'], summary_df['Jumlah Terjual'])
 
     if store_type in ['Pacific Bookstore']:
         # summary_df['Biaya Kirim ke Sby'] = summary_df['Jumlah Terjual'] * 733
@@ -2246,9 +2447,7 @@ def process_summary(rekap_df, iklan_final_df, katalog_df, harga_custom_tlj_df, s
 
     # --- PERUBAHAN PADA PEMANGGILAN FUNGSI ---
     # Pastikan rekap_df (rekap_copy) yang belum diagregasi digunakan untuk lookup variasi
-    summary_df['Harga Beli'] = summary_df['Nama Produk'].apply(
-        lambda x: get_harga_beli_fuzzy(x, katalog_df)
-    )
+    summary_df['Harga Beli'] = get_harga_beli_fuzzy_batch(summary_df['Nama Produk'], katalog_df)
 
     # --- LOGIKA BARU UNTUK HARGA CUSTOM TLJ ---
     # 1. Buat 'temp_lookup_key' yang formatnya SAMA DENGAN 'LOOKUP_KEY' di file Excel
@@ -2473,7 +2672,7 @@ def process_summary(rekap_df, iklan_final_df, katalog_df, harga_custom_tlj_df, s
     # --- LOGIKA PERSINGKAT NAMA PRODUK (KHUSUS HUMAN STORE) ---
     mapping_singkatan = {}
     if store_type == "Human Store":
-        summary_df['Nama Produk'] = summary_df['Nama Produk'].apply(normalize_product_name_human_store)
+        summary_df['Nama Produk'] = apply_per_nilai_unik(summary_df['Nama Produk'], normalize_product_name_human_store)
         mapping_singkatan = {
             "AL-QUR'AN TERJEMAH HC AL ALEEM QPP A6": "Al Aleem A6 QPP", 
             "AL-QUR'AN TERJEMAH HC AL ALEEM QPP A6": "Al Aleem A6 QPP", 
@@ -2613,7 +2812,7 @@ def process_summary(rekap_df, iklan_final_df, katalog_df, harga_custom_tlj_df, s
                     return f"{short_name}{variasi_part}"
             return nama_full
 
-        summary_final['Nama Produk'] = summary_final['Nama Produk'].apply(apply_shorten)
+        summary_final['Nama Produk'] = apply_per_nilai_unik(summary_final['Nama Produk'], apply_shorten)
     # Terapkan ke kolom Nama Produk
     # summary_final['Nama Produk'] = summary_final['Nama Produk'].apply(apply_shorten)
         
@@ -2660,6 +2859,12 @@ def process_summary(rekap_df, iklan_final_df, katalog_df, harga_custom_tlj_df, s
     
     return summary_with_total
 
+# Keywords warna (lowercase) & produk yang warnanya dipertahankan di SUMMARY DAMA
+WARNA_KEYWORDS_DAMA = {'merah', 'biru', 'hijau', 'kuning', 'hitam', 'putih', 'ungu', 'coklat', 'cokelat', # Tambah 'cokelat'
+                       'abu', 'pink', 'gold', 'silver', 'cream', 'navy', 'maroon', 'random',
+                       'army', 'olive', 'mocca', 'dusty', 'sage'}
+HIJAB_KEYWORDS_DAMA = {'HIJAB', 'PASHMINA', 'PASMINA'}
+
 def format_variation_dama(variation, product_name):
     """
     Format variasi untuk DAMA.ID STORE SUMMARY.
@@ -2678,11 +2883,9 @@ def format_variation_dama(variation, product_name):
     product_name_upper = str(product_name).upper()
 
     # Keywords warna (lowercase)
-    color_keywords = {'merah', 'biru', 'hijau', 'kuning', 'hitam', 'putih', 'ungu', 'coklat', 'cokelat', # Tambah 'cokelat'
-                      'abu', 'pink', 'gold', 'silver', 'cream', 'navy', 'maroon', 'random',
-                      'army', 'olive', 'mocca', 'dusty', 'sage'}
+    color_keywords = WARNA_KEYWORDS_DAMA
     # Keywords produk yang warnanya dipertahankan
-    hijab_keywords = {'HIJAB', 'PASHMINA', 'PASMINA'}
+    hijab_keywords = HIJAB_KEYWORDS_DAMA
     # Keywords/patterns lain yang selalu dipertahankan
     keep_keywords = {'HVS', 'QPP', 'KORAN', 'KK', 'KWARTO', 'BIGBOS', 'ART PAPER'}
     keep_patterns = [r'\b(PAKET\s*\d+)\b', r'\b((A|B)\d{1,2})\b']
@@ -2723,127 +2926,222 @@ def format_variation_dama(variation, product_name):
 
     return ' '.join(unique_parts_ordered)
 
-def get_harga_beli_dama(summary_product_name, katalog_dama_df, score_threshold_primary=80, score_threshold_fallback=75):
+def format_variation_dama_kolom(variasi, nama_produk):
     """
-    Mencari harga beli dari KATALOG_DAMA dengan logika 2-pass (ketat lalu longgar).
-    Pass 1: Fuzzy match nama (>=80) DAN atribut (jenis, ukuran, paket) harus cocok.
-    Pass 2 (Fallback): Jika Pass 1 gagal, cari fuzzy match nama (>=75) saja.
+    Versi kolom format_variation_dama + pembuatan 'Nama Produk Display' (hasil sama persis).
+    Dihitung sekali per pasangan unik (variasi, produk): token variasi di-explode,
+    diklasifikasi sekaligus, lalu digabung lagi per pasangan dan dipetakan balik ke tiap baris.
+    Return DataFrame ['Formatted Variation', 'Nama Produk Display'] dengan index input.
     """
-    try:
-        if pd.isna(summary_product_name) or not summary_product_name.strip():
-            return 0
-
-        # 1. Parse Nama Produk Summary
-        base_name = summary_product_name.strip()
-        variasi_part = ''
-        match = re.match(r'^(.*?)\s*\((.*?)\)$', summary_product_name.strip())
-        if match:
-            base_name = match.group(1).strip()
-            variasi_part = match.group(2).strip().upper()
-
-        base_name_upper_clean = re.sub(r'\s+', ' ', base_name.upper()).strip()
+    pasangan = pd.DataFrame({'variasi': variasi.to_numpy(dtype=object), 'produk': nama_produk.to_numpy(dtype=object)})
+    kode = pasangan.groupby(['variasi', 'produk'], sort=False, dropna=False).ngroup().to_numpy()
+    unik = pasangan.drop_duplicates().reset_index(drop=True)
+
+    # str() hanya per nilai unik (NaN produk → 'nan', sama seperti versi per baris)
+    produk_str = unik['produk'].map(str)
+    # Abaikan variasi kosong / hanya '0'
+    var_str = unik['variasi'].map(lambda v: '' if pd.isna(v) else str(v).strip())
+    var_str = var_str.mask(var_str == '0', '')
+
+    # Warna hanya dipertahankan untuk produk Hijab/Pashmina
+    pola_hijab = '|'.join(re.escape(k) for k in HIJAB_KEYWORDS_DAMA)
+    keep_color = produk_str.str.upper().str.contains(pola_hijab, regex=True).to_numpy(dtype=bool)
+
+    parts = var_str.str.split(r'[\s,]+', regex=True).explode() # Index = nomor pasangan unik
+    parts = parts[parts.notna() & (parts != '') & (parts != '0')]
+    is_color = parts.str.lower().isin(WARNA_KEYWORDS_DAMA).to_numpy(dtype=bool)
+    parts = parts[~is_color | keep_color[parts.index.to_numpy()]]
+    parts = parts.mask(parts.str.upper() == 'KK', 'KORAN') # Map KK ke KORAN
+
+    # Hilangkan duplikat per pasangan sambil mempertahankan urutan
+    parts = parts.rename('part').rename_axis('pasangan').reset_index().drop_duplicates().set_index('pasangan')['part']
+    formatted = parts.groupby(level=0, sort=False).agg(' '.join).reindex(range(len(unik)), fill_value='').astype(object)
+    display = unik['produk'].where(formatted == '', produk_str + ' (' + formatted + ')')
+
+    return pd.DataFrame({
+        'Formatted Variation': formatted.to_numpy(dtype=object)[kode],
+        'Nama Produk Display': display.to_numpy(dtype=object)[kode]
+    }, index=variasi.index)
+
+def parse_nama_summary_dama(summary_product_name):
+    """
+    Memecah nama produk SUMMARY DAMA ('Nama (Variasi)') menjadi nama dasar
+    dan atribut variasi untuk pencocokan ke KATALOG_DAMA.
+    Return dict, atau None jika nama kosong.
+    """
+    if pd.isna(summary_product_name) or not summary_product_name.strip():
+        return None
 
-        # 2. Ekstrak Atribut dari Variasi Part
-        ukuran_in_var = ''
-        jenis_in_var = ''
-        paket_in_var = ''
+    # 1. Parse Nama Produk Summary
+    base_name = summary_product_name.strip()
+    variasi_part = ''
+    match = re.match(r'^(.*?)\s*\((.*?)\)$', summary_product_name.strip())
+    if match:
+        base_name = match.group(1).strip()
+        variasi_part = match.group(2).strip().upper()
+
+    base_name_upper_clean = re.sub(r'\s+', ' ', base_name.upper()).strip()
+
+    # 2. Ekstrak Atribut dari Variasi Part
+    ukuran_in_var = ''
+    jenis_in_var = ''
+    paket_in_var = ''
+
+    size_match = re.search(r'\b((A|B)\d{1,2})\b', variasi_part)
+    if size_match: ukuran_in_var = size_match.group(1)
+
+    paper_keywords = {'HVS', 'QPP', 'KORAN', 'KK', 'KWARTO', 'BIGBOS', 'ART PAPER'}
+    variasi_words = set(re.split(r'\s+', variasi_part))
+    for paper in paper_keywords:
+        if paper in variasi_words:
+            jenis_in_var = 'KORAN' if paper == 'KK' else paper
+            break
+
+    package_match = re.search(r'\b(PAKET\s*\d+)\b', variasi_part)
+    if package_match: 
+        # Normalisasi spasi, misal "PAKET  10" atau "PAKET 10" menjadi "PAKET 10"
+        paket_in_var = re.sub(r'\s+', ' ', package_match.group(1)).strip()
+
+    warna_in_var = ''
+    color_keywords_set = {'MERAH', 'BIRU', 'HIJAU', 'KUNING', 'HITAM', 'PUTIH', 'UNGU', 'COKLAT', 'COKELAT',
+                          'ABU', 'PINK', 'GOLD', 'SILVER', 'CREAM', 'NAVY', 'MAROON', 'RANDOM',
+                          'ARMY', 'OLIVE', 'MOCCA', 'DUSTY', 'SAGE'}
+    found_colors = variasi_words.intersection(color_keywords_set)
+    if found_colors:
+        warna_in_var = list(found_colors)[0] # Ambil warna pertama yang ditemukan
+
+    # Tentukan apakah pencocokan warna diperlukan
+    hijab_keywords = {'PASHMINA', 'HIJAB', 'PASMINA'}
+    match_warna_required = any(keyword in base_name_upper_clean for keyword in hijab_keywords)
+
+    return {
+        'nama': base_name_upper_clean,
+        'jenis': jenis_in_var,
+        'ukuran': ukuran_in_var,
+        'paket': paket_in_var,
+        # Warna hanya dicek untuk produk HIJAB/PASHMINA
+        'warna': warna_in_var if match_warna_required else None,
+    }
 
-        size_match = re.search(r'\b((A|B)\d{1,2})\b', variasi_part)
-        if size_match: ukuran_in_var = size_match.group(1)
+def build_dama_index(katalog_dama_df):
+    """
+    Index KATALOG_DAMA: posisi baris dikelompokkan per (jenis, ukuran, paket, warna),
+    plus daftar nama & harga untuk scoring vektor.
+    """
+    buckets = {}
+    kunci_baris = zip(
+        katalog_dama_df["JENIS AL QUR'AN"], katalog_dama_df['UKURAN'],
+        katalog_dama_df['PAKET'], katalog_dama_df['WARNA']
+    )
+    for pos, kunci in enumerate(kunci_baris):
+        buckets.setdefault(kunci, []).append(pos)
+    return {
+        'nama': katalog_dama_df['NAMA PRODUK'].tolist(),
+        'harga': katalog_dama_df['HARGA'].to_numpy(),
+        'buckets': {kunci: np.array(pos_list) for kunci, pos_list in buckets.items()},
+    }
 
-        paper_keywords = {'HVS', 'QPP', 'KORAN', 'KK', 'KWARTO', 'BIGBOS', 'ART PAPER'}
-        variasi_words = set(re.split(r'\s+', variasi_part))
-        for paper in paper_keywords:
-            if paper in variasi_words:
-                jenis_in_var = 'KORAN' if paper == 'KK' else paper
-                break
+def cari_kandidat_dama(dama_index, jenis, ukuran, paket, warna):
+    """Posisi baris katalog (urut) yang atributnya lolos cek ketat (Pass 1)."""
+    posisi = [
+        pos for (k_jenis, k_ukuran, k_paket, k_warna), pos in dama_index['buckets'].items()
+        if k_paket == paket
+        and (not jenis or k_jenis == jenis)
+        and (not ukuran or k_ukuran == ukuran)
+        and (warna is None or k_warna == warna)
+    ]
+    if not posisi:
+        return np.array([], dtype=int)
+    return np.sort(np.concatenate(posisi))
 
-        package_match = re.search(r'\b(PAKET\s*\d+)\b', variasi_part)
-        if package_match: 
-            # Bersihkan spasi agar "PAKET 10" menjadi "PAKET10" untuk pencocokan
-            # Normalisasi spasi, misal "PAKET  10" atau "PAKET 10" menjadi "PAKET 10"
-            paket_in_var = re.sub(r'\s+', ' ', package_match.group(1)).strip()
-        
-        # --- ▼▼▼ TAMBAHKAN BLOK INI ▼▼▼ ---
-        warna_in_var = ''
-        color_keywords_set = {'MERAH', 'BIRU', 'HIJAU', 'KUNING', 'HITAM', 'PUTIH', 'UNGU', 'COKLAT', 'COKELAT',
-                              'ABU', 'PINK', 'GOLD', 'SILVER', 'CREAM', 'NAVY', 'MAROON', 'RANDOM',
-                              'ARMY', 'OLIVE', 'MOCCA', 'DUSTY', 'SAGE'}
-        # variasi_words sudah didefinisikan di atas (saat cek paper_keywords)
-        found_colors = variasi_words.intersection(color_keywords_set)
-        if found_colors:
-            warna_in_var = list(found_colors)[0] # Ambil warna pertama yang ditemukan
-        
-        # Tentukan apakah pencocokan warna diperlukan
-        hijab_keywords = {'PASHMINA', 'HIJAB', 'PASMINA'}
-        match_warna_required = any(keyword in base_name_upper_clean for keyword in hijab_keywords)
+def get_harga_beli_dama_batch(daftar_nama_produk, katalog_dama_df, dama_index=None, score_threshold_primary=80, score_threshold_fallback=75):
+    """
+    Versi batch dari get_harga_beli_dama (logika 2-pass sama persis).
+    Pass 1 hanya menskor bucket katalog yang atributnya cocok,
+    Pass 2 (fallback) menskor seluruh katalog dalam satu panggilan cdist.
+    Nama yang sudah pernah dicocokkan ke versi katalog yang sama diambil dari match cache.
+    """
+    daftar_nama_produk = list(daftar_nama_produk)
+    hasil = [0] * len(daftar_nama_produk)
+    if katalog_dama_df is None or katalog_dama_df.empty:
+        return hasil
+
+    def parse_aman(nama):
+        try:
+            p = parse_nama_summary_dama(nama)
+            return (p['nama'], p['jenis'], p['ukuran'], p['paket'], p['warna']) if p else None
+        except Exception:
+            return None
+    parsed = apply_per_nilai_unik(pd.Series(daftar_nama_produk, dtype=object), parse_aman).tolist()
+    query_unik = list(dict.fromkeys(p for p in parsed if p is not None))
+    if not query_unik:
+        return hasil
+
+    # Kunci cache: (nama dasar, jenis|ukuran|paket|warna dari variasi)
+    mesin = f"DAMA:{VERSI_MATCHER}:{score_threshold_primary}:{score_threshold_fallback}"
+    katalog_hash = get_katalog_hash(katalog_dama_df)
+    kunci_query = {q: (q[0], '|'.join('*' if x is None else x for x in q[1:])) for q in query_unik}
+    cache = baca_match_cache(mesin, katalog_hash, list(kunci_query.values()))
+    hasil_query = {q: cache[kunci_query[q]] for q in query_unik if kunci_query[q] in cache}
+    query_baru = [q for q in query_unik if q not in hasil_query]
+
+    if query_baru:
+        if dama_index is None:
+            dama_index = build_dama_index(katalog_dama_df)
+        nama_katalog = dama_index['nama']
+        harga_katalog = dama_index['harga']
+        hasil_baru = {}
+
+        # --- Pass 1: kelompokkan per kombinasi atribut, skor hanya bucket yang cocok ---
+        grup_atribut = {}
+        for q in query_baru:
+            grup_atribut.setdefault(q[1:], []).append(q)
+
+        perlu_fallback = []
+        for atribut, daftar_q in grup_atribut.items():
+            kandidat = cari_kandidat_dama(dama_index, *atribut)
+            if len(kandidat) == 0:
+                perlu_fallback.extend(daftar_q)
+                continue
+            skor_matrix = cdist([q[0] for q in daftar_q], [nama_katalog[k] for k in kandidat], scorer=fuzz.token_set_ratio, dtype=np.float64, workers=-1)
+            for skor, q in zip(skor_matrix, daftar_q):
+                terbaik = int(np.argmax(skor)) # argmax = baris pertama dengan skor tertinggi
+                if skor[terbaik] >= score_threshold_primary:
+                    baris = int(kandidat[terbaik])
+                    hasil_baru[q] = (baris, float(skor[terbaik]), float(harga_katalog[baris]))
+                else:
+                    perlu_fallback.append(q)
+
+        # --- Pass 2: fallback ke seluruh katalog, satu matriks untuk semua nama sisa ---
+        if perlu_fallback:
+            skor_matrix = cdist([q[0] for q in perlu_fallback], nama_katalog, scorer=fuzz.token_set_ratio, dtype=np.float64, workers=-1)
+            for skor, q in zip(skor_matrix, perlu_fallback):
+                terbaik = int(np.argmax(skor))
+                if skor[terbaik] >= score_threshold_fallback:
+                    hasil_baru[q] = (terbaik, float(skor[terbaik]), float(harga_katalog[terbaik]))
+                else:
+                    hasil_baru[q] = (-1, float(skor[terbaik]), 0)
 
-        
-        # --- Inisialisasi untuk 2-Pass ---
-        best_strict_score = -1
-        best_strict_price = 0
-        
-        best_fallback_score = -1
-        best_fallback_price = 0
-
-        # 3. Iterasi Katalog Dama
-        for index, row in katalog_dama_df.iterrows():
-            katalog_name = row['NAMA PRODUK']
-            katalog_jenis = row["JENIS AL QUR'AN"]
-            katalog_ukuran = row['UKURAN']
-            katalog_paket = row['PAKET']
-            katalog_warna = row['WARNA']
-            
-            # Hitung Skor Nama (Fuzzy Match)
-            name_score = fuzz.token_set_ratio(base_name_upper_clean, katalog_name)
-
-            # --- Pass 1: Cek Logika Ketat (Primary Threshold) ---
-            if name_score >= score_threshold_primary:
-                match_ok = True # Asumsikan cocok
-
-                # Cek Atribut: Hanya filter JIKA atribut ada di variasi
-                if jenis_in_var and katalog_jenis != jenis_in_var:
-                    match_ok = False
-                if ukuran_in_var and katalog_ukuran != ukuran_in_var:
-                    match_ok = False
-                
-                # Logika Paket: Harus sama persis, atau keduanya kosong
-                if paket_in_var != katalog_paket:
-                    match_ok = False
-
-                if match_warna_required:
-                    # Ini adalah produk HIJAB/PASHMINA.
-                    # Pengecekan ketat: Warna di variasi (warna_in_var) HARUS SAMA
-                    # dengan warna di katalog (katalog_warna).
-                    if katalog_warna != warna_in_var:
-                        match_ok = False
-
-                # Jika semua cek atribut lolos
-                if match_ok:
-                    if name_score > best_strict_score:
-                        best_strict_score = name_score
-                        best_strict_price = row['HARGA']
-
-            # --- Pass 2: Simpan Skor Fallback ---
-            if name_score >= score_threshold_fallback:
-                if name_score > best_fallback_score:
-                    best_fallback_score = name_score
-                    best_fallback_price = row['HARGA']
-
-        # 4. Kembalikan Hasil
-        # Prioritaskan hasil dari Pass 1 (strict)
-        if best_strict_score != -1: # Jika ada kecocokan ketat
-            return best_strict_price
-        
-        # Jika tidak ada kecocokan ketat, gunakan hasil Pass 2 (fallback)
-        if best_fallback_score != -1:
-            return best_fallback_price
+        hasil_query.update(hasil_baru)
+        simpan_match_cache(mesin, katalog_hash, {kunci_query[q]: v for q, v in hasil_baru.items()})
 
-        # Jika tidak ada yang cocok sama sekali
-        return 0
+    for i, p in enumerate(parsed):
+        if p is not None:
+            hasil[i] = hasil_query[p][2]
+    return hasil
 
-    except Exception as e:
-        # st.error(f"Error di get_harga_beli_dama for '{summary_product_name}': {e}")
+def get_harga_beli_dama(summary_product_name, katalog_dama_df, score_threshold_primary=80, score_threshold_fallback=75):
+    """
+    Mencari harga beli dari KATALOG_DAMA dengan logika 2-pass (ketat lalu longgar).
+    Pass 1: Fuzzy match nama (>=80) DAN atribut (jenis, ukuran, paket) harus cocok.
+    Pass 2 (Fallback): Jika Pass 1 gagal, cari fuzzy match nama (>=75) saja.
+    """
+    try:
+        return get_harga_beli_dama_batch(
+            [summary_product_name], katalog_dama_df,
+            score_threshold_primary=score_threshold_primary, score_threshold_fallback=score_threshold_fallback
+        )[0]
+    except Exception:
         return 0
 
 def get_eksemplar_multiplier_dama(nama_produk):
@@ -2860,7 +3158,7 @@ def get_eksemplar_multiplier_dama(nama_produk):
     return 1
     
 # --- TAMBAHKAN FUNGSI BARU INI ---
-def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom_tlj_df, offline_rows=None): # Tambah katalog_dama_df
+def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom_tlj_df, offline_rows=None, dama_index=None, store_choice="DAMA.ID STORE"): # Tambah katalog_dama_df
     """
     Fungsi untuk memproses sheet 'SUMMARY' KHUSUS untuk DAMA.ID STORE (Shopee).
     Menggabungkan Nama Produk + Variasi Relevan (tanpa warna kecuali Hijab).
@@ -2883,16 +3181,10 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
     rekap_copy['Nama Produk Original'] = rekap_copy['Nama Produk']
     if 'Nama Variasi' in rekap_copy.columns:
         # Terapkan fungsi format variasi baru
-        rekap_copy['Formatted Variation'] = rekap_copy.apply(
-            lambda row: format_variation_dama(row['Nama Variasi'], row['Nama Produk Original']),
-            axis=1
-        )
-        # Buat Nama Produk Display
-        rekap_copy['Nama Produk Display'] = rekap_copy.apply(
-            lambda row: f"{row['Nama Produk Original']} ({row['Formatted Variation']})"
-                        if row['Formatted Variation'] else row['Nama Produk Original'],
-            axis=1
-        )
+        # Sekaligus buat Nama Produk Display, dihitung per pasangan unik (variasi, produk)
+        variasi_display = format_variation_dama_kolom(rekap_copy['Nama Variasi'], rekap_copy['Nama Produk Original'])
+        rekap_copy['Formatted Variation'] = variasi_display['Formatted Variation']
+        rekap_copy['Nama Produk Display'] = variasi_display['Nama Produk Display']
     else:
          rekap_copy['Nama Produk Display'] = rekap_copy['Nama Produk Original']
          rekap_copy['Formatted Variation'] = ''
@@ -2960,11 +3252,10 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
             mask_summary = summary_df['Nama Produk'].str.contains(produk_base, case=False, na=False, regex=False)
             indices = summary_df[mask_summary].index
             
-            for idx in indices:
-                p_name = summary_df.at[idx, 'Nama Produk']
-                count_same = (summary_df['Nama Produk'] == p_name).sum()
-                mult = get_eksemplar_multiplier_dama(p_name)
-                summary_df.at[idx, 'Iklan Klik'] = (mult * total_biaya_iklan) / denom / count_same
+            p_names = summary_df.loc[indices, 'Nama Produk']
+            count_same = p_names.map(summary_df['Nama Produk'].value_counts()).to_numpy()
+            mult = get_eksemplar_multiplier_kolom(p_names, dama=True)
+            summary_df.loc[indices, 'Iklan Klik'] = (mult * total_biaya_iklan) / denom / count_same
             
             iklan_data = iklan_data[~iklan_data['Nama Iklan'].str.contains(produk_base, case=False, na=False, regex=False)]
 
@@ -3022,10 +3313,7 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
     # summary_df['Penjualan Netto'] = summary_df['Total Penghasilan']
     summary_df['Biaya Packing'] = summary_df['Jumlah Terjual'] * 200
 
-    summary_df['Jumlah Eksemplar'] = summary_df.apply(
-        lambda row: row['Jumlah Terjual'] * get_eksemplar_multiplier_dama(row['Nama Produk']),
-        axis=1
-    )
+    summary_df['Jumlah Eksemplar'] = summary_df['Jumlah Terjual'] * get_eksemplar_multiplier_kolom(summary_df['Nama Produk'], dama=True)
     
     # Terapkan Pengecualian DAMA.ID STORE
     # hijab_keywords_dama = {'PASHMINA', 'HIJAB', 'PASMINA'}
@@ -3038,9 +3326,7 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
     biaya_ekspedisi_final = summary_df['Biaya Ekspedisi']
 
     # --- PANGGIL FUNGSI HARGA BELI BARU ---
-    summary_df['Harga Beli'] = summary_df['Nama Produk'].apply(
-        lambda x: get_harga_beli_dama(x, katalog_dama_df) # Panggil fungsi dama
-    )
+    summary_df['Harga Beli'] = get_harga_beli_dama_batch(summary_df['Nama Produk'], katalog_dama_df, dama_index=dama_index)
     # --- AKHIR PERUBAHAN ---
 
     # Harga Custom & Total Pembelian
@@ -3269,7 +3555,7 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
                     return f"{short_name}{variasi_part}"
             return nama_full_str
     
-        summary_final['Nama Produk'] = summary_final['Nama Produk'].apply(apply_shorten_dama)
+        summary_final['Nama Produk'] = apply_per_nilai_unik(summary_final['Nama Produk'], apply_shorten_dama)
 
     elif store_choice == "Toko Kaliba":
         mapping_kaliba_tiktok = {
@@ -3292,7 +3578,7 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
                     return short_name
             return nama_clean
         
-        summary_final['Nama Produk'] = summary_final['Nama Produk'].apply(apply_shorten_kaliba_tiktok)
+        summary_final['Nama Produk'] = apply_per_nilai_unik(summary_final['Nama Produk'], apply_shorten_kaliba_tiktok)
 
     elif store_choice == "Raka Bookstore":
         mapping_raka_tiktok = {
@@ -3316,7 +3602,7 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
                     return short_name
             return nama_clean
         
-        summary_final['Nama Produk'] = summary_final['Nama Produk'].apply(apply_shorten_raka_tiktok)
+        summary_final['Nama Produk'] = apply_per_nilai_unik(summary_final['Nama Produk'], apply_shorten_raka_tiktok)
     # --- AKHIR LOGIKA PERSINGKAT ---
     
     # Pastikan semua data di kolom Nama Produk menjadi teks agar bisa diurutkan
@@ -3362,9 +3648,9 @@ def process_summary_dama(rekap_df, iklan_final_df, katalog_dama_df, harga_custom
 
     return summary_with_total
 
-def get_harga_beli_fuzzy_tiktok(nama_produk, variasi, katalog_df, score_threshold_primary=80, score_threshold_fallback=75):
+def build_search_term_tiktok(nama_produk, variasi):
     """
-    Mencari harga beli khusus untuk TikTok dengan logika baru:
+    Menyusun kata kunci pencarian harga beli khusus TikTok:
     - Jika ada variasi, hapus semua ukuran (A5, B5, dll.) dari nama produk, lalu gabungkan.
     - Jika tidak ada variasi, gunakan nama produk asli.
     """
@@ -3379,17 +3665,25 @@ def get_harga_beli_fuzzy_tiktok(nama_produk, variasi, katalog_df, score_threshol
         # Hapus semua pola ukuran dari string nama produk
         nama_produk_tanpa_ukuran = re.sub(size_pattern, ' ', nama_produk_clean, flags=re.IGNORECASE).strip()
         # Gabungkan dengan Variasi di depan untuk prioritas pencarian
-        search_term = f"{variasi_clean} {nama_produk_tanpa_ukuran}"
-    else:
-        # Jika tidak ada variasi, gunakan nama produk apa adanya
-        search_term = nama_produk_clean
+        return f"{variasi_clean} {nama_produk_tanpa_ukuran}"
+    # Jika tidak ada variasi, gunakan nama produk apa adanya
+    return nama_produk_clean
 
+def get_harga_beli_fuzzy_tiktok(nama_produk, variasi, katalog_df, score_threshold_primary=80, score_threshold_fallback=75):
+    """
+    Mencari harga beli khusus untuk TikTok (lihat build_search_term_tiktok).
+    """
+    search_term = build_search_term_tiktok(nama_produk, variasi)
     # Panggil fungsi fuzzy matching yang sudah ada dengan search_term yang baru dan lebih bersih
     return get_harga_beli_fuzzy(search_term, katalog_df, score_threshold_primary=score_threshold_primary, score_threshold_fallback=score_threshold_fallback)
     
 def parse_pdf_receipt(pdf_file):
     """Mengekstrak tanggal dan total nominal dari satu file PDF nota Lalamove."""
+    if not fitur_tersedia('pdf'):
+        st.warning(f"Library PDF tidak terinstall, {pdf_file.name} dilewati. Fitur nota resi membutuhkan: pip install pdfplumber")
+        return None
     try:
+        import pdfplumber # Dimuat saat PDF pertama diproses (menarik pdfminer)
         full_text = ""
         with pdfplumber.open(pdf_file) as pdf:
             for page in pdf.pages:
@@ -3421,7 +3715,8 @@ def parse_pdf_receipt(pdf_file):
         return None
 
 # KODE BARU (Ganti seluruh fungsi ini)
-def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_df, store_choice):
+def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_df, store_choice, peringatan=st.warning,
+                         info=st.info):
     """Fungsi untuk memproses dan membuat sheet 'REKAP' untuk TikTok dengan logika baru."""
     # 1. PREPARASI DATA & MERGE AWAL
     order_details_df['ORDER/ADJUSTMENT ID'] = order_details_df['ORDER/ADJUSTMENT ID'].astype(str)
@@ -3450,16 +3745,16 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
         rekap_df.drop_duplicates(subset=key_cols, keep='first', inplace=True)
         rows_after_dedup = len(rekap_df)
         if rows_before_dedup > rows_after_dedup:
-            st.info(f"Menghapus {rows_before_dedup - rows_after_dedup} baris duplikat setelah merge.")
+            info(f"Menghapus {rows_before_dedup - rows_after_dedup} baris duplikat setelah merge.")
     else:
-        st.warning(f"Tidak dapat melakukan de-duplikasi setelah merge: Kolom kunci {key_cols} tidak lengkap.")
+        peringatan(f"Tidak dapat melakukan de-duplikasi setelah merge: Kolom kunci {key_cols} tidak lengkap.")
 
     # 3. FILTER PESANAN BATAL/REFUND & SETTLEMENT NOL (Kode Anda yang sudah ada)
     # ... (Blok filter Cancel/Return Anda) ...
     if 'CANCELLATION/RETURN TYPE' in rekap_df.columns:
         cancelled_orders = rekap_df[rekap_df['CANCELLATION/RETURN TYPE'].fillna('').isin(['Cancel', 'Return/Refund'])]['ORDER ID'].unique()
         if len(cancelled_orders) > 0:
-            st.warning(f"Menghapus {len(cancelled_orders)} pesanan karena status Cancel/Return...")
+            info(f"Menghapus {len(cancelled_orders)} pesanan karena status Cancel/Return...")
             rekap_df = rekap_df[~rekap_df['ORDER ID'].isin(cancelled_orders)].copy()
 
     # ... (Blok filter Total Settlement Amount Anda) ...
@@ -3471,7 +3766,7 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
              orders_after_filter = len(rekap_df['ORDER ID'].unique())
              removed_count = orders_before_filter - orders_after_filter
              if removed_count > 0:
-                 st.warning(f"Menghapus {removed_count} pesanan tambahan karena Total Settlement Amount = 0.")
+                 info(f"Menghapus {removed_count} pesanan tambahan karena Total Settlement Amount = 0.")
 
 
     # 4. EKSTRAKSI VARIASI & PEMBERSIHAN DATA SEBELUM GROUPBY (Kode Anda yang sudah ada)
@@ -3486,22 +3781,18 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
         'TOTAL SETTLEMENT AMOUNT',
         'SKU UNIT ORIGINAL PRICE', 'PRE-ORDER SERVICE FEE', 'AFFILIATE SHOP ADS COMMISSION' # Penting untuk Harga Satuan nanti
     ]
-    for col in cols_to_clean:
-        if col in rekap_df.columns:
-            # Menggunakan regex yang lebih sederhana untuk angka (termasuk desimal jika ada)
-            rekap_df[col] = (rekap_df[col].astype(str)
-                             .str.replace(r'[^\d\.\-]', '', regex=True)) # Izinkan titik dan minus
-            rekap_df[col] = pd.to_numeric(rekap_df[col], errors='coerce').fillna(0).abs() # .abs() sebaiknya di akhir
+    # Izinkan titik dan minus, .abs() di akhir
+    angka_rekap = bersihkan_kolom_angka(rekap_df, {col: 'titik' for col in cols_to_clean}).abs()
+    rekap_df[angka_rekap.columns] = angka_rekap
+
+    # Kolom biaya dari order_details_df (sumber asli) dibersihkan sekaligus, hasil absolut/positif
+    angka_order_details = bersihkan_kolom_angka(
+        order_details_df,
+        {col: 'titik' for col in ['PLATFORM COMMISSION FEE', 'DYNAMIC COMMISSION', 'SHIPPING COST']}
+    ).abs()
 
     if 'PLATFORM COMMISSION FEE' in order_details_df.columns:
-        order_details_df['PLATFORM COMMISSION FEE CLEAN'] = (
-            order_details_df['PLATFORM COMMISSION FEE'].astype(str)
-            .str.replace(r'[^\d\.\-]', '', regex=True)
-        )
-        order_details_df['PLATFORM COMMISSION FEE NUM'] = (
-            pd.to_numeric(order_details_df['PLATFORM COMMISSION FEE CLEAN'], errors='coerce')
-            .fillna(0).abs()
-        )
+        order_details_df['PLATFORM COMMISSION FEE NUM'] = angka_order_details['PLATFORM COMMISSION FEE']
         # Agregasi per ORDER/ADJUSTMENT ID (sum karena bisa multiple baris per order)
         platform_comm_map = (
             order_details_df.groupby('ORDER/ADJUSTMENT ID')['PLATFORM COMMISSION FEE NUM']
@@ -3513,19 +3804,12 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
             inplace=True
         )
     else:
-        st.warning("Kolom 'PLATFORM COMMISSION FEE' tidak ditemukan di file Order Details.")
+        peringatan("Kolom 'PLATFORM COMMISSION FEE' tidak ditemukan di file Order Details.")
         platform_comm_map = pd.DataFrame(columns=['ORDER ID', 'Platform Commission Fee'])
 
     # 2. Bersihkan kolom DYNAMIC COMMISSION dari order_details_df (sumber asli)
     if 'DYNAMIC COMMISSION' in order_details_df.columns:
-        order_details_df['DYNAMIC COMMISSION CLEAN'] = (
-            order_details_df['DYNAMIC COMMISSION'].astype(str)
-            .str.replace(r'[^\d\.\-]', '', regex=True)
-        )
-        order_details_df['DYNAMIC COMMISSION NUM'] = (
-            pd.to_numeric(order_details_df['DYNAMIC COMMISSION CLEAN'], errors='coerce')
-            .fillna(0).abs()
-        )
+        order_details_df['DYNAMIC COMMISSION NUM'] = angka_order_details['DYNAMIC COMMISSION']
         # Agregasi per ORDER/ADJUSTMENT ID (sum karena bisa multiple baris per order)
         dynamic_comm_map = (
             order_details_df.groupby('ORDER/ADJUSTMENT ID')['DYNAMIC COMMISSION NUM']
@@ -3537,7 +3821,7 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
             inplace=True
         )
     else:
-        st.warning("Kolom 'DYNAMIC COMMISSION' tidak ditemukan di file Order Details.")
+        peringatan("Kolom 'DYNAMIC COMMISSION' tidak ditemukan di file Order Details.")
         dynamic_comm_map = pd.DataFrame(columns=['ORDER ID', 'Dynamic Commission'])
 
     if 'ORDER CREATED TIME(UTC)' in rekap_df.columns:
@@ -3546,7 +3830,7 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
         created_time_col = 'ORDER CREATED TIME'
     else:
         # Pengaman jika kolom tidak ada
-        st.warning("Kolom 'ORDER CREATED TIME(UTC)' atau 'ORDER CREATED TIME' tidak ditemukan. 'Waktu Pesanan Dibuat' akan kosong.")
+        peringatan("Kolom 'ORDER CREATED TIME(UTC)' atau 'ORDER CREATED TIME' tidak ditemukan. 'Waktu Pesanan Dibuat' akan kosong.")
         rekap_df['ORDER CREATED TIME_MISSING'] = pd.NaT # Buat kolom dummy
         created_time_col = 'ORDER CREATED TIME_MISSING' # Gunakan kolom dummy
         
@@ -3556,7 +3840,7 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
         settled_time_col = 'ORDER SETTLED TIME'
     else:
         # Pengaman jika kolom tidak ada
-        st.warning("Kolom 'ORDER SETTLED TIME(UTC)' atau 'ORDER SETTLED TIME' tidak ditemukan. 'Waktu Dana Dilepas' akan kosong.")
+        peringatan("Kolom 'ORDER SETTLED TIME(UTC)' atau 'ORDER SETTLED TIME' tidak ditemukan. 'Waktu Dana Dilepas' akan kosong.")
         rekap_df['ORDER SETTLED TIME_MISSING'] = pd.NaT # Buat kolom dummy
         settled_time_col = 'ORDER SETTLED TIME_MISSING' # Gunakan kolom dummy
 
@@ -3564,14 +3848,7 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
 
     if 'SHIPPING COST' in order_details_df.columns:
         # Bersihkan format angka dan hilangkan tanda minus (jadi absolute/positif)
-        order_details_df['SHIPPING COST CLEAN'] = (
-            order_details_df['SHIPPING COST'].astype(str)
-            .str.replace(r'[^\d\.\-]', '', regex=True)
-        )
-        order_details_df['SHIPPING COST NUM'] = (
-            pd.to_numeric(order_details_df['SHIPPING COST CLEAN'], errors='coerce')
-            .fillna(0).abs()
-        )
+        order_details_df['SHIPPING COST NUM'] = angka_order_details['SHIPPING COST']
         # Agregasi per ORDER ID (karena 1 order bisa multiple baris)
         shipping_map = (
             order_details_df.groupby('ORDER/ADJUSTMENT ID')['SHIPPING COST NUM']
@@ -3689,11 +3966,11 @@ def process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_d
                 creator_order_all_df.drop(columns=['Variasi_Temp'], inplace=True, errors='ignore')
             else:
                 # Fallback jika kolom tidak ditemukan di semua_pesanan_df
-                st.warning("Kolom 'SKU ID' atau 'VARIATION' tidak ditemukan di file semua pesanan. Komisi affiliate mungkin tidak akurat.")
+                peringatan("Kolom 'SKU ID' atau 'VARIATION' tidak ditemukan di file semua pesanan. Komisi affiliate mungkin tidak akurat.")
                 creator_order_all_df['Variasi_Clean'] = ''
         else:
             # Tidak ada kolom SKU atau ID SKU
-            st.warning("Kolom 'SKU' atau 'ID SKU' tidak ditemukan di file creator order. Komisi affiliate mungkin tidak akurat.")
+            peringatan("Kolom 'SKU' atau 'ID SKU' tidak ditemukan di file creator order. Komisi affiliate mungkin tidak akurat.")
             creator_order_all_df['Variasi_Clean'] = ''
 
         rekap_df = pd.merge(
@@ -3876,10 +4153,11 @@ def process_summary_tiktok(rekap_df, katalog_df, harga_custom_tlj_df, ekspedisi_
     # --- PERUBAHAN DI SINI: Gunakan logika harga beli yang sama dengan Shopee ---
     # Untuk TikTok, kita tidak memiliki 'Nama Variasi' dari file income,
     # jadi kita tidak perlu memberikan rekap_lookup_df. Logika custom akan dilewati.
-    summary_df['Harga Beli'] = summary_df.apply(
-        lambda row: get_harga_beli_fuzzy_tiktok(row['Nama Produk'], row['Variasi'], katalog_df),
-        axis=1
-    )
+    search_terms = [
+        build_search_term_tiktok(nama, variasi)
+        for nama, variasi in zip(summary_df['Nama Produk'], summary_df['Variasi'])
+    ]
+    summary_df['Harga Beli'] = get_harga_beli_fuzzy_batch(search_terms, katalog_df)
     # --- AKHIR PERUBAHAN ---
     
     # --- LOGIKA BARU UNTUK HARGA CUSTOM TLJ (TIKTOK) ---
@@ -4050,7 +4328,7 @@ def process_summary_tiktok(rekap_df, katalog_df, harga_custom_tlj_df, ekspedisi_
             return nama_full_str
         
         # Terapkan mapping
-        summary_final['Nama Produk'] = summary_final['Nama Produk'].apply(apply_shorten_dama_tiktok)
+        summary_final['Nama Produk'] = apply_per_nilai_unik(summary_final['Nama Produk'], apply_shorten_dama_tiktok)
 
     summary_final = summary_final.drop_duplicates(subset=['Nama Produk', 'Variasi', 'Harga Satuan'], keep='first').reset_index(drop=True)
     summary_final = summary_final.sort_values(by='Nama Produk', ascending=True).reset_index(drop=True)
@@ -4136,1650 +4414,1982 @@ def process_ekspedisi_tiktok(summary_df, pdf_data_list):
     final_df = pd.concat([kiri_df, pd.DataFrame(columns=[' ']), kanan_df], axis=1)
     return final_df.fillna('')
     
-# --- TAMPILAN STREAMLIT ---
+BARIS_PER_CHUNK_SEMUA_PESANAN = 50_000 # Baris mentah (tuple) yang ditahan sekaligus sebelum dijadikan DataFrame
 
-st.set_page_config(layout="wide")
-st.title("📊 Rekapanku - Sistem Otomatisasi Laporan")
-
-# --- UI PILIHAN JENIS REKAPAN ---
-st.header("1. Konfigurasi Rekapan")
-jenis_rekapan = st.radio("Pilih Jenis Rekapan:", ["Mingguan", "Bulanan", "Perbandingan Multi-Toko", "Akumulasi Order"], horizontal=True)
-
-if jenis_rekapan == "Bulanan":
-    st.info("Mode Bulanan: Gabungkan 3-4 file SUMMARY mingguan menjadi satu file.")
-    toko_bulanan = st.selectbox("Pilih Toko untuk Rekapan Bulanan:", [
-        "Human Store Shopee", "Pacific Bookstore Shopee", "Dama.id Store Shopee",
-        "Human Store Tiktok", "Pacific Bookstore Tiktok", "Dama.id Store Tiktok",
-        "Raka Bookstore Shopee", "Raka Bookstore Tiktok", "Toko Kaliba Shopee", "Toko Kaliba Tiktok"
-    ])
-    
-    files_mingguan = []
-    col1, col2 = st.columns(2)
-    with col1:
-        f1 = st.file_uploader("Impor Rekapan Minggu 1 (Wajib)", type=["xlsx"])
-        f2 = st.file_uploader("Impor Rekapan Minggu 2 (Wajib)", type=["xlsx"])
-    with col2:
-        f3 = st.file_uploader("Impor Rekapan Minggu 3 (Wajib)", type=["xlsx"])
-        f4 = st.file_uploader("Impor Rekapan Minggu 4 (Opsional)", type=["xlsx"])
-    
-    if st.button("🚀 Proses Rekapan Bulanan"):
-        uploaded_files = [f for f in [f1, f2, f3, f4] if f is not None]
-        if len(uploaded_files) < 3:
-            st.error("Minimal 3 file (Minggu 1, 2, dan 3) harus diunggah!")
-        else:
-            try:
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    for i, file in enumerate(uploaded_files):
-                        # Baca sheet SUMMARY
-                        df_summary = pd.read_excel(file, sheet_name='SUMMARY')
-                        
-                        # Ambil tanggal dari metadata file (jika ada) atau properti Excel
-                        try:
-                            from openpyxl import load_workbook
-                            wb_meta = load_workbook(file)
-                            created_dt = wb_meta.properties.created
-                            tgl_str = created_dt.strftime("%d/%m/%Y") if created_dt else datetime.now().strftime("%d/%m/%Y")
-                        except:
-                            tgl_str = datetime.now().strftime("%d/%m/%Y")
-                        
-                        # Set Header dengan Tanggal
-                        sheet_name = f"SUMMARY {i+1}"
-                        df_summary.to_excel(writer, sheet_name=sheet_name, index=False)
-                        
-                        # Tambahkan Tanggal di baris atas atau sel tertentu (Opsional)
-                        worksheet = writer.sheets[sheet_name]
-                        worksheet.write(0, df_summary.shape[1], f"Tanggal: {tgl_str}")
-                
-                output.seek(0)
-                st.success("✅ Rekapan Bulanan Berhasil!")
-                st.download_button(
-                    label=f"📥 Download Rekapan Bulanan {toko_bulanan}.xlsx",
-                    data=output,
-                    file_name=f"REKAPAN_BULANAN_{toko_bulanan.upper().replace(' ', '_')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+def buat_chunk_semua_pesanan(data_rows, header):
+    """Satu potongan baris 'semua pesanan' → DataFrame; Order ID langsung jadi teks seperti di process_rekap_tiktok."""
+    chunk = pd.DataFrame(data_rows, columns=header)
+    for posisi, col in enumerate(header):
+        if col.upper() == 'ORDER ID':
+            chunk.isetitem(posisi, chunk.iloc[:, posisi].astype(str))
+    return chunk
+
+def load_semua_pesanan_tiktok(uploaded_semua_pesanan):
+    """
+    Membaca sheet aktif file 'semua pesanan' TikTok secara streaming (openpyxl read-only).
+    - Baris pertama yang tidak kosong jadi header (Order ID, Order Status, dst)
+    - Baris deskripsi "Platform unique order ID" tepat setelah header dilewati
+    - Baris kosong dibuang sambil membaca, tanpa menyalin seluruh sheet ke list dulu
+    - DataFrame dibangun per BARIS_PER_CHUNK_SEMUA_PESANAN baris lalu digabung (pd.concat),
+      jadi list tuple mentah yang ditahan di memori tidak pernah sebesar seluruh sheet
+    """
+    wb = load_workbook(uploaded_semua_pesanan, read_only=True, data_only=True)
+    try:
+        rows = (row for row in wb.active.iter_rows(values_only=True) if any(row))
+        header_row = next(rows, None)
+        if header_row is None:
+            raise ValueError("File semua pesanan tidak berisi data.")
+        final_header = [str(x).strip() if x else "" for x in header_row]
+        n_kolom = len(final_header)
+
+        chunks = []
+        data_rows = []
+        for i, row in enumerate(rows):
+            # Cek apakah baris kedua berisi "Platform unique order ID" → lewati kalau iya
+            if i == 0 and any("Platform unique order ID" in str(x) for x in row):
+                continue
+            if len(row) != n_kolom:
+                # Mode read-only bisa memberi panjang baris berbeda jika dimensi sheet tidak lengkap
+                row = tuple(row[:n_kolom]) + (None,) * (n_kolom - len(row))
+            data_rows.append(row)
+            if len(data_rows) >= BARIS_PER_CHUNK_SEMUA_PESANAN:
+                chunks.append(buat_chunk_semua_pesanan(data_rows, final_header))
+                data_rows = []
+    finally:
+        wb.close()
+
+    if data_rows or not chunks:
+        chunks.append(buat_chunk_semua_pesanan(data_rows, final_header))
+    if len(chunks) == 1:
+        return chunks[0]
+    semua_pesanan_df = pd.concat(chunks, ignore_index=True)
+    # Kolom yang di satu chunk kosong semua (None) tapi terisi di chunk lain jadi object setelah concat:
+    # tipenya disimpulkan ulang supaya sama dengan DataFrame yang dibangun sekaligus dari semua baris
+    for posisi in range(n_kolom):
+        tipe_chunk = {chunk.dtypes.iloc[posisi] for chunk in chunks}
+        if len(tipe_chunk) > 1 and semua_pesanan_df.dtypes.iloc[posisi] == object:
+            semua_pesanan_df.isetitem(posisi, semua_pesanan_df.iloc[:, posisi].infer_objects())
+    return semua_pesanan_df
+
+def load_income_shopee(uploaded_income):
+    """
+    Membuka file income Shopee sekali saja (pd.ExcelFile) lalu mengambil semua
+    yang dibutuhkan: sheet 'Penghasilan', sheet 'Seller Fee', dan periode
+    tanggal dari sheet 'Summary' (cell B7 & B8).
+    Return dict: income_df, seller_fee_df (None jika gagal dibaca),
+    seller_fee_error, date_range_str.
+    """
+    with pd.ExcelFile(uploaded_income) as xls:
+        income_df = xls.parse('Penghasilan', skiprows=2)
+
+        seller_fee_df, seller_fee_error = None, None
+        try:
+            seller_fee_df = xls.parse('Seller Fee', skiprows=2)
+        except Exception as e:
+            seller_fee_error = e
+
+        try:
+            # Baca mentah sheet Summary untuk ambil cell B7 dan B8
+            df_date_raw = xls.parse('Summary', header=None, nrows=10, usecols="B")
+            tgl_awal = df_date_raw.iloc[6, 0] # B7
+            tgl_akhir = df_date_raw.iloc[7, 0] # B8
+            date_range_str = get_pretty_date_range(tgl_awal, tgl_akhir)
+        except Exception:
+            date_range_str = ""
+
+    return {
+        'income_df': income_df,
+        'seller_fee_df': seller_fee_df,
+        'seller_fee_error': seller_fee_error,
+        'date_range_str': date_range_str,
+    }
+
+def tulis_dataframe_per_kolom(worksheet, df, start_row):
+    """
+    Tulis isi DataFrame per kolom (write_column) tanpa format sel, supaya format
+    kolom dari set_column yang berlaku. Sel NaN dibiarkan kosong.
+    """
+    for col_num in range(len(df.columns)):
+        kolom = df.iloc[:, col_num]
+        worksheet.write_column(start_row, col_num, kolom.astype(object).where(kolom.notna(), None).tolist())
+
+# --- LOADER KATALOG (DI-CACHE LINTAS SESI & RERUN) ---
+
+KATALOG_HARGA_ONLINE_PATH = 'HARGA ONLINE.xlsx'
+HARGA_CUSTOM_TLJ_PATH = 'Harga Custom TLJ.xlsx'
+KATALOG_DAMA_PATH = 'KATALOG_DAMA.xlsx'
+
+def get_file_fingerprint(path):
+    """Sidik file (mtime, ukuran) untuk kunci cache. FileNotFoundError jika file tidak ada."""
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def hitung_hash_file(path):
+    """SHA-256 isi file, dipakai match cache untuk mengenali versi katalog."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_katalog_harga_online(path, fingerprint):
+    """
+    Membaca HARGA ONLINE.xlsx dan menyiapkan kolom *_NORM untuk fuzzy matching.
+    `fingerprint` hanya kunci cache: file dibaca ulang jika mtime/ukurannya berubah.
+    """
+    katalog_df = pd.read_excel(path)
+
+    # Lakukan preprocessing langsung ke dataframe tunggal
+    katalog_df.columns = [str(c).strip().upper() for c in katalog_df.columns]
+    for col in ["JUDUL AL QUR'AN", "JENIS KERTAS", "UKURAN", "KATALOG HARGA"]:
+        if col not in katalog_df.columns:
+            katalog_df[col] = ""
+    katalog_df['JUDUL_NORM'] = katalog_df["JUDUL AL QUR'AN"].astype(str).str.upper().str.replace(r'[^A-Z0-9\s]', ' ', regex=True)
+    katalog_df['JENIS_KERTAS_NORM'] = katalog_df['JENIS KERTAS'].astype(str).str.upper().str.replace(r'[^A-Z0-9\s]', ' ', regex=True)
+    katalog_df['UKURAN_NORM'] = katalog_df['UKURAN'].astype(str).str.upper().str.replace(r'\s+', '', regex=True)
+    katalog_df['KATALOG_HARGA_NUM'] = pd.to_numeric(katalog_df['KATALOG HARGA'].astype(str).str.replace(r'[^0-9\.]', '', regex=True), errors='coerce').fillna(0)
+    katalog_df.attrs['katalog_hash'] = hitung_hash_file(path)
+    return katalog_df
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_harga_custom_tlj(path, fingerprint):
+    """Membaca Harga Custom TLJ.xlsx dan membuat LOOKUP_KEY (Nama Produk + Variasi)."""
+    harga_custom_tlj_df = pd.read_excel(path)
+
+    # Lakukan preprocessing
+    harga_custom_tlj_df.columns = [str(c).strip().upper() for c in harga_custom_tlj_df.columns]
+
+    # Pastikan kolom yang dibutuhkan ada
+    required_cols = ['NAMA PRODUK', 'VARIASI', 'HARGA CUSTOM TLJ']
+    if not all(col in harga_custom_tlj_df.columns for col in required_cols):
+        raise ValueError(f"File '{path}' harus memiliki kolom: {', '.join(required_cols)}")
+
+    # Buat kolom kunci untuk pencocokan yang mudah (Nama Produk + Variasi)
+    harga_custom_tlj_df['LOOKUP_KEY'] = harga_custom_tlj_df['NAMA PRODUK'].astype(str).str.strip() + ' ' + harga_custom_tlj_df['VARIASI'].astype(str).str.strip()
+
+    # Pastikan kolom harga adalah numerik
+    harga_custom_tlj_df['HARGA CUSTOM TLJ'] = pd.to_numeric(harga_custom_tlj_df['HARGA CUSTOM TLJ'], errors='coerce').fillna(0)
+    return harga_custom_tlj_df
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_katalog_dama(path, fingerprint):
+    """Membaca KATALOG_DAMA.xlsx dan menormalisasi kolom teks untuk pencocokan."""
+    katalog_dama_df = pd.read_excel(path)
+
+    # Lakukan preprocessing
+    katalog_dama_df.columns = [str(c).strip().upper() for c in katalog_dama_df.columns]
+
+    # Pastikan kolom yang dibutuhkan ada
+    required_dama_cols = ['NAMA PRODUK', 'JENIS AL QUR\'AN', 'WARNA', 'UKURAN', 'PAKET', 'HARGA']
+    if not all(col in katalog_dama_df.columns for col in required_dama_cols):
+        raise ValueError(f"File '{path}' harus memiliki kolom: {', '.join(required_dama_cols)}")
+
+    # Konversi kolom harga ke numerik
+    katalog_dama_df['HARGA'] = pd.to_numeric(katalog_dama_df['HARGA'], errors='coerce').fillna(0)
+
+    # Bersihkan dan normalisasi kolom teks untuk pencocokan
+    for col in ['NAMA PRODUK', 'JENIS AL QUR\'AN', 'WARNA', 'UKURAN', 'PAKET']:
+        # Isi NaN dengan string kosong sebelum operasi string
+        katalog_dama_df[col] = katalog_dama_df[col].fillna('').astype(str).str.strip().str.upper()
+        # Hapus spasi ganda
+        katalog_dama_df[col] = katalog_dama_df[col].str.replace(r'\s+', ' ', regex=True)
+    katalog_dama_df.attrs['katalog_hash'] = hitung_hash_file(path)
+    return katalog_dama_df
+
+# Masuk ke kunci match cache: source parser, matcher & loader katalog berubah → hasil lama tidak dipakai lagi
+VERSI_MATCHER = hitung_hash_bytes(repr([
+    UKURAN_PATTERNS_KATALOG, JENIS_KERTAS_MAP,
+    *(inspect.getsource(fungsi) for fungsi in [
+        parse_nama_untuk_katalog, get_harga_beli_fuzzy_batch, load_katalog_harga_online,
+        parse_nama_summary_dama, build_dama_index, cari_kandidat_dama, get_harga_beli_dama_batch, load_katalog_dama,
+    ]),
+]).encode())[:16]
+
+def get_katalog_harga_online(path=KATALOG_HARGA_ONLINE_PATH):
+    return load_katalog_harga_online(path, get_file_fingerprint(path))
+
+def get_harga_custom_tlj(path=HARGA_CUSTOM_TLJ_PATH):
+    return load_harga_custom_tlj(path, get_file_fingerprint(path))
+
+def get_katalog_dama(path=KATALOG_DAMA_PATH):
+    return load_katalog_dama(path, get_file_fingerprint(path))
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def load_dama_index(path, fingerprint):
+    """Index KATALOG_DAMA (lihat build_dama_index), dibangun sekali per versi file."""
+    return build_dama_index(load_katalog_dama(path, fingerprint))
+
+def get_dama_index(path=KATALOG_DAMA_PATH):
+    return load_dama_index(path, get_file_fingerprint(path))
+
+# --- WARM-UP LATAR (SEKALI PER PROSES SERVER) ---
+
+def warmup_ocr():
+    """
+    Muat easyocr.Reader di satu worker sekarang, bukan saat gambar pertama di-upload.
+    Cukup satu: tiap reader makan beberapa GB, worker lain baru dibuat kalau OCR benar-benar dipakai.
+    """
+    get_ocr_executor().submit(ocr_worker.siap).result()
+
+def warmup_katalog():
+    """Isi cache loader katalog & index DAMA agar run pertama tidak membaca Excel."""
+    get_katalog_harga_online()
+    get_harga_custom_tlj()
+    get_katalog_dama()
+    get_dama_index()
+
+@st.cache_resource(show_spinner=False)
+def mulai_warmup():
+    """
+    Jalankan warm-up di thread latar, sekali per proses (sesi pertama yang membuka app).
+    Return dict status {nama resource: 'memuat...' | 'siap' | 'gagal: ...'} yang diperbarui thread.
+    """
+    tugas = []
+    status = {}
+    if OCR_AVAILABLE:
+        tugas.append(("Model OCR", warmup_ocr))
+        status["Model OCR"] = "memuat..."
+    else:
+        status["Model OCR"] = "tidak terinstall"
+    tugas.append(("Katalog", warmup_katalog))
+    status["Katalog"] = "memuat..."
+
+    def jalankan():
+        for nama, fungsi in tugas:
+            try:
+                fungsi()
+                status[nama] = "siap"
             except Exception as e:
-                st.error(f"Error Bulanan: {e}")
-    st.stop() # Hentikan eksekusi di sini agar tidak masuk ke logika mingguan di bawah
-
-elif jenis_rekapan == "Perbandingan Multi-Toko":
-    st.info("Mode Perbandingan: Bandingkan beberapa toko dalam satu periode (Shopee & TikTok).")
-    
-    # --- INPUT SUMMARY SHOPEE ---
-    st.subheader("📦 Import File SUMMARY Shopee")
-    st.caption("Upload file SUMMARY Shopee dari tiap toko (satu file per toko)")
-    
-    # Dictionary untuk menyimpan file per toko
-    shopee_files = {}
-    col_s1, col_s2, col_s3 = st.columns(3)
-    with col_s1:
-        shopee_files['Raka Bookstore'] = st.file_uploader("SUMMARY Raka Bookstore Shopee", type=["xlsx"], key="comp_raka_shopee")
-        shopee_files['Toko Monang'] = st.file_uploader("SUMMARY Toko Monang Shopee", type=["xlsx"], key="comp_monang_shopee")
-        shopee_files['DAMA.ID STORE'] = st.file_uploader("SUMMARY DAMA.ID STORE Shopee", type=["xlsx"], key="comp_dama_shopee")
-    with col_s2:
-        shopee_files['Toko Kaliba'] = st.file_uploader("SUMMARY Toko Kaliba Shopee", type=["xlsx"], key="comp_kaliba_shopee")
-        shopee_files['Toko Serayu'] = st.file_uploader("SUMMARY Toko Serayu Shopee", type=["xlsx"], key="comp_serayu_shopee")
-    with col_s3:
-        # Tambahkan toko lain jika perlu
-        shopee_files['Human Store'] = st.file_uploader("SUMMARY Human Store Shopee", type=["xlsx"], key="comp_human_shopee")
-        shopee_files['Pacific Bookstore'] = st.file_uploader("SUMMARY Pacific Bookstore Shopee", type=["xlsx"], key="comp_pacific_shopee")
-    
-    # --- INPUT SUMMARY TIKTOK ---
-    st.subheader("🎵 Import File SUMMARY TikTok")
-    st.caption("Upload file SUMMARY TikTok dari tiap toko (satu file per toko)")
-    
-    tiktok_files = {}
-    col_t1, col_t2, col_t3 = st.columns(3)
-    with col_t1:
-        tiktok_files['Raka Bookstore'] = st.file_uploader("SUMMARY Raka Bookstore TikTok", type=["xlsx"], key="comp_raka_tiktok")
-        tiktok_files['Toko Monang'] = st.file_uploader("SUMMARY Toko Monang TikTok", type=["xlsx"], key="comp_monang_tiktok")
-        tiktok_files['DAMA.ID STORE'] = st.file_uploader("SUMMARY DAMA.ID STORE TikTok", type=["xlsx"], key="comp_dama_tiktok")
-    with col_t2:
-        tiktok_files['Toko Kaliba'] = st.file_uploader("SUMMARY Toko Kaliba TikTok", type=["xlsx"], key="comp_kaliba_tiktok")
-        tiktok_files['Toko Serayu'] = st.file_uploader("SUMMARY Toko Serayu TikTok", type=["xlsx"], key="comp_serayu_tiktok")
-    with col_t3:
-        tiktok_files['Human Store'] = st.file_uploader("SUMMARY Human Store TikTok", type=["xlsx"], key="comp_human_tiktok")
-        tiktok_files['Pacific Bookstore'] = st.file_uploader("SUMMARY Pacific Bookstore TikTok", type=["xlsx"], key="comp_pacific_tiktok")
-    
-    # --- TOMBOL PROSES ---
-    if st.button("🚀 Proses Perbandingan Multi-Toko"):
-        # Validasi: minimal ada 1 file
-        valid_shopee = {k: v for k, v in shopee_files.items() if v is not None}
-        valid_tiktok = {k: v for k, v in tiktok_files.items() if v is not None}
-        
-        if not valid_shopee and not valid_tiktok:
-            st.error("Minimal upload 1 file SUMMARY (Shopee atau TikTok)!")
+                status[nama] = f"gagal: {e}"
+
+    thread = threading.Thread(target=jalankan, name="warmup", daemon=True)
+    add_script_run_ctx(thread) # Cache Streamlit dipanggil dari thread ini
+    thread.start()
+    return status
+
+# --- INSTRUMENTASI TAHAP PIPELINE (WAKTU, CPU, MEMORI, JUMLAH BARIS) ---
+
+RUN_LOG_PATH = 'run_log.jsonl' # Satu baris JSON per run, untuk membandingkan toko & minggu
+
+def reset_peak_rss():
+    """
+    Reset high-water mark RSS proses (Linux: tulis 5 ke /proc/self/clear_refs) di awal tahap.
+    Return False jika tidak didukung (OS lain / kernel lama): puncak tahap itu dicatat None.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5') # 5 = reset VmHWM ke RSS saat ini
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """VmHWM proses (MB) sejak reset_peak_rss terakhir; None jika tidak terbaca."""
+    try:
+        with open('/proc/self/status') as f:
+            for baris in f:
+                if baris.startswith('VmHWM:'):
+                    return round(int(baris.split()[1]) / 1024, 1) # Satuan kB
+    except OSError:
+        pass
+    return None
+
+def jumlah_baris(*dfs):
+    return sum(len(df) for df in dfs)
+
+@contextmanager
+def ukur_tahap(catatan_tahap, nama, baris_masuk=None):
+    """
+    Ukur satu tahap pipeline lalu tambahkan hasilnya ke list catatan_tahap:
+    durasi wall-clock & CPU, puncak RSS selama tahap (lihat reset_peak_rss), jumlah baris masuk/keluar.
+    Isi tahap['Baris Keluar'] di dalam blok with. Tahap yang error tetap tercatat.
+    Catatan: CPU time & peak RSS milik seluruh proses. Di server Streamlit sesi lain ikut terhitung,
+    dan reset dari tahap sesi lain bisa membuat puncak tahap ini tercatat lebih kecil.
+    """
+    tahap = {'Tahap': nama, 'Baris Masuk': baris_masuk, 'Baris Keluar': None}
+    rss_direset = reset_peak_rss()
+    mulai_wall, mulai_cpu = time.perf_counter(), time.process_time()
+    try:
+        yield tahap
+    finally:
+        tahap['Detik'] = round(time.perf_counter() - mulai_wall, 3)
+        tahap['CPU (detik)'] = round(time.process_time() - mulai_cpu, 3)
+        tahap['Peak RSS Proses (MB)'] = peak_rss_mb() if rss_direset else None
+        catatan_tahap.append(tahap)
+
+def simpan_run_log(catatan_tahap, marketplace_choice, store_choice, date_range_str, sumber='ui', path=RUN_LOG_PATH):
+    """Tambahkan satu run (semua tahap) ke file JSON-lines run log."""
+    baris = {
+        'waktu': datetime.now().isoformat(timespec='seconds'),
+        'sumber': sumber,
+        'marketplace': marketplace_choice,
+        'toko': store_choice,
+        'periode': date_range_str,
+        'total_detik': round(sum(t['Detik'] for t in catatan_tahap), 3),
+        'tahap': catatan_tahap,
+    }
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(baris, ensure_ascii=False) + '\n')
+    except OSError:
+        pass # Run log hanya untuk analisis, kegagalan tulis tidak boleh menghentikan proses
+
+# --- PIPELINE REKAP MINGGUAN (DIPAKAI UI & CLI rekap_batch.py) ---
+
+TOKO_PER_MARKETPLACE = {
+    "Shopee": ("Human Store", "Pacific Bookstore", "DAMA.ID STORE", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"),
+    "TikTok": ("Human Store", "DAMA.ID STORE", "Pacific Bookstore", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"),
+}
+
+# Konfigurasi file opsional per toko
+OPTIONAL_FILES_SHOPEE = {
+    'seller_conversion': ['Raka Bookstore', 'Toko Kaliba', 'Toko Monang', 'Toko Serayu'],
+    'iklan': ['Raka Bookstore', 'Toko Kaliba', 'Toko Monang', 'Toko Serayu']
+}
+
+def is_file_optional_shopee(file_type, store):
+    """Cek apakah file tertentu opsional untuk toko tertentu di Shopee"""
+    return store in OPTIONAL_FILES_SHOPEE.get(file_type, [])
+
+# Konfigurasi file opsional per toko untuk TikTok
+OPTIONAL_FILES_TIKTOK = {
+    'creator_order': ['Raka Bookstore', 'Toko Kaliba', 'Human Store', 'Pacific Bookstore', 'DAMA.ID STORE', 'Toko Monang', 'Toko Serayu'],
+    'product_data': ['Raka Bookstore', 'Toko Kaliba', 'Human Store', 'Pacific Bookstore', 'DAMA.ID STORE', 'Toko Monang', 'Toko Serayu']
+    # 'pdf_resi': ['Raka Bookstore', 'Toko Kaliba', 'Human Store']  # Jika juga ingin PDF opsional
+}
+
+def is_file_optional_tiktok(file_type, store):
+    """Cek apakah file tertentu opsional untuk toko tertentu di TikTok"""
+    return store in OPTIONAL_FILES_TIKTOK.get(file_type, [])
+
+def tanpa_progres(persen, teks):
+    pass # Default callback progres: tidak menampilkan apa-apa
+
+def nama_file_output(marketplace_choice, store_choice, date_range_str):
+    suffix_tgl = f" {date_range_str}" if date_range_str else ""
+    return f"Rekapanku_{marketplace_choice}_{store_choice}_{suffix_tgl}.xlsx"
+
+def baca_file_shopee(uploaded_order, uploaded_income, uploaded_iklan, uploaded_seller, peringatan=st.warning, info=st.info):
+    """
+    Baca & siapkan file export Shopee (income: filter Order, mapping kolom baru, Biaya Layanan
+    dari Seller Fee). Iklan & seller conversion boleh None (diganti DataFrame kosong).
+    Return (order_all_df, income_dilepas_df, iklan_produk_df, seller_conversion_df, date_range_str).
+    """
+    order_all_df = pd.read_excel(uploaded_order, dtype={'Harga Setelah Diskon': str, 'Subtotal Pesanan': str})
+    # income_dilepas_df = pd.read_excel(uploaded_income, sheet_name='Income', skiprows=5)
+    # Workbook income dibuka sekali: Penghasilan, Seller Fee & tanggal Summary B7/B8
+    income_bundle = load_income_shopee(uploaded_income)
+    income_dilepas_df = income_bundle['income_df']
+
+    # 2. Filter hanya baris 'Order'
+    if 'Lihat berdasarkan' in income_dilepas_df.columns:
+        income_dilepas_df = income_dilepas_df[
+            income_dilepas_df['Lihat berdasarkan'].astype(str).str.strip() == 'Order'
+        ].copy()
+
+    # 3. Bersihkan nama kolom (strip spasi)
+    income_dilepas_df.columns = [str(c).strip() for c in income_dilepas_df.columns]
+
+    # 4. Mapping kolom baru → nama lama
+
+    # --- a) Total Penghasilan ---
+    if 'Jumlah Dibayar Pembeli' in income_dilepas_df.columns:
+        income_dilepas_df.rename(
+            columns={'Jumlah Dibayar Pembeli': 'Total Penghasilan'}, 
+            inplace=True
+        )
+
+    # --- b) Voucher disponsor oleh Penjual (gabungan 2 kolom) ---
+    penyesuaian_cols = ['Penyesuaian Penjual - 1', 'Penyesuaian Penjual - 2']
+    available_penyesuaian = [c for c in penyesuaian_cols if c in income_dilepas_df.columns]
+
+    if available_penyesuaian:
+        income_dilepas_df[available_penyesuaian] = bersihkan_kolom_angka(
+            income_dilepas_df, {c: 'id' for c in available_penyesuaian}
+        )
+        income_dilepas_df['Voucher disponsor oleh Penjual'] = (
+            income_dilepas_df[available_penyesuaian].sum(axis=1)
+        )
+    else:
+        income_dilepas_df['Voucher disponsor oleh Penjual'] = 0
+
+    # --- c) Biaya Layanan (ambil dari sheet Seller Fee) ---
+    try:
+        seller_fee_df = income_bundle['seller_fee_df']
+        if seller_fee_df is None:
+            raise income_bundle['seller_fee_error']
+        seller_fee_df.columns = [str(c).strip() for c in seller_fee_df.columns]
+
+        # Cari kolom No. Pesanan di Seller Fee (bisa beda nama)
+        no_pesanan_candidates = ['No. Pesanan', 'No.Pesanan', 'Order ID', 'ID Pesanan', 'Nomor Pesanan']
+        no_pesanan_col_sf = None
+        for c in no_pesanan_candidates:
+            if c in seller_fee_df.columns:
+                no_pesanan_col_sf = c
+                break
+
+        # Cari kolom Biaya Layanan (bisa beda nama)
+        layanan_candidates = ['Biaya Layanan', 'Layanan', 'Service Fee', 'Fee Layanan', 
+                              'Biaya Layanan (Rp)', 'Layanan (Rp)', 'Service Fee (Rp)']
+        layanan_col_sf = None
+        for c in layanan_candidates:
+            if c in seller_fee_df.columns:
+                layanan_col_sf = c
+                break
+
+        # Kalau tidak ketemu pakai auto-scan
+        if not layanan_col_sf:
+            for c in seller_fee_df.columns:
+                cl = str(c).lower()
+                if any(x in cl for x in ['layanan', 'service', 'fee']) and 'total' not in cl:
+                    layanan_col_sf = c
+                    break
+
+        if no_pesanan_col_sf and layanan_col_sf:
+            # Bersihkan & agregasi per No. Pesanan
+            seller_fee_df[no_pesanan_col_sf] = seller_fee_df[no_pesanan_col_sf].astype(str).str.strip()
+            seller_fee_df[layanan_col_sf] = clean_and_convert_to_numeric(seller_fee_df[layanan_col_sf])
+
+            sf_agg = seller_fee_df.groupby(no_pesanan_col_sf)[layanan_col_sf].sum().reset_index()
+            sf_agg.rename(columns={no_pesanan_col_sf: 'No. Pesanan', layanan_col_sf: 'Biaya Layanan'}, inplace=True)
+
+            # Merge ke income (paling kanan)
+            income_dilepas_df['No. Pesanan'] = income_dilepas_df['No. Pesanan'].astype(str).str.strip()
+            income_dilepas_df = pd.merge(
+                income_dilepas_df, sf_agg, 
+                on='No. Pesanan', how='left'
+            )
+            income_dilepas_df['Biaya Layanan'] = income_dilepas_df['Biaya Layanan'].fillna(0)
         else:
-            try:
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    workbook = writer.book
+            missing = []
+            if not no_pesanan_col_sf: missing.append('No. Pesanan')
+            if not layanan_col_sf: missing.append('Biaya Layanan')
+            peringatan(f"Kolom {', '.join(missing)} tidak ditemukan di Seller Fee. Biaya Layanan = 0. Kolom tersedia: {list(seller_fee_df.columns)}")
+            income_dilepas_df['Biaya Layanan'] = 0
+    except Exception as e:
+        peringatan(f"Gagal membaca sheet Seller Fee: {e}. Biaya Layanan di-set 0.")
+        income_dilepas_df['Biaya Layanan'] = 0
+
+    # --- d) HAPUS kolom dari income yang bisa bentrok dengan order-all ---
+    # Ini PENTING: supaya merge tidak bikin suffix _x / _y
+    bentrok_cols = ['Nama Produk', 'Nama Variasi', 'Jumlah', 'Harga Setelah Diskon', 
+                    'Subtotal Pesanan', 'SKU ID', 'ID Produk']
+    for col in bentrok_cols:
+        if col in income_dilepas_df.columns:
+            income_dilepas_df.drop(columns=[col], inplace=True)
+
+    # Fallback: kolom lama yang mungkin tidak ada di format baru
+    if 'Promo Gratis Ongkir dari Penjual' not in income_dilepas_df.columns:
+        income_dilepas_df['Promo Gratis Ongkir dari Penjual'] = 0
+    if 'Biaya Administrasi' not in income_dilepas_df.columns:
+        income_dilepas_df['Biaya Administrasi'] = 0
+    if 'Biaya Proses Pesanan' not in income_dilepas_df.columns:
+        income_dilepas_df['Biaya Proses Pesanan'] = 0
+    # if store_choice == "Human Store":
+    #     service_fee_df = pd.read_excel(uploaded_income, sheet_name='Service Fee Details', skiprows=1)
+    # iklan_produk_df = pd.read_csv(uploaded_iklan, skiprows=7)
+
+    if uploaded_iklan:
+        iklan_produk_df = pd.read_csv(uploaded_iklan, skiprows=7)
+    else:
+        # Buat DataFrame kosong dengan kolom yang diperlukan
+        iklan_produk_df = pd.DataFrame(columns=['Nama Iklan', 'Dilihat', 'Jumlah Klik', 'Biaya', 'Produk Terjual', 'Omzet Penjualan'])
+        info("File Iklan tidak diupload, menggunakan data kosong.")
+    # seller_conversion_df = pd.read_csv(uploaded_seller)
+    # if uploaded_seller:
+    #     seller_conversion_df = pd.read_csv(uploaded_seller)
+    # else:
+    #     # Buat DataFrame kosong jika file tidak ada
+    #     # Ini penting agar DAMA.ID STORE tidak error
+    #     seller_conversion_df = pd.DataFrame(columns=['Kode Pesanan', 'Pengeluaran(Rp)'])
+    if uploaded_seller:
+        seller_conversion_df = pd.read_csv(uploaded_seller)
+    else:
+        # Buat DataFrame kosong dengan kolom yang diperlukan
+        seller_conversion_df = pd.DataFrame(columns=['Kode Pesanan', 'Pengeluaran(Rp)'])
+        info("File Seller Conversion tidak diupload, menggunakan data kosong.")
+
+    date_range_str = income_bundle['date_range_str']
+    return order_all_df, income_dilepas_df, iklan_produk_df, seller_conversion_df, date_range_str
+
+def bersihkan_angka_shopee(order_all_df, income_dilepas_df, iklan_produk_df, seller_conversion_df):
+    """Ubah kolom uang hasil baca_file_shopee ke numerik (in-place pada DataFrame yang diberikan)."""
+    # --- Langkah 1: Bersihkan file order-all secara khusus ---
+    cols_to_clean_order = ['Harga Setelah Diskon', 'Subtotal Pesanan']
+    angka_order_all = bersihkan_kolom_angka(order_all_df, {col: 'digit' for col in cols_to_clean_order})
+    order_all_df[angka_order_all.columns] = angka_order_all
+
+    # --- Langkah 2: Bersihkan file-file lainnya dengan fungsi lama ---
+    # other_financial_data_to_clean = [
+    #     (income_dilepas_df, ['Voucher dari Penjual', 'Biaya Administrasi', 'Biaya Proses Pesanan', 'Total Penghasilan']),
+    #     (iklan_produk_df, ['Biaya', 'Omzet Penjualan']),
+    #     (seller_conversion_df, ['Pengeluaran(Rp)'])
+    # ]
+    other_financial_data_to_clean = [
+        (income_dilepas_df, ['Voucher disponsor oleh Penjual', 'Biaya Administrasi', 'Biaya Proses Pesanan', 'Total Penghasilan', 'Biaya Layanan']),
+        (iklan_produk_df, ['Biaya', 'Omzet Penjualan']),
+        (seller_conversion_df, ['Pengeluaran(Rp)'])
+    ]
+
+    for df, cols in other_financial_data_to_clean:
+        # Satu pass regex untuk semua kolom teks di file ini
+        angka_df = bersihkan_kolom_angka(df, {col: 'id' for col in cols})
+        df[angka_df.columns] = angka_df
+
+def jalankan_rekap_shopee(uploaded_order, uploaded_income, uploaded_iklan, uploaded_seller, store_choice,
+                          katalog_df, katalog_dama_df, harga_custom_tlj_df, dama_index=None, offline_rows=None,
+                          progres=tanpa_progres, catatan_tahap=None, peringatan=st.warning, info=st.info):
+    """
+    Alur rekap mingguan Shopee: baca file → bersihkan angka → REKAP → IKLAN → SUMMARY.
+    File boleh path atau file-like (UploadedFile); iklan & seller conversion boleh None.
+    progres(persen, teks) dipanggil per tahap (persen None = hanya ganti teks status).
+    peringatan(teks) dipanggil untuk kolom/data input yang kurang (default st.warning di UI),
+    info(teks) untuk catatan rutin seperti file opsional kosong atau pesanan yang dibuang (default st.info).
+    Return (sheets, date_range_str); sheets = {nama sheet: DataFrame} untuk tulis_excel_rekap.
+    Waktu, CPU, peak RSS & jumlah baris tiap tahap ditambahkan ke list catatan_tahap (lihat ukur_tahap).
+    """
+    if catatan_tahap is None:
+        catatan_tahap = []
+    progres(None, "Membaca file Shopee...")
+    with ukur_tahap(catatan_tahap, "Baca file") as tahap:
+        order_all_df, income_dilepas_df, iklan_produk_df, seller_conversion_df, date_range_str = baca_file_shopee(
+            uploaded_order, uploaded_income, uploaded_iklan, uploaded_seller, peringatan=peringatan, info=info
+        )
+        tahap['Baris Keluar'] = jumlah_baris(order_all_df, income_dilepas_df, iklan_produk_df, seller_conversion_df)
+    progres(20, "File dimuat. Membersihkan format angka...")
+
+    baris_file = jumlah_baris(order_all_df, income_dilepas_df, iklan_produk_df, seller_conversion_df)
+    with ukur_tahap(catatan_tahap, "Bersihkan angka", baris_masuk=baris_file) as tahap:
+        bersihkan_angka_shopee(order_all_df, income_dilepas_df, iklan_produk_df, seller_conversion_df)
+        tahap['Baris Keluar'] = baris_file
+
+    # --- LOGIKA PEMROSESAN BERDASARKAN TOKO ---
+    progres(None, "Menyusun sheet 'REKAP' (Shopee)...")
+    with ukur_tahap(catatan_tahap, "REKAP", baris_masuk=len(order_all_df)) as tahap:
+        if store_choice in ["Human Store", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"]:
+            rekap_processed = process_rekap(order_all_df, income_dilepas_df, seller_conversion_df, store_choice, peringatan=peringatan)
+        elif store_choice == "Pacific Bookstore": # Hanya Pacific yang pakai logic ini
+            rekap_processed = process_rekap_pacific(order_all_df, income_dilepas_df, seller_conversion_df, peringatan=peringatan)
+        elif store_choice == "DAMA.ID STORE": # Panggil fungsi baru untuk DAMA
+            rekap_processed = process_rekap_dama(order_all_df, income_dilepas_df, seller_conversion_df, peringatan=peringatan)
+        else: # Pengaman jika ada pilihan store lain
+            raise ValueError(f"Pilihan toko '{store_choice}' tidak dikenali.")
+        tahap['Baris Keluar'] = len(rekap_processed)
+    progres(40, "Sheet 'REKAP' selesai.")
+
+    progres(None, "Menyusun sheet 'IKLAN' (Shopee)...")
+    with ukur_tahap(catatan_tahap, "IKLAN", baris_masuk=len(iklan_produk_df)) as tahap:
+        iklan_processed = process_iklan(iklan_produk_df)
+        tahap['Baris Keluar'] = len(iklan_processed)
+    progres(60, "Sheet 'IKLAN' selesai.")
+
+    progres(None, "Menyusun sheet 'SUMMARY' (Shopee)...")
+    with ukur_tahap(catatan_tahap, "SUMMARY", baris_masuk=len(rekap_processed)) as tahap:
+        if store_choice == "DAMA.ID STORE":
+            summary_processed = process_summary_dama(rekap_processed, iklan_processed, katalog_dama_df, harga_custom_tlj_df, offline_rows=offline_rows, dama_index=dama_index, store_choice=store_choice)
+        else: # Human Store atau Pacific Bookstore
+            summary_processed = process_summary(rekap_processed, iklan_processed, katalog_df, harga_custom_tlj_df, store_type=store_choice, offline_rows=offline_rows)
+        tahap['Baris Keluar'] = len(summary_processed)
+    progres(80, "Sheet 'SUMMARY' selesai.")
+
+    sheets = {
+        'SUMMARY': summary_processed, 'REKAP': rekap_processed, 'IKLAN': iklan_processed,
+        'sheet order-all': order_all_df, 'sheet income dilepas': income_dilepas_df,
+        'sheet biaya iklan': iklan_produk_df, 'sheet seller conversion': seller_conversion_df
+    }
+    # if store_choice == "Human Store": sheets['sheet service fee'] = service_fee_df
+    return sheets, date_range_str
+
+def baca_file_tiktok(uploaded_income_tiktok, uploaded_semua_pesanan, uploaded_creator_order, product_data_file, store_choice,
+                     peringatan=st.warning, info=st.info):
+    """
+    Baca & siapkan file export TikTok: Order details & Reports (+ periode dari Reports F2),
+    Product Data (digabung per ID PRODUK), semua pesanan, creator order (boleh None).
+    Return (order_details_df, reports_df, product_data_df, semua_pesanan_df, creator_order_all_df, date_range_str).
+    """
+    # Baca sheet 'Order details' dan langsung bersihkan kolomnya
+    order_details_df = pd.read_excel(uploaded_income_tiktok, sheet_name='Order details', header=0)
+    order_details_df = clean_columns(order_details_df)
+    order_details_df.columns = [col.upper() for col in order_details_df.columns]
+    # Baca sheet 'Reports' dan langsung bersihkan kolomnya
+    reports_df = pd.read_excel(uploaded_income_tiktok, sheet_name='Reports', header=0)
+    reports_df = clean_columns(reports_df)
+    reports_df.columns = [col.upper() for col in reports_df.columns]
+
+    if product_data_file:
+        all_product_data = []
+        for prod_file in product_data_file:
+            df_temp = pd.read_excel(prod_file)
+            df_temp.columns = [str(col).strip().upper() for col in df_temp.columns]
+            all_product_data.append(df_temp)
+
+        # Gabungkan semua file
+        product_data_df = pd.concat(all_product_data, ignore_index=True)
+
+        # Hapus baris duplikat header (jika ada)
+        # Cek jika ada baris yang isinya sama persis dengan nama kolom
+        header_mask = True
+        for col in product_data_df.columns:
+            header_mask = header_mask & (product_data_df[col].astype(str) == col)
+        product_data_df = product_data_df[~header_mask].reset_index(drop=True)
+
+        # Konversi kolom numerik
+        numeric_cols = ['PESANAN SKU', 'PENDAPATAN KOTOR', 'BIAYA', 'BIAYA PER PESANAN']
+        for col in numeric_cols:
+            if col in product_data_df.columns:
+                product_data_df[col] = pd.to_numeric(product_data_df[col], errors='coerce').fillna(0)
+
+        # --- AGREGASI: Gabungkan baris dengan ID PRODUK yang sama ---
+        if 'ID PRODUK' in product_data_df.columns:
+            # Kolom yang akan di-sum
+            sum_cols = ['PESANAN SKU', 'PENDAPATAN KOTOR', 'BIAYA', 'BIAYA PER PESANAN']
+            # Kolom yang di-ambil first (untuk kolom non-numerik)
+            first_cols = [c for c in product_data_df.columns if c not in sum_cols and c != 'ID PRODUK']
+
+            agg_dict = {col: 'sum' for col in sum_cols if col in product_data_df.columns}
+            agg_dict.update({col: 'first' for col in first_cols if col in product_data_df.columns})
+
+            product_data_df = product_data_df.groupby('ID PRODUK', as_index=False).agg(agg_dict)
+    else:
+        product_data_df = pd.DataFrame()
+        if is_file_optional_tiktok('product_data', store_choice):
+            info("File Product Data tidak diupload (opsional untuk toko ini), menggunakan data kosong.")
+    # Baca 'semua pesanan' dan langsung bersihkan kolomnya
+    # 1. Baca file tanpa header, sehingga semua baris (termasuk header asli) menjadi data
+    # Dibaca streaming (read-only), baris deskripsi & baris kosong dilewati saat membaca
+    semua_pesanan_df = load_semua_pesanan_tiktok(uploaded_semua_pesanan)
+    # Bersihkan kolom (hapus spasi dan karakter aneh)
+    semua_pesanan_df.columns = semua_pesanan_df.columns.str.strip()
+    semua_pesanan_df = clean_columns(semua_pesanan_df)
+    semua_pesanan_df.columns = [col.upper() for col in semua_pesanan_df.columns]
+    # if uploaded_creator_order:
+    #     # Jika file di-upload (Human Store), baca filenya
+    #     creator_order_all_df = clean_columns(pd.read_excel(uploaded_creator_order))
+    #     creator_order_all_df.columns = [col.upper() for col in creator_order_all_df.columns]
+    # else:
+    #     # Jika DAMA.ID STORE (file=None), buat DataFrame kosong
+    #     # Tambahkan 'SKU' ke daftar kolom agar merge tidak error
+    #     creator_order_all_df = pd.DataFrame(columns=['ID PESANAN', 'PRODUK', 'Variasi_Clean', 'PEMBAYARAN KOMISI AKTUAL', 'SKU'])
+    if uploaded_creator_order:
+        creator_order_all_df = clean_columns(pd.read_excel(uploaded_creator_order))
+        creator_order_all_df.columns = [col.upper() for col in creator_order_all_df.columns]
+    else:
+        # Buat DataFrame kosong dengan kolom yang diperlukan
+        creator_order_all_df = pd.DataFrame(columns=['ID PESANAN', 'PRODUK', 'Variasi_Clean', 'PEMBAYARAN KOMISI AKTUAL', 'PERKIRAAN PEMBAYARAN KOMISI STANDAR', 'SKU'])
+        if is_file_optional_tiktok('creator_order', store_choice):
+            info("File Creator Order tidak diupload (opsional untuk toko ini), menggunakan data kosong.")
+
+    try:
+        # Baca mentah sheet Reports cell F2
+        df_date_raw = pd.read_excel(uploaded_income_tiktok, sheet_name='Reports', header=None, nrows=5)
+        raw_val = str(df_date_raw.iloc[1, 5]) # F2
+        # Format biasanya '2026/01/19-2026/01/25'
+        split_tgl = raw_val.split('-')
+        tgl_awal = split_tgl[0].replace('/', '-')
+        tgl_akhir = split_tgl[1].replace('/', '-')
+        date_range_str = get_pretty_date_range(tgl_awal, tgl_akhir)
+    except:
+        date_range_str = ""
+        peringatan("Periode tanggal (sel F2 sheet 'Reports') tidak terbaca, nama file tanpa rentang tanggal.")
+    return order_details_df, reports_df, product_data_df, semua_pesanan_df, creator_order_all_df, date_range_str
+
+def jalankan_rekap_tiktok(uploaded_income_tiktok, uploaded_semua_pesanan, uploaded_creator_order, product_data_file,
+                          store_choice, katalog_df, harga_custom_tlj_df, progres=tanpa_progres, catatan_tahap=None,
+                          peringatan=st.warning, info=st.info):
+    """
+    Alur rekap mingguan TikTok: Order details/Reports, semua pesanan, creator order, Product Data.
+    creator order boleh None, product_data_file berupa list (boleh kosong).
+    Return (sheets, date_range_str) seperti jalankan_rekap_shopee, catatan_tahap, peringatan & info juga sama.
+    """
+    if catatan_tahap is None:
+        catatan_tahap = []
+    progres(None, "Membaca file TikTok...")
+    with ukur_tahap(catatan_tahap, "Baca file") as tahap:
+        order_details_df, reports_df, product_data_df, semua_pesanan_df, creator_order_all_df, date_range_str = baca_file_tiktok(
+            uploaded_income_tiktok, uploaded_semua_pesanan, uploaded_creator_order, product_data_file, store_choice,
+            peringatan=peringatan, info=info
+        )
+        tahap['Baris Keluar'] = jumlah_baris(order_details_df, reports_df, product_data_df, semua_pesanan_df, creator_order_all_df)
+    progres(20, "File Excel TikTok dimuat dan kolom dibersihkan.")
+
+    # status_text.text(f"Memproses {len(uploaded_pdfs)} file PDF nota resi...")
+    # pdf_data = [parse_pdf_receipt(pdf) for pdf in uploaded_pdfs if pdf is not None]
+    # pdf_data = [data for data in pdf_data if data is not None] # Hapus hasil yang gagal
+    pdf_data = [] # Inisialisasi list kosong
+    # if uploaded_pdfs: # Hanya proses jika PDF di-upload
+    #     status_text.text(f"Memproses {len(uploaded_pdfs)} file PDF nota resi...")
+    #     pdf_data = [parse_pdf_receipt(pdf) for pdf in uploaded_pdfs if pdf is not None]
+    #     pdf_data = [data for data in pdf_data if data is not None] # Hapus hasil yang gagal
+    # else:
+    #     # Jika tidak ada PDF (kasus DAMA.ID STORE opsional)
+    #     status_text.text("Melewati pemrosesan PDF nota resi...")
+    ekspedisi_processed = pd.DataFrame()
+    # progress_bar.progress(40, text="File PDF selesai diproses.")
+
+    progres(None, "Menyusun sheet 'REKAP' (TikTok)...")
+    with ukur_tahap(catatan_tahap, "REKAP", baris_masuk=len(semua_pesanan_df)) as tahap:
+        rekap_processed = process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_df, store_choice,
+                                               peringatan=peringatan, info=info)
+        tahap['Baris Keluar'] = len(rekap_processed)
+    progres(60, "Sheet 'REKAP' selesai.")
+
+    # Untuk SUMMARY, kita perlu EKSPEDISI dulu, tapi EKSPEDISI perlu agregasi dari SUMMARY.
+    # Jadi, kita buat summary sementara dulu.
+    summary_temp_for_ekspedisi = rekap_processed.copy()
+
+    # status_text.text("Menyusun sheet 'EKSPEDISI'...")
+    # ekspedisi_processed = process_ekspedisi_tiktok(summary_temp_for_ekspedisi, pdf_data)
+    # progress_bar.progress(70, text="Sheet 'EKSPEDISI' selesai.")
+    progres(70, "Melewati sheet EKSPEDISI...")
+
+    progres(None, "Menyusun sheet 'SUMMARY' (TikTok)...")
+    with ukur_tahap(catatan_tahap, "SUMMARY", baris_masuk=len(rekap_processed)) as tahap:
+        # summary_processed = process_summary_tiktok(rekap_processed, katalog_df, harga_custom_tlj_df, ekspedisi_processed)
+        summary_processed = process_summary_tiktok(rekap_processed, katalog_df, harga_custom_tlj_df, ekspedisi_processed, product_data_df, store_choice)
+        tahap['Baris Keluar'] = len(summary_processed)
+    progres(85, "Sheet 'SUMMARY' selesai.")
+
+    sheets = {
+        'SUMMARY': summary_processed,
+        'REKAP': rekap_processed,
+        'EKSPEDISI': ekspedisi_processed,
+        'sheet Order details': order_details_df,
+        'sheet Reports': reports_df,
+        'sheet semua pesanan': semua_pesanan_df,
+        'sheet creator order-all': creator_order_all_df,
+        'sheet Iklan': product_data_df
+    }
+    return sheets, date_range_str
+
+def tulis_excel_rekap(sheets, store_choice, marketplace_choice, date_range_str, output):
+    """Tulis semua sheet hasil rekap (dengan format judul, header, angka & total) ke output (path atau BytesIO)."""
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+
+        # --- SEMUA FORMATTING VISUAL DIDEFINISIKAN DI SINI ---
+        workbook = writer.book
+
+        # --- PERUBAHAN 1: Format Judul diubah menjadi rata kiri (align: 'left') ---
+        title_format = workbook.add_format({'bold': True, 'fg_color': '#4472C4', 'font_color': 'white', 'align': 'left', 'valign': 'vcenter', 'font_size': 14})
+
+        # Format Header Kolom (biru muda, bold, border)
+        header_format = workbook.add_format({'bold': True, 'fg_color': '#DDEBF7', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
+
+        header_name_format = workbook.add_format({
+            'bold': True,
+            'fg_color': '#DDEBF7',  # Warna sama dengan header
+            'border': 1,
+            'align': 'center',
+            'valign': 'vcenter',
+            'text_wrap': True       # Enable wrap text
+        })
+
+        # Format kolom angka SUMMARY (dipasang via set_column; border dari conditional format no_blanks)
+        number_col_format = workbook.add_format({
+            'num_format': '#,##0',  # Ribuan pakai koma, desimal pakai titik
+            'align': 'right'
+        })
+        percent_col_format = workbook.add_format({'num_format': '0.0%'})  # 1 angka desimal belakang
+        one_decimal_col_format = workbook.add_format({'num_format': '#,##0.0'})
+
+        number_format_id_total = workbook.add_format({
+            'num_format': '#,##0',
+            'bold': True,
+            'fg_color': '#FFFF00',
+            'border': 1,
+            'align': 'right'
+        })
+
+        # Border untuk sel data (dipakai lewat conditional format 'no_blanks')
+        cell_border_format = workbook.add_format({'border': 1})
+
+        # Format Baris Total (kuning, bold)
+        total_fmt = workbook.add_format({'bold': True, 'fg_color': '#FFFF00', 'border': 1})
+        total_fmt_percent = workbook.add_format({'bold': True, 'fg_color': '#FFFF00', 'num_format': '0.00%', 'border': 1})
+        total_fmt_decimal = workbook.add_format({'bold': True, 'fg_color': '#FFFF00', 'num_format': '#,##0', 'border': 1})
+
+        # Conditional format: angka negatif merah di baris data
+        red_font_cf_format = workbook.add_format({'font_color': '#FF0000'})
+
+        # Baris total negatif: kuning tetap, angka merah dengan tanda minus
+        red_format_total_margin = workbook.add_format({
+            'bold': True,
+            'fg_color': '#FFFF00',
+            'font_color': '#FF0000',
+            'num_format': '#,##0;-#,##0',  # TETAP PAKAI TANDA MINUS
+            'border': 1,
+            'align': 'right'
+        })
+
+        # Tambahkan ini juga untuk total persen negatif
+        red_total_percent = workbook.add_format({
+            'bold': True,
+            'fg_color': '#FFFF00',
+            'font_color': '#FF0000',
+            'num_format': '0.0%;-0.0%',
+            'border': 1,
+            'align': 'right'
+        })
+
+        # Tambahkan ini untuk total desimal negatif
+        red_total_decimal = workbook.add_format({
+            'bold': True,
+            'fg_color': '#FFFF00',
+            'font_color': '#FF0000',
+            'num_format': '#,##0.0;-#,##0.0',
+            'border': 1,
+            'align': 'right'
+        })
+
+        # Conditional format untuk baris penjualan offline (pink peach lembut)
+        offline_fill_cf_format = workbook.add_format({'bg_color': '#FFD1DC'})
+
+        # --- PROSES SETIAP SHEET ---
+        for sheet_name, df in sheets.items():
+
+            if sheet_name in ['SUMMARY', 'REKAP', 'IKLAN']:
+                # ==========================================
+                # SHEET HASIL PROSESING: Judul + Header merge 2 baris
+                # ==========================================
+                start_row_data = 4
+                if sheet_name == 'SUMMARY':
+                    # SUMMARY ditulis per kolom tanpa format sel, format angka diatur lewat set_column
+                    worksheet = workbook.add_worksheet(sheet_name)
+                    tulis_dataframe_per_kolom(worksheet, df, start_row_data)
+                else:
+                    df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row_data, header=False)
+                    worksheet = writer.sheets[sheet_name]
+
+                # --- Judul di baris 0-1 (merge) ---
+                # date_range_str sudah dihitung saat membaca file income / Reports
+                suffix_tgl = f" {date_range_str}" if date_range_str else ""
+                judul_sheet = f"{sheet_name} {store_choice.upper()} {marketplace_choice} {suffix_tgl}"
+
+                worksheet.merge_range(0, 0, 1, len(df.columns) - 1, judul_sheet, title_format)
+
+                # --- Header kolom di baris 2-3 (merge 2 baris) ---
+                for col_num, value in enumerate(df.columns.values):
+                    worksheet.merge_range(2, col_num, 3, col_num, value, header_name_format)
+
+            else:
+                # ==========================================
+                # SHEET RAW DATA: Header di baris 0, data mulai baris 1
+                # ==========================================
+                start_row_data = 1
+                df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row_data, header=False)
+                worksheet = writer.sheets[sheet_name]
+
+                # --- Header kolom di baris 0 (satu baris, tidak merge) ---
+                for col_num, value in enumerate(df.columns.values):
+                    worksheet.write(0, col_num, value, header_format)
+
+            # Terapkan formatting KHUSUS untuk sheet SUMMARY, REKAP, dan IKLAN
+            if sheet_name in ['SUMMARY', 'REKAP', 'IKLAN']:
+                # --- PERUBAHAN 5: Terapkan border ke semua sel data ---
+                # (row_start, col_start, row_end, col_end, format)
+                worksheet.conditional_format(start_row_data, 0, start_row_data + len(df) - 1, len(df.columns) - 1, 
+                                             {'type': 'no_blanks', 'format': cell_border_format})
+
+            # Format angka per kolom, dipasang bersama lebar kolom di akhir
+            kolom_format = {}
+            if sheet_name == 'SUMMARY':
+                # Daftar kolom yang pakai format angka ribuan
+                if store_choice in ['Raka Bookstore', 'Toko Kaliba', 'Toko Monang', 'Toko Serayu']:
+                    label_adm_format = 'Biaya Adm 9%'
+                else:
+                    label_adm_format = 'Biaya Adm 9%'
+
+                number_columns = [
+                    'Jumlah Terjual', 'Jumlah Eksemplar', 'Jumlah Pesanan',
+                    'Harga Satuan', 'Total Penjualan', 'Voucher Ditanggung Penjual',
+                    'Biaya Komisi AMS + PPN Shopee', label_adm_format,
+                    'Biaya Layanan Gratis Ongkir Xtra 4,5%', 'Biaya Proses Pesanan',
+                    'Penjualan Netto', 'Iklan Klik', 'Biaya Packing', 'Biaya Ekspedisi',
+                    'Harga Beli', 'Harga Custom TLJ', 'Total Pembelian', 'Margin'
+                ]
+                decimal_columns = ['Penjualan Per Hari', 'Jumlah buku per pesanan']
+
+                # Baris data tanpa baris Total (baris terakhir)
+                first_data_row = start_row_data
+                last_data_row = start_row_data + len(df) - 2
+
+                rentang_angka = []
+                for col_num, col_name in enumerate(df.columns):
+                    if col_name == 'Persentase':
+                        kolom_format[col_num] = percent_col_format
+                    elif col_name in decimal_columns:
+                        kolom_format[col_num] = one_decimal_col_format
+                    elif col_name in number_columns:
+                        kolom_format[col_num] = number_col_format
+                    else:
+                        continue
+                    rentang_angka.append(xl_range(first_data_row, col_num, last_data_row, col_num))
+
+                if last_data_row >= first_data_row:
+                    # Angka negatif merah: satu conditional format untuk semua kolom angka
+                    if rentang_angka:
+                        worksheet.conditional_format(rentang_angka[0], {
+                            'type': 'cell', 'criteria': '<', 'value': 0,
+                            'format': red_font_cf_format,
+                            'multi_range': ' '.join(rentang_angka)
+                        })
+
+                    # Baris penjualan offline (pink peach): satu aturan formula untuk seluruh baris
+                    if df['Nama Produk'].astype(str).str.startswith('[OFFLINE]').any():
+                        nama_col_letter = xl_col_to_name(df.columns.get_loc('Nama Produk'))
+                        worksheet.conditional_format(first_data_row, 0, last_data_row, len(df.columns) - 1, {
+                            'type': 'formula',
+                            'criteria': f'=LEFT(${nama_col_letter}{first_data_row + 1},9)="[OFFLINE]"',
+                            'format': offline_fill_cf_format
+                        })
+
+                # Baris Total (kuning, bold), merah untuk nilai negatif
+                last_row = start_row_data + len(df) - 1
+                for col_num, (col_name, cell_value) in enumerate(zip(df.columns, df.iloc[-1].tolist())):
+                    is_negative = pd.notna(cell_value) and isinstance(cell_value, (int, float)) and cell_value < 0
+
+                    if col_name == 'Persentase':
+                        current_fmt = red_total_percent if is_negative else total_fmt_percent
+                    elif col_name in decimal_columns:
+                        current_fmt = red_total_decimal if is_negative else total_fmt_decimal
+                    elif col_name in number_columns:
+                        current_fmt = red_format_total_margin if is_negative else number_format_id_total
+                    else:
+                        current_fmt = total_fmt
+
+                    if pd.notna(cell_value):
+                        worksheet.write(last_row, col_num, cell_value, current_fmt)
+                    else:
+                        worksheet.write_blank(last_row, col_num, None, current_fmt)
+
+            # TAMBAHKAN BLOK BARU INI
+            if sheet_name == 'IKLAN':
+                # Cek jika baris terakhir adalah baris TOTAL
+                last_row_idx = len(df) - 1
+                if not df.empty and df.iloc[last_row_idx]['Nama Iklan'] == 'TOTAL':
+                    # Terapkan format total (kuning, bold, border) ke setiap sel di baris ini
+                    for col_num in range(len(df.columns)):
+                        cell_value = df.iloc[last_row_idx, col_num]
+                        worksheet.write(start_row_data + last_row_idx, col_num, cell_value, total_fmt)
+
+            # Atur lebar kolom otomatis untuk semua sheet
+            # for i, col in enumerate(df.columns):
+            #     column_len = max(df[col].astype(str).map(len).max(), len(col))
+            #     worksheet.set_column(i, i, column_len + 2)
+            for i, col in enumerate(df.columns):
+                # Hitung panjang rata-rata kata
+                words = str(col).split()
+                if len(words) >= 3:
+                    # Ambil 2 kata pertama untuk lebar dasar
+                    base_width = len(' '.join(words[:2])) + 2  # +2 untuk padding
+                elif len(words) == 2:
+                    base_width = len(col) + 2
+                else:
+                    base_width = len(col) + 3
+
+                # Minimal 8, maksimal 15 (biar tidak terlalu lebar)
+                final_width = max(8, min(base_width, 15))
+                worksheet.set_column(i, i, final_width, kolom_format.get(i))
+
+# --- CACHE HASIL PIPELINE (SESSION STATE + DISK, PER SIDIK INPUT) ---
+
+HASIL_CACHE_DIR = 'hasil_cache' # Cache disk hasil rekap; isi '' untuk mematikan (session state tetap dipakai)
+HASIL_CACHE_MAKS_DISK = 20 # Jumlah hasil terbaru yang disimpan di disk, yang lebih lama dihapus
+HASIL_CACHE_MAKS_SESI = 3 # Hasil per sesi browser (DataFrame + xlsx ditahan di RAM server)
+HASH_UPLOAD_MAKS_SESI = 32 # Hash file upload yang diingat per sesi (jauh di atas jumlah uploader satu rekap)
+VERSI_KODE = hitung_hash_file(os.path.abspath(__file__))[:16] # main.py berubah → hasil lama tidak dipakai lagi
+
+def hash_upload(uploaded_file):
+    """
+    SHA-256 isi file upload (list → list hash, None → None). Dihitung sekali per file_id per sesi,
+    maksimal HASH_UPLOAD_MAKS_SESI file terakhir yang diingat.
+    """
+    if uploaded_file is None:
+        return None
+    if isinstance(uploaded_file, (list, tuple)):
+        return [hash_upload(f) for f in uploaded_file]
+    # Urutan dict = urutan pakai, sama seperti simpan_hasil_sesi
+    memo = st.session_state.setdefault('hash_upload', {})
+    file_id = getattr(uploaded_file, 'file_id', None)
+    if file_id is None:
+        return hitung_hash_bytes(uploaded_file.getvalue())
+    hasil = memo.pop(file_id, None)
+    if hasil is None:
+        hasil = hitung_hash_bytes(uploaded_file.getvalue())
+    memo[file_id] = hasil
+    while len(memo) > HASH_UPLOAD_MAKS_SESI:
+        memo.pop(next(iter(memo)))
+    return hasil
+
+def sidik_hasil_pipeline(marketplace_choice, store_choice, uploads, offline_rows):
+    """
+    Kunci cache hasil rekap: hash isi semua file upload, toko, marketplace, sidik file katalog,
+    baris penjualan offline, dan versi kode. Input yang sama persis → kunci yang sama.
+    """
+    sidik = {
+        'marketplace': marketplace_choice,
+        'toko': store_choice,
+        'upload': {peran: hash_upload(f) for peran, f in uploads.items()},
+        'katalog': [get_file_fingerprint(p) for p in (KATALOG_HARGA_ONLINE_PATH, HARGA_CUSTOM_TLJ_PATH, KATALOG_DAMA_PATH)],
+        'offline': offline_rows or [],
+        'versi': VERSI_KODE,
+    }
+    return hitung_hash_bytes(json.dumps(sidik, sort_keys=True, default=str).encode('utf-8'))
+
+def path_cache_hasil(kunci):
+    return os.path.join(HASIL_CACHE_DIR, f"{kunci}.pkl")
+
+def simpan_hasil_sesi(kunci, hasil):
+    # Urutan dict = urutan pakai; yang paling lama tidak dipakai dibuang lebih dulu
+    hasil_sesi = st.session_state.setdefault('hasil_pipeline', {})
+    hasil_sesi.pop(kunci, None)
+    hasil_sesi[kunci] = hasil
+    while len(hasil_sesi) > HASIL_CACHE_MAKS_SESI:
+        hasil_sesi.pop(next(iter(hasil_sesi)))
+
+def ambil_hasil_pipeline(kunci):
+    """
+    Hasil rekap tersimpan untuk kunci ini: session state dulu, lalu cache disk.
+    Return dict (sheets, date_range_str, file_name, xlsx, catatan_tahap) atau None.
+    """
+    hasil_sesi = st.session_state.setdefault('hasil_pipeline', {})
+    if kunci in hasil_sesi:
+        hasil = hasil_sesi[kunci]
+    elif HASIL_CACHE_DIR:
+        try:
+            path = path_cache_hasil(kunci)
+            with open(path, 'rb') as f:
+                hasil = pickle.load(f) # Hanya file yang ditulis aplikasi ini sendiri
+            os.utime(path) # Tandai baru dipakai, supaya tidak ikut terhapus saat pembatasan jumlah
+        except Exception:
+            return None
+    else:
+        return None
+    simpan_hasil_sesi(kunci, hasil)
+    return hasil
+
+def simpan_hasil_pipeline(kunci, hasil):
+    """Simpan hasil ke session state dan (jika aktif) ke cache disk, maksimal HASIL_CACHE_MAKS_DISK file."""
+    simpan_hasil_sesi(kunci, hasil)
+    if not HASIL_CACHE_DIR:
+        return
+    try:
+        os.makedirs(HASIL_CACHE_DIR, exist_ok=True)
+        # File sementara unik per penulis: dua sesi dengan input sama tidak menulis ke file yang sama.
+        # os.replace atomik, jadi sesi lain tidak pernah membaca file setengah jadi
+        fd, path_tmp = tempfile.mkstemp(dir=HASIL_CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(hasil, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path_tmp, path_cache_hasil(kunci))
+        except Exception:
+            os.remove(path_tmp)
+            raise
+
+        tersimpan = sorted(
+            (os.path.join(HASIL_CACHE_DIR, nama) for nama in os.listdir(HASIL_CACHE_DIR) if nama.endswith('.pkl')),
+            key=os.path.getmtime, reverse=True
+        )
+        for path_lama in tersimpan[HASIL_CACHE_MAKS_DISK:]:
+            os.remove(path_lama)
+    except Exception:
+        pass # Cache hanya optimasi, kegagalan tulis tidak boleh menghentikan proses
+
+# --- TAMPILAN STREAMLIT ---
+
+# UI hanya jalan sebagai script Streamlit; saat di-import (rekap_batch.py) cukup fungsi-fungsinya
+if __name__ == "__main__":
+    st.set_page_config(layout="wide")
+    st.title("📊 Rekapanku - Sistem Otomatisasi Laporan")
+
+    status_warmup = mulai_warmup()
+    with st.sidebar:
+        st.subheader("Status Sistem")
+        for nama_resource, status_resource in status_warmup.items():
+            ikon = "✅" if status_resource == "siap" else ("⏳" if status_resource == "memuat..." else "⚠️")
+            st.caption(f"{ikon} {nama_resource}: {status_resource}")
+
+    # --- UI PILIHAN JENIS REKAPAN ---
+    st.header("1. Konfigurasi Rekapan")
+    jenis_rekapan = st.radio("Pilih Jenis Rekapan:", ["Mingguan", "Bulanan", "Perbandingan Multi-Toko", "Akumulasi Order"], horizontal=True)
+
+    if jenis_rekapan == "Bulanan":
+        st.info("Mode Bulanan: Gabungkan 3-4 file SUMMARY mingguan menjadi satu file.")
+        toko_bulanan = st.selectbox("Pilih Toko untuk Rekapan Bulanan:", [
+            "Human Store Shopee", "Pacific Bookstore Shopee", "Dama.id Store Shopee",
+            "Human Store Tiktok", "Pacific Bookstore Tiktok", "Dama.id Store Tiktok",
+            "Raka Bookstore Shopee", "Raka Bookstore Tiktok", "Toko Kaliba Shopee", "Toko Kaliba Tiktok"
+        ])
+    
+        files_mingguan = []
+        col1, col2 = st.columns(2)
+        with col1:
+            f1 = st.file_uploader("Impor Rekapan Minggu 1 (Wajib)", type=["xlsx"])
+            f2 = st.file_uploader("Impor Rekapan Minggu 2 (Wajib)", type=["xlsx"])
+        with col2:
+            f3 = st.file_uploader("Impor Rekapan Minggu 3 (Wajib)", type=["xlsx"])
+            f4 = st.file_uploader("Impor Rekapan Minggu 4 (Opsional)", type=["xlsx"])
+    
+        if st.button("🚀 Proses Rekapan Bulanan"):
+            uploaded_files = [f for f in [f1, f2, f3, f4] if f is not None]
+            if len(uploaded_files) < 3:
+                st.error("Minimal 3 file (Minggu 1, 2, dan 3) harus diunggah!")
+            else:
+                try:
+                    output = io.BytesIO()
+                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+                        for i, file in enumerate(uploaded_files):
+                            # Baca sheet SUMMARY
+                            df_summary = pd.read_excel(file, sheet_name='SUMMARY')
+                        
+                            # Ambil tanggal dari metadata file (jika ada) atau properti Excel
+                            try:
+                                from openpyxl import load_workbook
+                                wb_meta = load_workbook(file)
+                                created_dt = wb_meta.properties.created
+                                tgl_str = created_dt.strftime("%d/%m/%Y") if created_dt else datetime.now().strftime("%d/%m/%Y")
+                            except:
+                                tgl_str = datetime.now().strftime("%d/%m/%Y")
+                        
+                            # Set Header dengan Tanggal
+                            sheet_name = f"SUMMARY {i+1}"
+                            df_summary.to_excel(writer, sheet_name=sheet_name, index=False)
+                        
+                            # Tambahkan Tanggal di baris atas atau sel tertentu (Opsional)
+                            worksheet = writer.sheets[sheet_name]
+                            worksheet.write(0, df_summary.shape[1], f"Tanggal: {tgl_str}")
+                
+                    output.seek(0)
+                    st.success("✅ Rekapan Bulanan Berhasil!")
+                    st.download_button(
+                        label=f"📥 Download Rekapan Bulanan {toko_bulanan}.xlsx",
+                        data=output,
+                        file_name=f"REKAPAN_BULANAN_{toko_bulanan.upper().replace(' ', '_')}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+                except Exception as e:
+                    st.error(f"Error Bulanan: {e}")
+        st.stop() # Hentikan eksekusi di sini agar tidak masuk ke logika mingguan di bawah
+
+    elif jenis_rekapan == "Perbandingan Multi-Toko":
+        st.info("Mode Perbandingan: Bandingkan beberapa toko dalam satu periode (Shopee & TikTok).")
+    
+        # --- INPUT SUMMARY SHOPEE ---
+        st.subheader("📦 Import File SUMMARY Shopee")
+        st.caption("Upload file SUMMARY Shopee dari tiap toko (satu file per toko)")
+    
+        # Dictionary untuk menyimpan file per toko
+        shopee_files = {}
+        col_s1, col_s2, col_s3 = st.columns(3)
+        with col_s1:
+            shopee_files['Raka Bookstore'] = st.file_uploader("SUMMARY Raka Bookstore Shopee", type=["xlsx"], key="comp_raka_shopee")
+            shopee_files['Toko Monang'] = st.file_uploader("SUMMARY Toko Monang Shopee", type=["xlsx"], key="comp_monang_shopee")
+            shopee_files['DAMA.ID STORE'] = st.file_uploader("SUMMARY DAMA.ID STORE Shopee", type=["xlsx"], key="comp_dama_shopee")
+        with col_s2:
+            shopee_files['Toko Kaliba'] = st.file_uploader("SUMMARY Toko Kaliba Shopee", type=["xlsx"], key="comp_kaliba_shopee")
+            shopee_files['Toko Serayu'] = st.file_uploader("SUMMARY Toko Serayu Shopee", type=["xlsx"], key="comp_serayu_shopee")
+        with col_s3:
+            # Tambahkan toko lain jika perlu
+            shopee_files['Human Store'] = st.file_uploader("SUMMARY Human Store Shopee", type=["xlsx"], key="comp_human_shopee")
+            shopee_files['Pacific Bookstore'] = st.file_uploader("SUMMARY Pacific Bookstore Shopee", type=["xlsx"], key="comp_pacific_shopee")
+    
+        # --- INPUT SUMMARY TIKTOK ---
+        st.subheader("🎵 Import File SUMMARY TikTok")
+        st.caption("Upload file SUMMARY TikTok dari tiap toko (satu file per toko)")
+    
+        tiktok_files = {}
+        col_t1, col_t2, col_t3 = st.columns(3)
+        with col_t1:
+            tiktok_files['Raka Bookstore'] = st.file_uploader("SUMMARY Raka Bookstore TikTok", type=["xlsx"], key="comp_raka_tiktok")
+            tiktok_files['Toko Monang'] = st.file_uploader("SUMMARY Toko Monang TikTok", type=["xlsx"], key="comp_monang_tiktok")
+            tiktok_files['DAMA.ID STORE'] = st.file_uploader("SUMMARY DAMA.ID STORE TikTok", type=["xlsx"], key="comp_dama_tiktok")
+        with col_t2:
+            tiktok_files['Toko Kaliba'] = st.file_uploader("SUMMARY Toko Kaliba TikTok", type=["xlsx"], key="comp_kaliba_tiktok")
+            tiktok_files['Toko Serayu'] = st.file_uploader("SUMMARY Toko Serayu TikTok", type=["xlsx"], key="comp_serayu_tiktok")
+        with col_t3:
+            tiktok_files['Human Store'] = st.file_uploader("SUMMARY Human Store TikTok", type=["xlsx"], key="comp_human_tiktok")
+            tiktok_files['Pacific Bookstore'] = st.file_uploader("SUMMARY Pacific Bookstore TikTok", type=["xlsx"], key="comp_pacific_tiktok")
+    
+        # --- TOMBOL PROSES ---
+        if st.button("🚀 Proses Perbandingan Multi-Toko"):
+            # Validasi: minimal ada 1 file
+            valid_shopee = {k: v for k, v in shopee_files.items() if v is not None}
+            valid_tiktok = {k: v for k, v in tiktok_files.items() if v is not None}
+        
+            if not valid_shopee and not valid_tiktok:
+                st.error("Minimal upload 1 file SUMMARY (Shopee atau TikTok)!")
+            else:
+                try:
+                    output = io.BytesIO()
+                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+                        workbook = writer.book
                     
-                    # --- FORMAT ---
-                    title_format = workbook.add_format({
-                        'bold': True, 'fg_color': '#4472C4', 'font_color': 'white',
-                        'align': 'center', 'valign': 'vcenter', 'font_size': 14
-                    })
-                    header_format = workbook.add_format({
-                        'bold': True, 'fg_color': '#DDEBF7', 'border': 1,
-                        'align': 'center', 'valign': 'vcenter'
-                    })
-                    header_name_format = workbook.add_format({
-                        'bold': True, 'fg_color': '#4472C4', 'font_color': 'white', 'border': 1,
-                        'align': 'center', 'valign': 'vcenter', 'text_wrap': True
-                    })
-                    cell_border_format = workbook.add_format({'border': 1, 'align': 'center'})
-                    number_format = workbook.add_format({
-                        'num_format': '#,##0', 'border': 1, 'align': 'right'
-                    })
-                    percent_format = workbook.add_format({
-                        'num_format': '0.0%', 'border': 1, 'align': 'right'
-                    })
-                    percent_format_id = workbook.add_format({
-                        'num_format': '0,0%', 'border': 1, 'align': 'right'
-                    })
-                    eks_format = workbook.add_format({
-                        'num_format': '0 "Eks"', 'border': 1, 'align': 'right'
-                    })
+                        # --- FORMAT ---
+                        title_format = workbook.add_format({
+                            'bold': True, 'fg_color': '#4472C4', 'font_color': 'white',
+                            'align': 'center', 'valign': 'vcenter', 'font_size': 14
+                        })
+                        header_format = workbook.add_format({
+                            'bold': True, 'fg_color': '#DDEBF7', 'border': 1,
+                            'align': 'center', 'valign': 'vcenter'
+                        })
+                        header_name_format = workbook.add_format({
+                            'bold': True, 'fg_color': '#4472C4', 'font_color': 'white', 'border': 1,
+                            'align': 'center', 'valign': 'vcenter', 'text_wrap': True
+                        })
+                        cell_border_format = workbook.add_format({'border': 1, 'align': 'center'})
+                        number_format = workbook.add_format({
+                            'num_format': '#,##0', 'border': 1, 'align': 'right'
+                        })
+                        percent_format = workbook.add_format({
+                            'num_format': '0.0%', 'border': 1, 'align': 'right'
+                        })
+                        percent_format_id = workbook.add_format({
+                            'num_format': '0,0%', 'border': 1, 'align': 'right'
+                        })
+                        eks_format = workbook.add_format({
+                            'num_format': '0 "Eks"', 'border': 1, 'align': 'right'
+                        })
                 
                     
-                    # --- PROSES SHOPEE ---
-                    if valid_shopee:
-                        # Extract data dari tiap file
-                        shopee_data = {}
-                        for toko_name, file in valid_shopee.items():
-                            # Baca dengan header di baris ke-4 (index 4, setelah merge 2 baris + header 2 baris)
-                            # Atau baca tanpa header lalu cari manual
-                            df = pd.read_excel(file, sheet_name='SUMMARY', header=None)
+                        # --- PROSES SHOPEE ---
+                        if valid_shopee:
+                            # Extract data dari tiap file
+                            shopee_data = {}
+                            for toko_name, file in valid_shopee.items():
+                                # Baca dengan header di baris ke-4 (index 4, setelah merge 2 baris + header 2 baris)
+                                # Atau baca tanpa header lalu cari manual
+                                df = pd.read_excel(file, sheet_name='SUMMARY', header=None)
                             
-                            # Cari baris yang mengandung 'Total' di kolom kedua (index 1)
-                            # Struktur: No | Nama Produk | Jumlah Terjual | ...
-                            # Kolom 1 = Nama Produk
-                            total_mask = df.iloc[:, 1].astype(str).str.strip() == 'Total'
-                            if not total_mask.any():
-                                st.warning(f"Tidak menemukan baris 'Total' di file {toko_name}")
-                                continue
-                            
-                            total_row_values = df[total_mask].iloc[0]
+                                # Cari baris yang mengandung 'Total' di kolom kedua (index 1)
+                                # Struktur: No | Nama Produk | Jumlah Terjual | ...
+                                # Kolom 1 = Nama Produk
+                                total_mask = df.iloc[:, 1].astype(str).str.strip() == 'Total'
+                                if not total_mask.any():
+                                    st.warning(f"Tidak menemukan baris 'Total' di file {toko_name}")
+                                    continue
                             
-                            # Cari header kolom di baris ke-3 (index 3)
-                            # Header ada di baris 3 (setelah judul baris 0-1, header baris 2-3)
-                            # Karena merge, header sebenarnya di baris 3
-                            header_row = df.iloc[3].astype(str).str.strip()
+                                total_row_values = df[total_mask].iloc[0]
                             
-                            # Buat dictionary dari header dan values
-                            total_row = {}
-                            for i, col_name in enumerate(header_row):
-                                if pd.notna(col_name) and col_name != '' and col_name != 'nan':
-                                    total_row[col_name] = total_row_values.iloc[i]
+                                # Cari header kolom di baris ke-3 (index 3)
+                                # Header ada di baris 3 (setelah judul baris 0-1, header baris 2-3)
+                                # Karena merge, header sebenarnya di baris 3
+                                header_row = df.iloc[3].astype(str).str.strip()
                             
-                            # Fallback: jika tidak ketemu, coba baris 2
-                            if 'Persentase' not in total_row or pd.isna(total_row.get('Persentase')):
-                                header_row = df.iloc[2].astype(str).str.strip()
+                                # Buat dictionary dari header dan values
                                 total_row = {}
                                 for i, col_name in enumerate(header_row):
                                     if pd.notna(col_name) and col_name != '' and col_name != 'nan':
                                         total_row[col_name] = total_row_values.iloc[i]
+                            
+                                # Fallback: jika tidak ketemu, coba baris 2
+                                if 'Persentase' not in total_row or pd.isna(total_row.get('Persentase')):
+                                    header_row = df.iloc[2].astype(str).str.strip()
+                                    total_row = {}
+                                    for i, col_name in enumerate(header_row):
+                                        if pd.notna(col_name) and col_name != '' and col_name != 'nan':
+                                            total_row[col_name] = total_row_values.iloc[i]
                                         
-                            shopee_data[toko_name] = {
-                                'margin': total_row['Persentase'],
-                                'penjualan_per_hari': total_row['Penjualan Per Hari'],
-                                'buku_per_pesanan': total_row['Jumlah buku per pesanan'],
-                                'jumlah_eks': total_row['Jumlah Eksemplar'],
-                                'total_penjualan': total_row['Total Penjualan']
-                            }
+                                shopee_data[toko_name] = {
+                                    'margin': total_row['Persentase'],
+                                    'penjualan_per_hari': total_row['Penjualan Per Hari'],
+                                    'buku_per_pesanan': total_row['Jumlah buku per pesanan'],
+                                    'jumlah_eks': total_row['Jumlah Eksemplar'],
+                                    'total_penjualan': total_row['Total Penjualan']
+                                }
                         
-                        # Buat DataFrame perbandingan
-                        toko_list = list(shopee_data.keys())
-                        shopee_comp = pd.DataFrame({
-                            'No': [1, 2, 3, 4, 5],
-                            '': ['Margin', 'Penjualan Per hari', 'Jumlah Buku Per Pesanan', 
-                                 'Jumlah Eks', 'Total Penjualan']
-                        })
-                        for toko in toko_list:
-                            shopee_comp[toko] = [
-                                shopee_data[toko]['margin'],
-                                shopee_data[toko]['penjualan_per_hari'],
-                                shopee_data[toko]['buku_per_pesanan'],
-                                shopee_data[toko]['jumlah_eks'],
-                                shopee_data[toko]['total_penjualan']
-                            ]
+                            # Buat DataFrame perbandingan
+                            toko_list = list(shopee_data.keys())
+                            shopee_comp = pd.DataFrame({
+                                'No': [1, 2, 3, 4, 5],
+                                '': ['Margin', 'Penjualan Per hari', 'Jumlah Buku Per Pesanan', 
+                                     'Jumlah Eks', 'Total Penjualan']
+                            })
+                            for toko in toko_list:
+                                shopee_comp[toko] = [
+                                    shopee_data[toko]['margin'],
+                                    shopee_data[toko]['penjualan_per_hari'],
+                                    shopee_data[toko]['buku_per_pesanan'],
+                                    shopee_data[toko]['jumlah_eks'],
+                                    shopee_data[toko]['total_penjualan']
+                                ]
                         
-                        # Tulis ke Excel
-                        # Ambil tanggal dari file pertama untuk judul
-                        try:
-                            first_file = list(valid_shopee.values())[0]
-                            df_date = pd.read_excel(first_file, sheet_name='SUMMARY', header=None, nrows=5)
-                            # Cek baris judul (biasanya baris ke-4 setelah merge)
-                            # Atau ambil dari nama sheet
-                            tgl_str = "Periode Tertentu"
-                        except:
-                            tgl_str = ""
+                            # Tulis ke Excel
+                            # Ambil tanggal dari file pertama untuk judul
+                            try:
+                                first_file = list(valid_shopee.values())[0]
+                                df_date = pd.read_excel(first_file, sheet_name='SUMMARY', header=None, nrows=5)
+                                # Cek baris judul (biasanya baris ke-4 setelah merge)
+                                # Atau ambil dari nama sheet
+                                tgl_str = "Periode Tertentu"
+                            except:
+                                tgl_str = ""
                         
-                        sheet_name = "SUMMARY SHOPEE"
-                        start_row = 4
-                        shopee_comp.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row, header=False)
-                        ws = writer.sheets[sheet_name]
+                            sheet_name = "SUMMARY SHOPEE"
+                            start_row = 4
+                            shopee_comp.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row, header=False)
+                            ws = writer.sheets[sheet_name]
                         
-                        # Judul
-                        tgl_range = extract_date_range_from_summary(list(valid_shopee.values())[0])
-                        judul = f"SUMMARY SHOPEE {tgl_range}" if tgl_range else "SUMMARY SHOPEE"
-                        ws.merge_range(0, 0, 1, len(shopee_comp.columns)-1, judul, title_format)
+                            # Judul
+                            tgl_range = extract_date_range_from_summary(list(valid_shopee.values())[0])
+                            judul = f"SUMMARY SHOPEE {tgl_range}" if tgl_range else "SUMMARY SHOPEE"
+                            ws.merge_range(0, 0, 1, len(shopee_comp.columns)-1, judul, title_format)
                         
-                        # Header
-                        for col_num, val in enumerate(shopee_comp.columns.values):
-                            ws.merge_range(2, col_num, 3, col_num, val, header_name_format)
+                            # Header
+                            for col_num, val in enumerate(shopee_comp.columns.values):
+                                ws.merge_range(2, col_num, 3, col_num, val, header_name_format)
                         
-                        # Format data
-                        for row_idx in range(len(shopee_comp)):
-                            excel_row = start_row + row_idx
-                            for col_idx in range(len(shopee_comp.columns)):
-                                val = shopee_comp.iloc[row_idx, col_idx]
-                                if col_idx == 0:  # Kolom No
-                                    ws.write(excel_row, col_idx, val, cell_border_format)
-                                elif col_idx == 1:  # Kolom indikator
-                                    ws.write(excel_row, col_idx, val, cell_border_format)
-                                else:  # Data toko
-                                    if row_idx == 0:  # Margin
-                                        ws.write(excel_row, col_idx, val, percent_format)
-                                    elif row_idx == 2:  # Jumlah Buku Per Pesanan
-                                        # Format: "4 Eks" - gabungkan angka dengan teks "Eks"
-                                        val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
-                                        ws.write(excel_row, col_idx, val_eks, cell_border_format)
-                                    elif row_idx == 3:  # Jumlah Eks
-                                        val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
-                                        ws.write(excel_row, col_idx, val_eks, cell_border_format)
-                                    else:
-                                        ws.write(excel_row, col_idx, val, number_format)
+                            # Format data
+                            for row_idx in range(len(shopee_comp)):
+                                excel_row = start_row + row_idx
+                                for col_idx in range(len(shopee_comp.columns)):
+                                    val = shopee_comp.iloc[row_idx, col_idx]
+                                    if col_idx == 0:  # Kolom No
+                                        ws.write(excel_row, col_idx, val, cell_border_format)
+                                    elif col_idx == 1:  # Kolom indikator
+                                        ws.write(excel_row, col_idx, val, cell_border_format)
+                                    else:  # Data toko
+                                        if row_idx == 0:  # Margin
+                                            ws.write(excel_row, col_idx, val, percent_format)
+                                        elif row_idx == 2:  # Jumlah Buku Per Pesanan
+                                            # Format: "4 Eks" - gabungkan angka dengan teks "Eks"
+                                            val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
+                                            ws.write(excel_row, col_idx, val_eks, cell_border_format)
+                                        elif row_idx == 3:  # Jumlah Eks
+                                            val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
+                                            ws.write(excel_row, col_idx, val_eks, cell_border_format)
+                                        else:
+                                            ws.write(excel_row, col_idx, val, number_format)
                         
-                        # Auto-width
-                        for i, col in enumerate(shopee_comp.columns):
-                            ws.set_column(i, i, 18)
+                            # Auto-width
+                            for i, col in enumerate(shopee_comp.columns):
+                                ws.set_column(i, i, 18)
                     
-                    # --- PROSES TIKTOK (miror dari Shopee) ---
-                    if valid_tiktok:
-                        tiktok_data = {}
-                        for toko_name, file in valid_tiktok.items():
-                            df = pd.read_excel(file, sheet_name='SUMMARY', header=None)
-                            
-                            total_mask = df.iloc[:, 1].astype(str).str.strip() == 'Total'
-                            if not total_mask.any():
-                                st.warning(f"Tidak menemukan baris 'Total' di file {toko_name}")
-                                continue
+                        # --- PROSES TIKTOK (miror dari Shopee) ---
+                        if valid_tiktok:
+                            tiktok_data = {}
+                            for toko_name, file in valid_tiktok.items():
+                                df = pd.read_excel(file, sheet_name='SUMMARY', header=None)
                             
-                            total_row_values = df[total_mask].iloc[0]
+                                total_mask = df.iloc[:, 1].astype(str).str.strip() == 'Total'
+                                if not total_mask.any():
+                                    st.warning(f"Tidak menemukan baris 'Total' di file {toko_name}")
+                                    continue
                             
-                            header_row = df.iloc[3].astype(str).str.strip()
-                            total_row = {}
-                            for i, col_name in enumerate(header_row):
-                                if pd.notna(col_name) and col_name != '' and col_name != 'nan':
-                                    total_row[col_name] = total_row_values.iloc[i]
+                                total_row_values = df[total_mask].iloc[0]
                             
-                            if 'Persentase' not in total_row or pd.isna(total_row.get('Persentase')):
-                                header_row = df.iloc[2].astype(str).str.strip()
+                                header_row = df.iloc[3].astype(str).str.strip()
                                 total_row = {}
                                 for i, col_name in enumerate(header_row):
                                     if pd.notna(col_name) and col_name != '' and col_name != 'nan':
                                         total_row[col_name] = total_row_values.iloc[i]
+                            
+                                if 'Persentase' not in total_row or pd.isna(total_row.get('Persentase')):
+                                    header_row = df.iloc[2].astype(str).str.strip()
+                                    total_row = {}
+                                    for i, col_name in enumerate(header_row):
+                                        if pd.notna(col_name) and col_name != '' and col_name != 'nan':
+                                            total_row[col_name] = total_row_values.iloc[i]
                                         
-                            tiktok_data[toko_name] = {
-                                'margin': total_row['Persentase'],
-                                'penjualan_per_hari': total_row['Penjualan Per Hari'],
-                                'buku_per_pesanan': total_row['Jumlah buku per pesanan'],
-                                'jumlah_terjual': total_row['Jumlah Terjual'],  # TikTok pakai Jumlah Terjual
-                                'total_penjualan': total_row['Total Penjualan']
-                            }
+                                tiktok_data[toko_name] = {
+                                    'margin': total_row['Persentase'],
+                                    'penjualan_per_hari': total_row['Penjualan Per Hari'],
+                                    'buku_per_pesanan': total_row['Jumlah buku per pesanan'],
+                                    'jumlah_terjual': total_row['Jumlah Terjual'],  # TikTok pakai Jumlah Terjual
+                                    'total_penjualan': total_row['Total Penjualan']
+                                }
                         
-                        toko_list = list(tiktok_data.keys())
-                        tiktok_comp = pd.DataFrame({
-                            'No': [1, 2, 3, 4, 5],
-                            '': ['Margin', 'Penjualan Per hari', 'Jumlah Buku Per Pesanan',
-                                 'Jumlah Terjual', 'Total Penjualan']
-                        })
-                        for toko in toko_list:
-                            tiktok_comp[toko] = [
-                                tiktok_data[toko]['margin'],
-                                tiktok_data[toko]['penjualan_per_hari'],
-                                tiktok_data[toko]['buku_per_pesanan'],
-                                tiktok_data[toko]['jumlah_terjual'],
-                                tiktok_data[toko]['total_penjualan']
-                            ]
+                            toko_list = list(tiktok_data.keys())
+                            tiktok_comp = pd.DataFrame({
+                                'No': [1, 2, 3, 4, 5],
+                                '': ['Margin', 'Penjualan Per hari', 'Jumlah Buku Per Pesanan',
+                                     'Jumlah Terjual', 'Total Penjualan']
+                            })
+                            for toko in toko_list:
+                                tiktok_comp[toko] = [
+                                    tiktok_data[toko]['margin'],
+                                    tiktok_data[toko]['penjualan_per_hari'],
+                                    tiktok_data[toko]['buku_per_pesanan'],
+                                    tiktok_data[toko]['jumlah_terjual'],
+                                    tiktok_data[toko]['total_penjualan']
+                                ]
                         
-                        sheet_name = "SUMMARY TIKTOK"
-                        start_row = 4
-                        tiktok_comp.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row, header=False)
-                        ws = writer.sheets[sheet_name]
+                            sheet_name = "SUMMARY TIKTOK"
+                            start_row = 4
+                            tiktok_comp.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row, header=False)
+                            ws = writer.sheets[sheet_name]
                         
-                        tgl_range_tiktok = extract_date_range_from_summary(list(valid_tiktok.values())[0])
-                        judul = f"SUMMARY TIKTOK {tgl_range_tiktok}" if tgl_range_tiktok else "SUMMARY TIKTOK"
-                        ws.merge_range(0, 0, 1, len(tiktok_comp.columns)-1, judul, title_format)
+                            tgl_range_tiktok = extract_date_range_from_summary(list(valid_tiktok.values())[0])
+                            judul = f"SUMMARY TIKTOK {tgl_range_tiktok}" if tgl_range_tiktok else "SUMMARY TIKTOK"
+                            ws.merge_range(0, 0, 1, len(tiktok_comp.columns)-1, judul, title_format)
                         
-                        for col_num, val in enumerate(tiktok_comp.columns.values):
-                            ws.merge_range(2, col_num, 3, col_num, val, header_name_format)
+                            for col_num, val in enumerate(tiktok_comp.columns.values):
+                                ws.merge_range(2, col_num, 3, col_num, val, header_name_format)
                         
-                        for row_idx in range(len(tiktok_comp)):
-                            excel_row = start_row + row_idx
-                            for col_idx in range(len(tiktok_comp.columns)):
-                                val = tiktok_comp.iloc[row_idx, col_idx]
-                                if col_idx <= 1:
-                                    ws.write(excel_row, col_idx, val, cell_border_format)
-                                else:
-                                    if row_idx == 0:
-                                        ws.write(excel_row, col_idx, val, percent_format)
-                                    elif row_idx == 2:  # Jumlah Buku Per Pesanan
-                                        val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
-                                        ws.write(excel_row, col_idx, val_eks, cell_border_format)
-                                    elif row_idx == 3:  # Jumlah Terjual
-                                        val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
-                                        ws.write(excel_row, col_idx, val_eks, cell_border_format)
+                            for row_idx in range(len(tiktok_comp)):
+                                excel_row = start_row + row_idx
+                                for col_idx in range(len(tiktok_comp.columns)):
+                                    val = tiktok_comp.iloc[row_idx, col_idx]
+                                    if col_idx <= 1:
+                                        ws.write(excel_row, col_idx, val, cell_border_format)
                                     else:
-                                        ws.write(excel_row, col_idx, val, number_format)
+                                        if row_idx == 0:
+                                            ws.write(excel_row, col_idx, val, percent_format)
+                                        elif row_idx == 2:  # Jumlah Buku Per Pesanan
+                                            val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
+                                            ws.write(excel_row, col_idx, val_eks, cell_border_format)
+                                        elif row_idx == 3:  # Jumlah Terjual
+                                            val_eks = f"{int(val)} Eks" if pd.notna(val) and val != 0 else "0 Eks"
+                                            ws.write(excel_row, col_idx, val_eks, cell_border_format)
+                                        else:
+                                            ws.write(excel_row, col_idx, val, number_format)
                         
-                        for i, col in enumerate(tiktok_comp.columns):
-                            ws.set_column(i, i, 18)
+                            for i, col in enumerate(tiktok_comp.columns):
+                                ws.set_column(i, i, 18)
                 
-                output.seek(0)
-                st.success("✅ Perbandingan Multi-Toko Berhasil!")
-                tgl_range = None
-                if valid_shopee:
-                    tgl_range = extract_date_range_from_summary(list(valid_shopee.values())[0])
-                elif valid_tiktok:
-                    tgl_range = extract_date_range_from_summary(list(valid_tiktok.values())[0])
+                    output.seek(0)
+                    st.success("✅ Perbandingan Multi-Toko Berhasil!")
+                    tgl_range = None
+                    if valid_shopee:
+                        tgl_range = extract_date_range_from_summary(list(valid_shopee.values())[0])
+                    elif valid_tiktok:
+                        tgl_range = extract_date_range_from_summary(list(valid_tiktok.values())[0])
                 
-                # Format nama toko untuk filename
-                toko_names = []
-                if valid_shopee:
-                    toko_names.extend(list(valid_shopee.keys()))
-                if valid_tiktok:
-                    toko_names.extend([f"{t} TikTok" for t in valid_tiktok.keys()])
+                    # Format nama toko untuk filename
+                    toko_names = []
+                    if valid_shopee:
+                        toko_names.extend(list(valid_shopee.keys()))
+                    if valid_tiktok:
+                        toko_names.extend([f"{t} TikTok" for t in valid_tiktok.keys()])
                 
-                toko_str = ", ".join(toko_names) if toko_names else "MULTI_TOKO"
+                    toko_str = ", ".join(toko_names) if toko_names else "MULTI_TOKO"
                 
-                if tgl_range:
-                    file_name = f"SUMMARY SHOPEE & TIKTOK {tgl_range} ({toko_str}).xlsx"
-                else:
-                    file_name = f"SUMMARY SHOPEE & TIKTOK {datetime.now().strftime('%d %b %Y')} ({toko_str}).xlsx"
+                    if tgl_range:
+                        file_name = f"SUMMARY SHOPEE & TIKTOK {tgl_range} ({toko_str}).xlsx"
+                    else:
+                        file_name = f"SUMMARY SHOPEE & TIKTOK {datetime.now().strftime('%d %b %Y')} ({toko_str}).xlsx"
                 
-                st.download_button(
-                    label="📥 Download File Perbandingan Multi-Toko",
-                    data=output,
-                    file_name=file_name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                    st.download_button(
+                        label="📥 Download File Perbandingan Multi-Toko",
+                        data=output,
+                        file_name=file_name,
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
                 
-            except Exception as e:
-                st.error(f"Error: {e}")
-                st.exception(e)
+                except Exception as e:
+                    st.error(f"Error: {e}")
+                    st.exception(e)
     
-    st.stop()
+        st.stop()
 
-elif jenis_rekapan == "Akumulasi Order":
-    st.info("Mode Akumulasi Order: Hitung total Subtotal Pesanan per hari (Senin-Minggu) untuk 7 toko dalam periode 1 minggu terakhir.")
+    elif jenis_rekapan == "Akumulasi Order":
+        st.info("Mode Akumulasi Order: Hitung total Subtotal Pesanan per hari (Senin-Minggu) untuk 7 toko dalam periode 1 minggu terakhir.")
     
-    marketplace_akumulasi = st.selectbox("Pilih Marketplace:", ("Shopee", "TikTok"), key="akum_market")
+        marketplace_akumulasi = st.selectbox("Pilih Marketplace:", ("Shopee", "TikTok"), key="akum_market")
     
-    toko_list = ["Human Store", "Pacific Bookstore", "DAMA.ID STORE", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"]
+        toko_list = ["Human Store", "Pacific Bookstore", "DAMA.ID STORE", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"]
     
-    st.subheader("📦 Import File SUMMARY (7 Toko)")
-    st.caption("Upload file SUMMARY dari tiap toko (satu file per toko). File harus memiliki sheet 'sheet order-all' (Shopee) atau 'sheet semua pesanan' (TikTok).")
+        st.subheader("📦 Import File SUMMARY (7 Toko)")
+        st.caption("Upload file SUMMARY dari tiap toko (satu file per toko). File harus memiliki sheet 'sheet order-all' (Shopee) atau 'sheet semua pesanan' (TikTok).")
     
-    file_toko = {}
-    cols = st.columns(3)
-    for i, toko in enumerate(toko_list):
-        with cols[i % 3]:
-            file_toko[toko] = st.file_uploader(f"SUMMARY {toko}", type=["xlsx"], key=f"akum_{toko}")
+        file_toko = {}
+        cols = st.columns(3)
+        for i, toko in enumerate(toko_list):
+            with cols[i % 3]:
+                file_toko[toko] = st.file_uploader(f"SUMMARY {toko}", type=["xlsx"], key=f"akum_{toko}")
     
-    # --- PILIHAN TANGGAL REFERENSI (Senin minggu ini) ---
-    st.markdown("---")
-    st.subheader("📅 Pilih Tanggal Referensi")
-    st.caption("Pilih hari Senin dari minggu yang ingin Anda analisis. Sistem akan otomatis menghitung rentang Senin-Minggu (7 hari).")
-    
-    # Default: cari Senin minggu lalu dari hari ini
-    today = datetime.now().date()
-    days_since_monday = today.weekday()  # 0=Senin, 6=Minggu
-    last_monday = today - timedelta(days=days_since_monday + 7)  # Senin minggu lalu
-    
-    selected_monday = st.date_input(
-        "Pilih hari Senin (awal minggu):",
-        value=last_monday,
-        help="Pilih hari Senin, sistem akan otomatis menghitung sampai Minggu (7 hari)"
-    )
+        # --- PILIHAN TANGGAL REFERENSI (Senin minggu ini) ---
+        st.markdown("---")
+        st.subheader("📅 Pilih Tanggal Referensi")
+        st.caption("Pilih hari Senin dari minggu yang ingin Anda analisis. Sistem akan otomatis menghitung rentang Senin-Minggu (7 hari).")
+    
+        # Default: cari Senin minggu lalu dari hari ini
+        today = datetime.now().date()
+        days_since_monday = today.weekday()  # 0=Senin, 6=Minggu
+        last_monday = today - timedelta(days=days_since_monday + 7)  # Senin minggu lalu
+    
+        selected_monday = st.date_input(
+            "Pilih hari Senin (awal minggu):",
+            value=last_monday,
+            help="Pilih hari Senin, sistem akan otomatis menghitung sampai Minggu (7 hari)"
+        )
     
-    # Hitung rentang: Senin sampai Minggu (6 hari setelah Senin)
-    start_date = pd.Timestamp(selected_monday)
-    end_date = start_date + pd.Timedelta(days=6)  # Minggu
+        # Hitung rentang: Senin sampai Minggu (6 hari setelah Senin)
+        start_date = pd.Timestamp(selected_monday)
+        end_date = start_date + pd.Timedelta(days=6)  # Minggu
     
-    # Tampilkan rentang yang akan diproses
-    date_range_str = f"{start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')}"
-    st.info(f"Rentang yang akan diproses: **{date_range_str}** (Senin - Minggu)")
+        # Tampilkan rentang yang akan diproses
+        date_range_str = f"{start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')}"
+        st.info(f"Rentang yang akan diproses: **{date_range_str}** (Senin - Minggu)")
     
-    if st.button("🚀 Proses Akumulasi Order"):
-        valid_files = {k: v for k, v in file_toko.items() if v is not None}
+        if st.button("🚀 Proses Akumulasi Order"):
+            valid_files = {k: v for k, v in file_toko.items() if v is not None}
         
-        if len(valid_files) == 0:
-            st.error("Minimal upload 1 file SUMMARY!")
-        else:
-            try:
-                # Tentukan sheet dan kolom berdasarkan marketplace
-                if marketplace_akumulasi == "Shopee":
-                    sheet_name = "sheet order-all"
-                    waktu_col = "Waktu Pesanan Dibuat"
-                    status_col = "Status Pesanan"
-                    no_pesanan_col = "No. Pesanan"
-                    status_exclude = "Batal"
-                else:  # TikTok
-                    sheet_name = "sheet semua pesanan"
-                    waktu_col = "CREATED TIME"
-                    status_col = "ORDER STATUS"
-                    no_pesanan_col = "ORDER ID"
-                    status_exclude = "Canceled"
+            if len(valid_files) == 0:
+                st.error("Minimal upload 1 file SUMMARY!")
+            else:
+                try:
+                    # Tentukan sheet dan kolom berdasarkan marketplace
+                    if marketplace_akumulasi == "Shopee":
+                        sheet_name = "sheet order-all"
+                        waktu_col = "Waktu Pesanan Dibuat"
+                        status_col = "Status Pesanan"
+                        no_pesanan_col = "No. Pesanan"
+                        status_exclude = "Batal"
+                    else:  # TikTok
+                        sheet_name = "sheet semua pesanan"
+                        waktu_col = "CREATED TIME"
+                        status_col = "ORDER STATUS"
+                        no_pesanan_col = "ORDER ID"
+                        status_exclude = "Canceled"
                 
-                # Dictionary untuk menyimpan hasil per toko
-                hasil_akumulasi = {}
+                    # Dictionary untuk menyimpan hasil per toko
+                    hasil_akumulasi = {}
                 
-                for toko_name, file in valid_files.items():
-                    # Baca sheet
-                    df = pd.read_excel(file, sheet_name=sheet_name)
-                    df.columns = [str(c).strip() for c in df.columns]
+                    for toko_name, file in valid_files.items():
+                        # Baca sheet
+                        df = pd.read_excel(file, sheet_name=sheet_name)
+                        df.columns = [str(c).strip() for c in df.columns]
                     
-                    # Konversi kolom waktu ke datetime
-                    df[waktu_col] = pd.to_datetime(df[waktu_col], errors='coerce')
+                        # Konversi kolom waktu ke datetime
+                        df[waktu_col] = pd.to_datetime(df[waktu_col], errors='coerce')
                     
-                    # === FILTER RENTANG TANGGAL: Senin - Minggu ===
-                    df = df[(df[waktu_col] >= start_date) & (df[waktu_col] <= end_date + pd.Timedelta(days=1))]
+                        # === FILTER RENTANG TANGGAL: Senin - Minggu ===
+                        df = df[(df[waktu_col] >= start_date) & (df[waktu_col] <= end_date + pd.Timedelta(days=1))]
                     
-                    if df.empty:
-                        st.warning(f"Tidak ada data untuk toko {toko_name} di rentang {date_range_str}")
-                        hasil_akumulasi[toko_name] = {}
-                        continue
+                        if df.empty:
+                            st.warning(f"Tidak ada data untuk toko {toko_name} di rentang {date_range_str}")
+                            hasil_akumulasi[toko_name] = {}
+                            continue
                     
-                    # Filter: exclude status Batal/Canceled
-                    if status_col in df.columns:
-                        df = df[df[status_col].astype(str).str.strip().str.lower() != status_exclude.lower()]
+                        # Filter: exclude status Batal/Canceled
+                        if status_col in df.columns:
+                            df = df[df[status_col].astype(str).str.strip().str.lower() != status_exclude.lower()]
                     
-                    # --- PERUBAHAN: Bersihkan dan jumlahkan kolom Subtotal Pesanan ---
-                    subtotal_col = "Subtotal Pesanan"
-                    if subtotal_col in df.columns:
-                        df[subtotal_col] = df[subtotal_col].astype(str).str.replace(r'[^\d,\-]', '', regex=True)
-                        df[subtotal_col] = df[subtotal_col].str.replace(',', '.', regex=False)
-                        df[subtotal_col] = pd.to_numeric(df[subtotal_col], errors='coerce').fillna(0)
-                    else:
-                        df[subtotal_col] = 0
+                        # --- PERUBAHAN: Bersihkan dan jumlahkan kolom Subtotal Pesanan ---
+                        subtotal_col = "Subtotal Pesanan"
+                        if subtotal_col in df.columns:
+                            df[subtotal_col] = clean_and_convert_to_numeric(df[subtotal_col])
+                        else:
+                            df[subtotal_col] = 0
                     
-                    # Hitung TOTAL SUBTOTAL per hari (0=Senin, 6=Minggu)
-                    df['Hari'] = df[waktu_col].dt.dayofweek
-                    daily_counts = df.groupby('Hari')[subtotal_col].sum().to_dict()
+                        # Hitung TOTAL SUBTOTAL per hari (0=Senin, 6=Minggu)
+                        df['Hari'] = df[waktu_col].dt.dayofweek
+                        daily_counts = df.groupby('Hari')[subtotal_col].sum().to_dict()
                     
-                    hasil_akumulasi[toko_name] = daily_counts
+                        hasil_akumulasi[toko_name] = daily_counts
                 
-                # Buat DataFrame output
-                hari_labels = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
+                    # Buat DataFrame output
+                    hari_labels = ["Senin", "Selasa", "Rabu", "Kamis", "Jumat", "Sabtu", "Minggu"]
                 
-                rows = []
-                for toko in toko_list:
-                    if toko in hasil_akumulasi:
-                        row = {"Toko": toko}
-                        for i, hari in enumerate(hari_labels):
-                            row[hari] = hasil_akumulasi[toko].get(i, 0)
-                        row["Total"] = sum(row[h] for h in hari_labels)
-                        rows.append(row)
-                    else:
-                        rows.append({"Toko": toko, **{h: 0 for h in hari_labels}, "Total": 0})
+                    rows = []
+                    for toko in toko_list:
+                        if toko in hasil_akumulasi:
+                            row = {"Toko": toko}
+                            for i, hari in enumerate(hari_labels):
+                                row[hari] = hasil_akumulasi[toko].get(i, 0)
+                            row["Total"] = sum(row[h] for h in hari_labels)
+                            rows.append(row)
+                        else:
+                            rows.append({"Toko": toko, **{h: 0 for h in hari_labels}, "Total": 0})
                 
-                # Tambah baris total
-                total_row = {"Toko": "Total"}
-                for hari in hari_labels:
-                    total_row[hari] = sum(r.get(hari, 0) for r in rows)
-                total_row["Total"] = sum(total_row[h] for h in hari_labels)
-                rows.append(total_row)
+                    # Tambah baris total
+                    total_row = {"Toko": "Total"}
+                    for hari in hari_labels:
+                        total_row[hari] = sum(r.get(hari, 0) for r in rows)
+                    total_row["Total"] = sum(total_row[h] for h in hari_labels)
+                    rows.append(total_row)
                 
-                df_output = pd.DataFrame(rows)
+                    df_output = pd.DataFrame(rows)
                 
-                # Buat file Excel dengan formatting
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    workbook = writer.book
+                    # Buat file Excel dengan formatting
+                    output = io.BytesIO()
+                    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+                        workbook = writer.book
                     
-                    # Format
-                    title_format = workbook.add_format({
-                        'bold': True, 'fg_color': '#4472C4', 'font_color': 'white',
-                        'align': 'center', 'valign': 'vcenter', 'font_size': 14
-                    })
-                    header_format = workbook.add_format({
-                        'bold': True, 'fg_color': '#DDEBF7', 'border': 1,
-                        'align': 'center', 'valign': 'vcenter'
-                    })
-                    cell_format = workbook.add_format({
-                        'border': 1, 'align': 'center'
-                    })
-                    number_format = workbook.add_format({
-                        'num_format': '#,##0', 'border': 1, 'align': 'center'
-                    })
-                    total_format = workbook.add_format({
-                        'bold': True, 'fg_color': '#FFFF00', 'border': 1, 'align': 'center'
-                    })
-                    total_number_format = workbook.add_format({
-                        'bold': True, 'fg_color': '#FFFF00', 'num_format': '#,##0',
-                        'border': 1, 'align': 'center'
-                    })
+                        # Format
+                        title_format = workbook.add_format({
+                            'bold': True, 'fg_color': '#4472C4', 'font_color': 'white',
+                            'align': 'center', 'valign': 'vcenter', 'font_size': 14
+                        })
+                        header_format = workbook.add_format({
+                            'bold': True, 'fg_color': '#DDEBF7', 'border': 1,
+                            'align': 'center', 'valign': 'vcenter'
+                        })
+                        cell_format = workbook.add_format({
+                            'border': 1, 'align': 'center'
+                        })
+                        number_format = workbook.add_format({
+                            'num_format': '#,##0', 'border': 1, 'align': 'center'
+                        })
+                        total_format = workbook.add_format({
+                            'bold': True, 'fg_color': '#FFFF00', 'border': 1, 'align': 'center'
+                        })
+                        total_number_format = workbook.add_format({
+                            'bold': True, 'fg_color': '#FFFF00', 'num_format': '#,##0',
+                            'border': 1, 'align': 'center'
+                        })
                     
-                    # Judul
-                    judul = f"Akumulasi Order Mingguan {marketplace_akumulasi} {date_range_str}"
+                        # Judul
+                        judul = f"Akumulasi Order Mingguan {marketplace_akumulasi} {date_range_str}"
                     
-                    # Tulis data
-                    df_output.to_excel(writer, sheet_name='AKUMULASI ORDER', index=False, startrow=4, header=False)
-                    ws = writer.sheets['AKUMULASI ORDER']
+                        # Tulis data
+                        df_output.to_excel(writer, sheet_name='AKUMULASI ORDER', index=False, startrow=4, header=False)
+                        ws = writer.sheets['AKUMULASI ORDER']
                     
-                    # Merge judul
-                    ws.merge_range(0, 0, 1, len(df_output.columns) - 1, judul, title_format)
+                        # Merge judul
+                        ws.merge_range(0, 0, 1, len(df_output.columns) - 1, judul, title_format)
                     
-                    # Header
-                    for col_num, val in enumerate(df_output.columns.values):
-                        ws.merge_range(2, col_num, 3, col_num, val, header_format)
+                        # Header
+                        for col_num, val in enumerate(df_output.columns.values):
+                            ws.merge_range(2, col_num, 3, col_num, val, header_format)
                     
-                    # Data
-                    for row_idx in range(len(df_output)):
-                        excel_row = 4 + row_idx
-                        is_total_row = (row_idx == len(df_output) - 1)
+                        # Data
+                        for row_idx in range(len(df_output)):
+                            excel_row = 4 + row_idx
+                            is_total_row = (row_idx == len(df_output) - 1)
                         
-                        for col_idx in range(len(df_output.columns)):
-                            val = df_output.iloc[row_idx, col_idx]
+                            for col_idx in range(len(df_output.columns)):
+                                val = df_output.iloc[row_idx, col_idx]
                             
-                            if is_total_row:
-                                if col_idx == 0:
-                                    ws.write(excel_row, col_idx, val, total_format)
-                                else:
-                                    ws.write(excel_row, col_idx, val, total_number_format)
-                            else:
-                                if col_idx == 0:
-                                    ws.write(excel_row, col_idx, val, cell_format)
+                                if is_total_row:
+                                    if col_idx == 0:
+                                        ws.write(excel_row, col_idx, val, total_format)
+                                    else:
+                                        ws.write(excel_row, col_idx, val, total_number_format)
                                 else:
-                                    ws.write(excel_row, col_idx, val, number_format)
+                                    if col_idx == 0:
+                                        ws.write(excel_row, col_idx, val, cell_format)
+                                    else:
+                                        ws.write(excel_row, col_idx, val, number_format)
                     
-                    # Auto-width
-                    ws.set_column(0, 0, 20)
-                    for i in range(1, len(df_output.columns)):
-                        ws.set_column(i, i, 18)
+                        # Auto-width
+                        ws.set_column(0, 0, 20)
+                        for i in range(1, len(df_output.columns)):
+                            ws.set_column(i, i, 18)
                 
-                output.seek(0)
-                st.success("✅ Akumulasi Order Berhasil!")
+                    output.seek(0)
+                    st.success("✅ Akumulasi Order Berhasil!")
                 
-                file_name = f"Akumulasi_Order_{marketplace_akumulasi}_{start_date.strftime('%d%b%Y')}_{end_date.strftime('%d%b%Y')}.xlsx"
-                st.download_button(
-                    label=f"📥 Download Akumulasi Order {marketplace_akumulasi}",
-                    data=output,
-                    file_name=file_name,
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                    file_name = f"Akumulasi_Order_{marketplace_akumulasi}_{start_date.strftime('%d%b%Y')}_{end_date.strftime('%d%b%Y')}.xlsx"
+                    st.download_button(
+                        label=f"📥 Download Akumulasi Order {marketplace_akumulasi}",
+                        data=output,
+                        file_name=file_name,
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
                 
-            except Exception as e:
-                st.error(f"Error: {e}")
-                st.exception(e)
+                except Exception as e:
+                    st.error(f"Error: {e}")
+                    st.exception(e)
     
-    st.stop()
+        st.stop()
     
-marketplace_choice = st.selectbox(
-    "Pilih Marketplace:",
-    ("", "Shopee", "TikTok")
-)
-
-store_choice = ""
-if marketplace_choice == "Shopee":
-    store_choice = st.selectbox(
-        "Pilih Toko Shopee:",
-        ("Human Store", "Pacific Bookstore", "DAMA.ID STORE", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"),
-        key='shopee_store'
+    marketplace_choice = st.selectbox(
+        "Pilih Marketplace:",
+        ("", "Shopee", "TikTok")
     )
-elif marketplace_choice == "TikTok":
-    # Untuk sekarang, TikTok hanya untuk Human Store
-    store_choice = st.selectbox(
-        "Pilih Toko TikTok:",
-        ("Human Store", "DAMA.ID STORE", "Pacific Bookstore", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"), # Hanya toko yang relevan untuk TikTok
-        key='tiktok_store'
-    )
-    st.info("Marketplace TikTok saat ini tersedia untuk semua Toko.")
-
-# Hanya tampilkan uploader jika marketplace sudah dipilih
-if marketplace_choice:
-    try:
-        # ... (kode untuk membaca HARGA ONLINE.xlsx tetap sama) ...
-        katalog_df = pd.read_excel('HARGA ONLINE.xlsx')
-    
-        # Lakukan preprocessing langsung ke dataframe tunggal
-        katalog_df.columns = [str(c).strip().upper() for c in katalog_df.columns]
-        for col in ["JUDUL AL QUR'AN", "JENIS KERTAS", "UKURAN", "KATALOG HARGA"]:
-            if col not in katalog_df.columns:
-                katalog_df[col] = ""
-        katalog_df['JUDUL_NORM'] = katalog_df["JUDUL AL QUR'AN"].astype(str).str.upper().str.replace(r'[^A-Z0-9\s]', ' ', regex=True)
-        katalog_df['JENIS_KERTAS_NORM'] = katalog_df['JENIS KERTAS'].astype(str).str.upper().str.replace(r'[^A-Z0-9\s]', ' ', regex=True)
-        katalog_df['UKURAN_NORM'] = katalog_df['UKURAN'].astype(str).str.upper().str.replace(r'\s+', '', regex=True)
-        katalog_df['KATALOG_HARGA_NUM'] = pd.to_numeric(katalog_df['KATALOG HARGA'].astype(str).str.replace(r'[^0-9\.]', '', regex=True), errors='coerce').fillna(0)
-    except FileNotFoundError:
-        st.error("Error: File 'HARGA ONLINE.xlsx' tidak ditemukan.")
-        st.stop()
 
-    try:
-        harga_custom_tlj_df = pd.read_excel('Harga Custom TLJ.xlsx')
-        
-        # Lakukan preprocessing
-        harga_custom_tlj_df.columns = [str(c).strip().upper() for c in harga_custom_tlj_df.columns]
-        
-        # Pastikan kolom yang dibutuhkan ada
-        required_cols = ['NAMA PRODUK', 'VARIASI', 'HARGA CUSTOM TLJ']
-        if not all(col in harga_custom_tlj_df.columns for col in required_cols):
-            st.error(f"File 'Harga Custom TLJ.xlsx' harus memiliki kolom: {', '.join(required_cols)}")
+    store_choice = ""
+    if marketplace_choice == "Shopee":
+        store_choice = st.selectbox(
+            "Pilih Toko Shopee:",
+            TOKO_PER_MARKETPLACE["Shopee"],
+            key='shopee_store'
+        )
+    elif marketplace_choice == "TikTok":
+        # Untuk sekarang, TikTok hanya untuk Human Store
+        store_choice = st.selectbox(
+            "Pilih Toko TikTok:",
+            TOKO_PER_MARKETPLACE["TikTok"], # Hanya toko yang relevan untuk TikTok
+            key='tiktok_store'
+        )
+        st.info("Marketplace TikTok saat ini tersedia untuk semua Toko.")
+
+    # Hanya tampilkan uploader jika marketplace sudah dipilih
+    if marketplace_choice:
+        # Katalog dibaca dari cache; hanya di-parse ulang jika file di disk berubah
+        try:
+            katalog_df = get_katalog_harga_online()
+        except FileNotFoundError:
+            st.error("Error: File 'HARGA ONLINE.xlsx' tidak ditemukan.")
             st.stop()
 
-        # Buat kolom kunci untuk pencocokan yang mudah (Nama Produk + Variasi)
-        harga_custom_tlj_df['LOOKUP_KEY'] = harga_custom_tlj_df['NAMA PRODUK'].astype(str).str.strip() + ' ' + harga_custom_tlj_df['VARIASI'].astype(str).str.strip()
-        
-        # Pastikan kolom harga adalah numerik
-        harga_custom_tlj_df['HARGA CUSTOM TLJ'] = pd.to_numeric(harga_custom_tlj_df['HARGA CUSTOM TLJ'], errors='coerce').fillna(0)
-
-    except FileNotFoundError:
-        st.error("Error: File 'Harga Custom TLJ.xlsx' tidak ditemukan.")
-        st.stop()
-    except Exception as e:
-        st.error(f"Error saat membaca file 'Harga Custom TLJ.xlsx': {e}")
-        st.stop()
-
-    # --- TAMBAHKAN BLOK BARU INI UNTUK MEMBACA KATALOG DAMA ---
-    try:
-        katalog_dama_df = pd.read_excel('KATALOG_DAMA.xlsx') # Pastikan nama file benar
-
-        # Lakukan preprocessing
-        katalog_dama_df.columns = [str(c).strip().upper() for c in katalog_dama_df.columns]
-
-        # Pastikan kolom yang dibutuhkan ada
-        required_dama_cols = ['NAMA PRODUK', 'JENIS AL QUR\'AN', 'WARNA', 'UKURAN', 'PAKET', 'HARGA']
-        if not all(col in katalog_dama_df.columns for col in required_dama_cols):
-            st.error(f"File 'KATALOG_DAMA.xlsx' harus memiliki kolom: {', '.join(required_dama_cols)}")
+        try:
+            harga_custom_tlj_df = get_harga_custom_tlj()
+        except FileNotFoundError:
+            st.error("Error: File 'Harga Custom TLJ.xlsx' tidak ditemukan.")
+            st.stop()
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        except Exception as e:
+            st.error(f"Error saat membaca file 'Harga Custom TLJ.xlsx': {e}")
             st.stop()
 
-        # Konversi kolom harga ke numerik
-        katalog_dama_df['HARGA'] = pd.to_numeric(katalog_dama_df['HARGA'], errors='coerce').fillna(0)
-
-        # Bersihkan dan normalisasi kolom teks untuk pencocokan
-        for col in ['NAMA PRODUK', 'JENIS AL QUR\'AN', 'WARNA', 'UKURAN', 'PAKET']:
-            # Isi NaN dengan string kosong sebelum operasi string
-            katalog_dama_df[col] = katalog_dama_df[col].fillna('').astype(str).str.strip().str.upper()
-            # Hapus spasi ganda
-            katalog_dama_df[col] = katalog_dama_df[col].str.replace(r'\s+', ' ', regex=True)
-
-    except FileNotFoundError:
-        st.error("Error: File 'KATALOG_DAMA.xlsx' tidak ditemukan.")
-        st.stop()
-    except Exception as e:
-        st.error(f"Error saat membaca file 'KATALOG_DAMA.xlsx': {e}")
-        st.stop()
+        # --- KATALOG DAMA ---
+        try:
+            katalog_dama_df = get_katalog_dama()
+            dama_index = get_dama_index()
+        except FileNotFoundError:
+            st.error("Error: File 'KATALOG_DAMA.xlsx' tidak ditemukan.")
+            st.stop()
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        except Exception as e:
+            st.error(f"Error saat membaca file 'KATALOG_DAMA.xlsx': {e}")
+            st.stop()
         
-    st.header("1. Import File Anda")
-
-    if marketplace_choice == "Shopee":
-        col1, col2 = st.columns(2)
-        with col1:
-            uploaded_order = st.file_uploader("1. Import file order-all.xlsx", type="xlsx")
-            uploaded_income = st.file_uploader("2. Import file income dilepas.xlsx", type="xlsx")
-        with col2:
-            uploaded_iklan = st.file_uploader("3. Import file iklan produk", type="csv")
-            uploaded_seller = st.file_uploader("4. Import file seller conversion", type="csv")
-
-        st.markdown("---")
-        st.subheader("📱 Input Penjualan Offline (Opsional)")
-        uploaded_offline_images = st.file_uploader(
-            "Upload screenshot WhatsApp penjualan offline (bisa multiple gambar)", 
-            type=["png", "jpg", "jpeg"],
-            accept_multiple_files=True,  # <-- TAMBAHKAN INI
-            help="Bisa 1 gambar dengan multiple produk, atau multiple gambar dengan 1 produk each. Format: Nama produk: [nama], Eksemplar: [angka], Pesanan: [angka], Harga satuan: [angka]"
-        )
+        st.header("1. Import File Anda")
+
+        if marketplace_choice == "Shopee":
+            col1, col2 = st.columns(2)
+            with col1:
+                uploaded_order = st.file_uploader("1. Import file order-all.xlsx", type="xlsx")
+                uploaded_income = st.file_uploader("2. Import file income dilepas.xlsx", type="xlsx")
+            with col2:
+                uploaded_iklan = st.file_uploader("3. Import file iklan produk", type="csv")
+                uploaded_seller = st.file_uploader("4. Import file seller conversion", type="csv")
+
+            st.markdown("---")
+            st.subheader("📱 Input Penjualan Offline (Opsional)")
+            uploaded_offline_images = st.file_uploader(
+                "Upload screenshot WhatsApp penjualan offline (bisa multiple gambar)", 
+                type=["png", "jpg", "jpeg"],
+                accept_multiple_files=True,  # <-- TAMBAHKAN INI
+                help="Bisa 1 gambar dengan multiple produk, atau multiple gambar dengan 1 produk each. Format: Nama produk: [nama], Eksemplar: [angka], Pesanan: [angka], Harga satuan: [angka]"
+            )
+            # OCR langsung diantrekan ke worker latar begitu gambar di-upload
+            mulai_ocr_latar(uploaded_offline_images)
+            # Jalur cepat tanpa OCR: teks chat di-paste atau file .txt hasil export WhatsApp
+            offline_text_input = st.text_area(
+                "Atau paste teks chat WhatsApp penjualan offline (tanpa OCR)",
+                help="Format sama: Nama produk: [nama], Eksemplar: [angka], Pesanan: [angka], Harga satuan: [angka]"
+            )
+            uploaded_offline_txt = st.file_uploader(
+                "Atau upload file .txt export chat WhatsApp (tanpa OCR)",
+                type=["txt"],
+                accept_multiple_files=True
+            )
     
-        # Inisialisasi variabel lain agar tidak error
-        uploaded_income_tiktok = None
-        uploaded_semua_pesanan = None
-        uploaded_pdfs = None
+            # Inisialisasi variabel lain agar tidak error
+            uploaded_income_tiktok = None
+            uploaded_semua_pesanan = None
+            uploaded_pdfs = None
 
-    elif marketplace_choice == "TikTok":
-        col1, col2 = st.columns(2)
-        with col1:
-            uploaded_income_tiktok = st.file_uploader("1. Import file Income (Order details & Reports)", type="xlsx")
-            uploaded_semua_pesanan = st.file_uploader("2. Import file semua pesanan.xlsx", type="xlsx")
-            # product_data_file = st.file_uploader("3. Import file Product Data.xlsx", type="xlsx", accept_multiple_files=True)
-        with col2:
-            product_data_file = st.file_uploader("3. Import file Product Data.xlsx", type="xlsx", accept_multiple_files=True)
+        elif marketplace_choice == "TikTok":
+            col1, col2 = st.columns(2)
+            with col1:
+                uploaded_income_tiktok = st.file_uploader("1. Import file Income (Order details & Reports)", type="xlsx")
+                uploaded_semua_pesanan = st.file_uploader("2. Import file semua pesanan.xlsx", type="xlsx")
+                # product_data_file = st.file_uploader("3. Import file Product Data.xlsx", type="xlsx", accept_multiple_files=True)
+            with col2:
+                product_data_file = st.file_uploader("3. Import file Product Data.xlsx", type="xlsx", accept_multiple_files=True)
             
-            label_creator = "4. Import file creator order-all.xlsx"
-            if store_choice == "DAMA.ID STORE":
-                label_creator += " (Opsional)"
+                label_creator = "4. Import file creator order-all.xlsx"
+                if store_choice == "DAMA.ID STORE":
+                    label_creator += " (Opsional)"
                 
-            uploaded_creator_order = st.file_uploader(label_creator, type="xlsx")
-            # ---------------------------------
-
-            # uploaded_pdfs = st.file_uploader(
-            #     # Sesuaikan nomor urut jika creator order disembunyikan
-            #     f"{'4.' if store_choice != 'DAMA.ID STORE' else '3.'} Import Nota Resi Ekspedisi (bisa lebih dari satu)",
-            #     type="pdf",
-            #     accept_multiple_files=True
-            # )
-            uploaded_pdfs = None
+                uploaded_creator_order = st.file_uploader(label_creator, type="xlsx")
+                # ---------------------------------
+
+                # uploaded_pdfs = st.file_uploader(
+                #     # Sesuaikan nomor urut jika creator order disembunyikan
+                #     f"{'4.' if store_choice != 'DAMA.ID STORE' else '3.'} Import Nota Resi Ekspedisi (bisa lebih dari satu)",
+                #     type="pdf",
+                #     accept_multiple_files=True
+                # )
+                uploaded_pdfs = None
         
-        # Inisialisasi variabel lain agar tidak error
-        uploaded_order = None
-        uploaded_income = None
-        uploaded_iklan = None
-        uploaded_seller = None
-
-    st.markdown("---")
-
-    # --- TAMBAHKAN BLOK INI SETELAH DEKLARASI store_choice ---
-    # Konfigurasi file opsional per toko
-    OPTIONAL_FILES_SHOPEE = {
-        'seller_conversion': ['Raka Bookstore', 'Toko Kaliba', 'Toko Monang', 'Toko Serayu'],
-        'iklan': ['Raka Bookstore', 'Toko Kaliba', 'Toko Monang', 'Toko Serayu']
-    }
-    
-    def is_file_optional_shopee(file_type, store):
-        """Cek apakah file tertentu opsional untuk toko tertentu di Shopee"""
-        return store in OPTIONAL_FILES_SHOPEE.get(file_type, [])
+            # Inisialisasi variabel lain agar tidak error
+            uploaded_order = None
+            uploaded_income = None
+            uploaded_iklan = None
+            uploaded_seller = None
 
-    # Konfigurasi file opsional per toko untuk TikTok
-    OPTIONAL_FILES_TIKTOK = {
-        'creator_order': ['Raka Bookstore', 'Toko Kaliba', 'Human Store', 'Pacific Bookstore', 'DAMA.ID STORE', 'Toko Monang', 'Toko Serayu'],
-        'product_data': ['Raka Bookstore', 'Toko Kaliba', 'Human Store', 'Pacific Bookstore', 'DAMA.ID STORE', 'Toko Monang', 'Toko Serayu']
-        # 'pdf_resi': ['Raka Bookstore', 'Toko Kaliba', 'Human Store']  # Jika juga ingin PDF opsional
-    }
-    
-    def is_file_optional_tiktok(file_type, store):
-        """Cek apakah file tertentu opsional untuk toko tertentu di TikTok"""
-        return store in OPTIONAL_FILES_TIKTOK.get(file_type, [])
-    
-    # Kondisi untuk menampilkan tombol proses
-    # show_shopee_button = marketplace_choice == "Shopee" and uploaded_order and uploaded_income and uploaded_iklan and uploaded_seller
-    # shopee_base_files = marketplace_choice == "Shopee" and uploaded_order and uploaded_income and uploaded_iklan
-    # # Tentukan status tombol berdasarkan toko
-    # if shopee_base_files and store_choice == "DAMA.ID STORE":
-    #     show_shopee_button = True # DAMA.ID STORE siap, seller conversion opsional
-    # elif shopee_base_files: # Toko Shopee lain (Human/Pacific)
-    #     show_shopee_button = uploaded_seller # Wajib untuk Human/Pacific
-    # else:
-    #     show_shopee_button = False
-    if marketplace_choice == "Shopee":
-        # File wajib untuk semua toko Shopee
-        required_files = uploaded_order and uploaded_income
+        st.markdown("---")
+
+        # Kondisi untuk menampilkan tombol proses
+        # show_shopee_button = marketplace_choice == "Shopee" and uploaded_order and uploaded_income and uploaded_iklan and uploaded_seller
+        # shopee_base_files = marketplace_choice == "Shopee" and uploaded_order and uploaded_income and uploaded_iklan
+        # # Tentukan status tombol berdasarkan toko
+        # if shopee_base_files and store_choice == "DAMA.ID STORE":
+        #     show_shopee_button = True # DAMA.ID STORE siap, seller conversion opsional
+        # elif shopee_base_files: # Toko Shopee lain (Human/Pacific)
+        #     show_shopee_button = uploaded_seller # Wajib untuk Human/Pacific
+        # else:
+        #     show_shopee_button = False
+        if marketplace_choice == "Shopee":
+            # File wajib untuk semua toko Shopee
+            required_files = uploaded_order and uploaded_income
         
-        if required_files:
-            # Cek file opsional
-            seller_optional = is_file_optional_shopee('seller_conversion', store_choice)
-            iklan_optional = is_file_optional_shopee('iklan', store_choice)
+            if required_files:
+                # Cek file opsional
+                seller_optional = is_file_optional_shopee('seller_conversion', store_choice)
+                iklan_optional = is_file_optional_shopee('iklan', store_choice)
             
-            # Cek apakah file opsional di-upload atau memang opsional
-            seller_ok = uploaded_seller or seller_optional
-            iklan_ok = uploaded_iklan or iklan_optional
+                # Cek apakah file opsional di-upload atau memang opsional
+                seller_ok = uploaded_seller or seller_optional
+                iklan_ok = uploaded_iklan or iklan_optional
             
-            show_shopee_button = seller_ok and iklan_ok
+                show_shopee_button = seller_ok and iklan_ok
+            else:
+                show_shopee_button = False
         else:
             show_shopee_button = False
-    else:
-        show_shopee_button = False
         
-    # show_tiktok_button = marketplace_choice == "TikTok" and uploaded_income_tiktok and uploaded_semua_pesanan and uploaded_creator_order and uploaded_pdfs
-    # tiktok_base_files = marketplace_choice == "TikTok" and uploaded_income_tiktok and uploaded_semua_pesanan
-    
-    # show_tiktok_button = False # Inisialisasi
-    # if tiktok_base_files and store_choice == "DAMA.ID STORE":
-    #     # DAMA.ID STORE: creator_order & pdfs opsional
-    #     show_tiktok_button = True
-    # elif tiktok_base_files and store_choice in ["Human Store", "Pacific Bookstore", "Raka Bookstore"]:
-    #     # Human Store: creator_order & pdfs wajib
-    #     show_tiktok_button = uploaded_creator_order
-    if marketplace_choice == "TikTok":
-        # File wajib untuk semua toko TikTok
-        required_files = uploaded_income_tiktok and uploaded_semua_pesanan
+        # show_tiktok_button = marketplace_choice == "TikTok" and uploaded_income_tiktok and uploaded_semua_pesanan and uploaded_creator_order and uploaded_pdfs
+        # tiktok_base_files = marketplace_choice == "TikTok" and uploaded_income_tiktok and uploaded_semua_pesanan
+    
+        # show_tiktok_button = False # Inisialisasi
+        # if tiktok_base_files and store_choice == "DAMA.ID STORE":
+        #     # DAMA.ID STORE: creator_order & pdfs opsional
+        #     show_tiktok_button = True
+        # elif tiktok_base_files and store_choice in ["Human Store", "Pacific Bookstore", "Raka Bookstore"]:
+        #     # Human Store: creator_order & pdfs wajib
+        #     show_tiktok_button = uploaded_creator_order
+        if marketplace_choice == "TikTok":
+            # File wajib untuk semua toko TikTok
+            required_files = uploaded_income_tiktok and uploaded_semua_pesanan
         
-        if required_files:
-            # Cek file opsional
-            # creator_optional = is_file_optional_tiktok('creator_order', store_choice)
-            # product_optional = is_file_optional_tiktok('product_data', store_choice)
-            # pdf_optional = is_file_optional_tiktok('pdf_resi', store_choice)
+            if required_files:
+                # Cek file opsional
+                # creator_optional = is_file_optional_tiktok('creator_order', store_choice)
+                # product_optional = is_file_optional_tiktok('product_data', store_choice)
+                # pdf_optional = is_file_optional_tiktok('pdf_resi', store_choice)
             
-            # # Cek apakah file opsional di-upload atau memang opsional
-            # creator_ok = uploaded_creator_order or creator_optional
-            # product_ok = product_data_file or product_optional
-            # pdf_ok = uploaded_pdfs or pdf_optional  # Hapus baris ini jika PDF tetap wajib
+                # # Cek apakah file opsional di-upload atau memang opsional
+                # creator_ok = uploaded_creator_order or creator_optional
+                # product_ok = product_data_file or product_optional
+                # pdf_ok = uploaded_pdfs or pdf_optional  # Hapus baris ini jika PDF tetap wajib
             
-            # show_tiktok_button = creator_ok and product_ok  # Tambahkan 'and pdf_ok' jika PDF ikut dicek
-            creator_optional = is_file_optional_tiktok('creator_order', store_choice)
-            product_optional = is_file_optional_tiktok('product_data', store_choice)
+                # show_tiktok_button = creator_ok and product_ok  # Tambahkan 'and pdf_ok' jika PDF ikut dicek
+                creator_optional = is_file_optional_tiktok('creator_order', store_choice)
+                product_optional = is_file_optional_tiktok('product_data', store_choice)
             
-            # Cek apakah file opsional di-upload atau memang opsional
-            creator_ok = uploaded_creator_order or creator_optional
-            product_ok = product_data_file or product_optional
+                # Cek apakah file opsional di-upload atau memang opsional
+                creator_ok = uploaded_creator_order or creator_optional
+                product_ok = product_data_file or product_optional
             
-            show_tiktok_button = creator_ok and product_ok
+                show_tiktok_button = creator_ok and product_ok
+            else:
+                show_tiktok_button = False
         else:
             show_tiktok_button = False
-    else:
-        show_tiktok_button = False
-
-    if show_shopee_button or show_tiktok_button:
-        offline_rows = []  # <-- List untuk menyimpan semua baris
-        if marketplace_choice == "Shopee" and uploaded_offline_images:
-            st.info(f"Memproses {len(uploaded_offline_images)} gambar penjualan offline...")
-            for img_file in uploaded_offline_images:
-                offline_data_list = parse_offline_sales_image(img_file)
+
+        if show_shopee_button or show_tiktok_button:
+            offline_rows = []  # <-- List untuk menyimpan semua baris
+            if marketplace_choice == "Shopee" and (uploaded_offline_images or uploaded_offline_txt or offline_text_input.strip()):
+                hasil_offline = []  # (label sumber, list produk, error)
+                # Teks langsung ke parser regex, model OCR tidak perlu dimuat
+                for sumber, teks in baca_teks_penjualan_offline(uploaded_offline_txt, offline_text_input):
+                    hasil_offline.append((sumber, parse_teks_penjualan_offline(teks), None))
+                if uploaded_offline_images:
+                    st.info(f"Memproses {len(uploaded_offline_images)} gambar penjualan offline...")
+                    hasil_ocr = ocr_batch_gambar(uploaded_offline_images)
+                    for img_file, (offline_data_list, ocr_error) in zip(uploaded_offline_images, hasil_ocr):
+                        hasil_offline.append((f"gambar {img_file.name}", offline_data_list, ocr_error))
+
+                for sumber, offline_data_list, offline_error in hasil_offline:
+                    if offline_error is not None:
+                        st.error(f"Gagal memproses {sumber}: {offline_error}")
+                        continue
                 
-                for offline_data in offline_data_list:
-                    # Generate nomor urut sementara
-                    nomor_sementara = len(offline_rows) + 1
+                    for offline_data in offline_data_list:
+                        # Generate nomor urut sementara
+                        nomor_sementara = len(offline_rows) + 1
                     
-                    # ❌ JANGAN gunakan nama 'offline_rows' lagi di sini
-                    # ✅ Gunakan nama berbeda, misalnya 'new_offline_row'
-                    new_offline_row = create_offline_summary_row(
-                        offline_data, 
-                        store_choice, 
-                        katalog_df, 
-                        harga_custom_tlj_df,
-                        nomor_urut=nomor_sementara
-                    )
+                        # ❌ JANGAN gunakan nama 'offline_rows' lagi di sini
+                        # ✅ Gunakan nama berbeda, misalnya 'new_offline_row'
+                        new_offline_row = create_offline_summary_row(
+                            offline_data, 
+                            store_choice, 
+                            katalog_df, 
+                            harga_custom_tlj_df,
+                            nomor_urut=nomor_sementara
+                        )
                     
-                    if new_offline_row:  # ✅ Cek dictionary hasil
-                        offline_rows.append(new_offline_row)  # ✅ Append ke list
-                        st.success(f"✅ Terdeteksi: {offline_data['nama_produk']}, {offline_data['eksemplar']} eksemplar, Rp{offline_data['harga_satuan']:,}")
+                        if new_offline_row:  # ✅ Cek dictionary hasil
+                            offline_rows.append(new_offline_row)  # ✅ Append ke list
+                            st.success(f"✅ Terdeteksi: {offline_data['nama_produk']}, {offline_data['eksemplar']} eksemplar, Rp{offline_data['harga_satuan']:,}")
             
-            if offline_rows:
-                st.success(f"Total {len(offline_rows)} produk offline terdeteksi")
+                if offline_rows:
+                    st.success(f"Total {len(offline_rows)} produk offline terdeteksi")
         
-        button_label = f"🚀 Mulai Proses untuk {marketplace_choice} - {store_choice}"
-        if st.button(button_label):
-            progress_bar = st.progress(0, text="Mempersiapkan proses...")
-            status_text = st.empty()
-            
-            try:
-                # --- LOGIKA PEMBACAAN FILE ---
-                if marketplace_choice == "Shopee":
-                    # --- ALUR PROSES SHOPEE (KODE LAMA ANDA) ---
-                    status_text.text("Membaca file Shopee...")
-                    order_all_df = pd.read_excel(uploaded_order, dtype={'Harga Setelah Diskon': str, 'Subtotal Pesanan': str})
-                    # income_dilepas_df = pd.read_excel(uploaded_income, sheet_name='Income', skiprows=5)
-                    income_dilepas_df = pd.read_excel(uploaded_income, sheet_name='Penghasilan', skiprows=2)
-                    
-                    # 2. Filter hanya baris 'Order'
-                    if 'Lihat berdasarkan' in income_dilepas_df.columns:
-                        income_dilepas_df = income_dilepas_df[
-                            income_dilepas_df['Lihat berdasarkan'].astype(str).str.strip() == 'Order'
-                        ].copy()
-                    
-                    # 3. Bersihkan nama kolom (strip spasi)
-                    income_dilepas_df.columns = [str(c).strip() for c in income_dilepas_df.columns]
-                    
-                    # 4. Mapping kolom baru → nama lama
-                    
-                    # --- a) Total Penghasilan ---
-                    if 'Jumlah Dibayar Pembeli' in income_dilepas_df.columns:
-                        income_dilepas_df.rename(
-                            columns={'Jumlah Dibayar Pembeli': 'Total Penghasilan'}, 
-                            inplace=True
-                        )
-                    
-                    # --- b) Voucher disponsor oleh Penjual (gabungan 2 kolom) ---
-                    penyesuaian_cols = ['Penyesuaian Penjual - 1', 'Penyesuaian Penjual - 2']
-                    available_penyesuaian = [c for c in penyesuaian_cols if c in income_dilepas_df.columns]
-                    
-                    if available_penyesuaian:
-                        for c in available_penyesuaian:
-                            income_dilepas_df[c] = clean_and_convert_to_numeric(income_dilepas_df[c])
-                        income_dilepas_df['Voucher disponsor oleh Penjual'] = (
-                            income_dilepas_df[available_penyesuaian].sum(axis=1)
-                        )
-                    else:
-                        income_dilepas_df['Voucher disponsor oleh Penjual'] = 0
-                    
-                    # --- c) Biaya Layanan (ambil dari sheet Seller Fee) ---
-                    try:
-                        seller_fee_df = pd.read_excel(uploaded_income, sheet_name='Seller Fee', skiprows=2)
-                        seller_fee_df.columns = [str(c).strip() for c in seller_fee_df.columns]
-                        
-                        # Cari kolom No. Pesanan di Seller Fee (bisa beda nama)
-                        no_pesanan_candidates = ['No. Pesanan', 'No.Pesanan', 'Order ID', 'ID Pesanan', 'Nomor Pesanan']
-                        no_pesanan_col_sf = None
-                        for c in no_pesanan_candidates:
-                            if c in seller_fee_df.columns:
-                                no_pesanan_col_sf = c
-                                break
-                        
-                        # Cari kolom Biaya Layanan (bisa beda nama)
-                        layanan_candidates = ['Biaya Layanan', 'Layanan', 'Service Fee', 'Fee Layanan', 
-                                              'Biaya Layanan (Rp)', 'Layanan (Rp)', 'Service Fee (Rp)']
-                        layanan_col_sf = None
-                        for c in layanan_candidates:
-                            if c in seller_fee_df.columns:
-                                layanan_col_sf = c
-                                break
-                        
-                        # Kalau tidak ketemu pakai auto-scan
-                        if not layanan_col_sf:
-                            for c in seller_fee_df.columns:
-                                cl = str(c).lower()
-                                if any(x in cl for x in ['layanan', 'service', 'fee']) and 'total' not in cl:
-                                    layanan_col_sf = c
-                                    break
-                        
-                        if no_pesanan_col_sf and layanan_col_sf:
-                            # Bersihkan & agregasi per No. Pesanan
-                            seller_fee_df[no_pesanan_col_sf] = seller_fee_df[no_pesanan_col_sf].astype(str).str.strip()
-                            seller_fee_df[layanan_col_sf] = clean_and_convert_to_numeric(seller_fee_df[layanan_col_sf])
-                            
-                            sf_agg = seller_fee_df.groupby(no_pesanan_col_sf)[layanan_col_sf].sum().reset_index()
-                            sf_agg.rename(columns={no_pesanan_col_sf: 'No. Pesanan', layanan_col_sf: 'Biaya Layanan'}, inplace=True)
-                            
-                            # Merge ke income (paling kanan)
-                            income_dilepas_df['No. Pesanan'] = income_dilepas_df['No. Pesanan'].astype(str).str.strip()
-                            income_dilepas_df = pd.merge(
-                                income_dilepas_df, sf_agg, 
-                                on='No. Pesanan', how='left'
-                            )
-                            income_dilepas_df['Biaya Layanan'] = income_dilepas_df['Biaya Layanan'].fillna(0)
-                        else:
-                            missing = []
-                            if not no_pesanan_col_sf: missing.append('No. Pesanan')
-                            if not layanan_col_sf: missing.append('Biaya Layanan')
-                            st.warning(f"Kolom {', '.join(missing)} tidak ditemukan di Seller Fee. Biaya Layanan = 0. Kolom tersedia: {list(seller_fee_df.columns)}")
-                            income_dilepas_df['Biaya Layanan'] = 0
-                    except Exception as e:
-                        st.warning(f"Gagal membaca sheet Seller Fee: {e}. Biaya Layanan di-set 0.")
-                        income_dilepas_df['Biaya Layanan'] = 0
-                    
-                    # --- d) HAPUS kolom dari income yang bisa bentrok dengan order-all ---
-                    # Ini PENTING: supaya merge tidak bikin suffix _x / _y
-                    bentrok_cols = ['Nama Produk', 'Nama Variasi', 'Jumlah', 'Harga Setelah Diskon', 
-                                    'Subtotal Pesanan', 'SKU ID', 'ID Produk']
-                    for col in bentrok_cols:
-                        if col in income_dilepas_df.columns:
-                            income_dilepas_df.drop(columns=[col], inplace=True)
-                    
-                    # Fallback: kolom lama yang mungkin tidak ada di format baru
-                    if 'Promo Gratis Ongkir dari Penjual' not in income_dilepas_df.columns:
-                        income_dilepas_df['Promo Gratis Ongkir dari Penjual'] = 0
-                    if 'Biaya Administrasi' not in income_dilepas_df.columns:
-                        income_dilepas_df['Biaya Administrasi'] = 0
-                    if 'Biaya Proses Pesanan' not in income_dilepas_df.columns:
-                        income_dilepas_df['Biaya Proses Pesanan'] = 0
-                    # if store_choice == "Human Store":
-                    #     service_fee_df = pd.read_excel(uploaded_income, sheet_name='Service Fee Details', skiprows=1)
-                    # iklan_produk_df = pd.read_csv(uploaded_iklan, skiprows=7)
-                    
-                    if uploaded_iklan:
-                        iklan_produk_df = pd.read_csv(uploaded_iklan, skiprows=7)
-                    else:
-                        # Buat DataFrame kosong dengan kolom yang diperlukan
-                        iklan_produk_df = pd.DataFrame(columns=['Nama Iklan', 'Dilihat', 'Jumlah Klik', 'Biaya', 'Produk Terjual', 'Omzet Penjualan'])
-                        st.info("File Iklan tidak diupload, menggunakan data kosong.")
-                    # seller_conversion_df = pd.read_csv(uploaded_seller)
-                    # if uploaded_seller:
-                    #     seller_conversion_df = pd.read_csv(uploaded_seller)
-                    # else:
-                    #     # Buat DataFrame kosong jika file tidak ada
-                    #     # Ini penting agar DAMA.ID STORE tidak error
-                    #     seller_conversion_df = pd.DataFrame(columns=['Kode Pesanan', 'Pengeluaran(Rp)'])
-                    if uploaded_seller:
-                        seller_conversion_df = pd.read_csv(uploaded_seller)
-                    else:
-                        # Buat DataFrame kosong dengan kolom yang diperlukan
-                        seller_conversion_df = pd.DataFrame(columns=['Kode Pesanan', 'Pengeluaran(Rp)'])
-                        st.info("File Seller Conversion tidak diupload, menggunakan data kosong.")
-                    progress_bar.progress(20, text="File dimuat. Membersihkan format angka...")
-
-                    # ... (Kode pembersihan data keuangan Anda tetap di sini) ...
-                    # --- Langkah 1: Bersihkan file order-all secara khusus ---
-                    cols_to_clean_order = ['Harga Setelah Diskon', 'Subtotal Pesanan']
-                    for col in cols_to_clean_order:
-                      if col in order_all_df.columns:
-                          # Gunakan fungsi baru yang spesifik
-                          order_all_df[col] = clean_order_all_numeric(order_all_df[col])
-    
-                    # --- Langkah 2: Bersihkan file-file lainnya dengan fungsi lama ---
-                    # other_financial_data_to_clean = [
-                    #     (income_dilepas_df, ['Voucher dari Penjual', 'Biaya Administrasi', 'Biaya Proses Pesanan', 'Total Penghasilan']),
-                    #     (iklan_produk_df, ['Biaya', 'Omzet Penjualan']),
-                    #     (seller_conversion_df, ['Pengeluaran(Rp)'])
-                    # ]
-                    other_financial_data_to_clean = [
-                        (income_dilepas_df, ['Voucher disponsor oleh Penjual', 'Biaya Administrasi', 'Biaya Proses Pesanan', 'Total Penghasilan', 'Biaya Layanan']),
-                        (iklan_produk_df, ['Biaya', 'Omzet Penjualan']),
-                        (seller_conversion_df, ['Pengeluaran(Rp)'])
-                    ]
-    
-                    for df, cols in other_financial_data_to_clean:
-                        for col in cols:
-                            if col in df.columns:
-                              # Gunakan fungsi lama yang umum
-                              df[col] = clean_and_convert_to_numeric(df[col])
+            # Hasil di-cache per sidik input: rerun (mis. klik download) & klik ulang tidak memproses lagi
+            if marketplace_choice == "Shopee":
+                uploads = {'order': uploaded_order, 'income': uploaded_income, 'iklan': uploaded_iklan, 'seller': uploaded_seller}
+            else:
+                uploads = {'income': uploaded_income_tiktok, 'semua_pesanan': uploaded_semua_pesanan,
+                           'creator_order': uploaded_creator_order, 'product_data': product_data_file}
+            kunci_hasil = sidik_hasil_pipeline(marketplace_choice, store_choice, uploads, offline_rows)
+            hasil = ambil_hasil_pipeline(kunci_hasil)
+
+            button_label = f"🚀 Mulai Proses untuk {marketplace_choice} - {store_choice}"
+            if st.button(button_label):
+                st.session_state['kunci_hasil_aktif'] = kunci_hasil
+                if hasil is not None:
+                    st.success("⚡ Input sama dengan proses sebelumnya, hasil diambil dari cache.")
+                else:
+                    progress_bar = st.progress(0, text="Mempersiapkan proses...")
+                    status_text = st.empty()
 
                     try:
-                        # Baca mentah sheet Summary untuk ambil cell B7 dan B8
-                        df_date_raw = pd.read_excel(uploaded_income, sheet_name='Summary', header=None, nrows=10, usecols="B")
-                        tgl_awal = df_date_raw.iloc[6, 0] # B7
-                        tgl_akhir = df_date_raw.iloc[7, 0] # B8
-                        date_range_str = get_pretty_date_range(tgl_awal, tgl_akhir)
-                    except:
-                        date_range_str = ""
-                
-                    # --- LOGIKA PEMROSESAN BERDASARKAN TOKO ---
-                    status_text.text("Menyusun sheet 'REKAP' (Shopee)...")
-                    if store_choice in ["Human Store", "Raka Bookstore", "Toko Kaliba", "Toko Monang", "Toko Serayu"]:
-                        rekap_processed = process_rekap(order_all_df, income_dilepas_df, seller_conversion_df, store_choice)
-                    elif store_choice == "Pacific Bookstore": # Hanya Pacific yang pakai logic ini
-                        rekap_processed = process_rekap_pacific(order_all_df, income_dilepas_df, seller_conversion_df)
-                    elif store_choice == "DAMA.ID STORE": # Panggil fungsi baru untuk DAMA
-                        rekap_processed = process_rekap_dama(order_all_df, income_dilepas_df, seller_conversion_df)
-                    else: # Pengaman jika ada pilihan store lain
-                        st.error(f"Pilihan toko '{store_choice}' tidak dikenali.")
-                        st.stop()
-                    progress_bar.progress(40, text="Sheet 'REKAP' selesai.")
-                    
-                    status_text.text("Menyusun sheet 'IKLAN' (Shopee)...")
-                    iklan_processed = process_iklan(iklan_produk_df)
-                    progress_bar.progress(60, text="Sheet 'IKLAN' selesai.")
-    
-                    status_text.text("Menyusun sheet 'SUMMARY' (Shopee)...")
-                    if store_choice == "DAMA.ID STORE":
-                        summary_processed = process_summary_dama(rekap_processed, iklan_processed, katalog_dama_df, harga_custom_tlj_df, offline_rows=offline_rows)
-                    else: # Human Store atau Pacific Bookstore
-                        summary_processed = process_summary(rekap_processed, iklan_processed, katalog_df, harga_custom_tlj_df, store_type=store_choice, offline_rows=offline_rows)
-                    progress_bar.progress(80, text="Sheet 'SUMMARY' selesai.")
-
-                    suffix_tgl = f" {date_range_str}" if date_range_str else ""
-                    file_name_output = f"Rekapanku_Shopee_{store_choice}_{suffix_tgl}.xlsx"
-                    sheets = {
-                        'SUMMARY': summary_processed, 'REKAP': rekap_processed, 'IKLAN': iklan_processed,
-                        'sheet order-all': order_all_df, 'sheet income dilepas': income_dilepas_df,
-                        'sheet biaya iklan': iklan_produk_df, 'sheet seller conversion': seller_conversion_df
-                    }
-                    # if store_choice == "Human Store": sheets['sheet service fee'] = service_fee_df
-    
-                elif marketplace_choice == "TikTok":
-                    # --- ALUR PROSES TIKTOK BARU ---
-                    status_text.text("Membaca file TikTok...")
-                    # Baca sheet 'Order details' dan langsung bersihkan kolomnya
-                    order_details_df = pd.read_excel(uploaded_income_tiktok, sheet_name='Order details', header=0)
-                    order_details_df = clean_columns(order_details_df)
-                    order_details_df.columns = [col.upper() for col in order_details_df.columns]
-                    # Baca sheet 'Reports' dan langsung bersihkan kolomnya
-                    reports_df = pd.read_excel(uploaded_income_tiktok, sheet_name='Reports', header=0)
-                    reports_df = clean_columns(reports_df)
-                    reports_df.columns = [col.upper() for col in reports_df.columns]
-
-                    if product_data_file:
-                        all_product_data = []
-                        for prod_file in product_data_file:
-                            df_temp = pd.read_excel(prod_file)
-                            df_temp.columns = [str(col).strip().upper() for col in df_temp.columns]
-                            all_product_data.append(df_temp)
-                        
-                        # Gabungkan semua file
-                        product_data_df = pd.concat(all_product_data, ignore_index=True)
-                        
-                        # Hapus baris duplikat header (jika ada)
-                        # Cek jika ada baris yang isinya sama persis dengan nama kolom
-                        header_mask = True
-                        for col in product_data_df.columns:
-                            header_mask = header_mask & (product_data_df[col].astype(str) == col)
-                        product_data_df = product_data_df[~header_mask].reset_index(drop=True)
-                        
-                        # Konversi kolom numerik
-                        numeric_cols = ['PESANAN SKU', 'PENDAPATAN KOTOR', 'BIAYA', 'BIAYA PER PESANAN']
-                        for col in numeric_cols:
-                            if col in product_data_df.columns:
-                                product_data_df[col] = pd.to_numeric(product_data_df[col], errors='coerce').fillna(0)
-                        
-                        # --- AGREGASI: Gabungkan baris dengan ID PRODUK yang sama ---
-                        if 'ID PRODUK' in product_data_df.columns:
-                            # Kolom yang akan di-sum
-                            sum_cols = ['PESANAN SKU', 'PENDAPATAN KOTOR', 'BIAYA', 'BIAYA PER PESANAN']
-                            # Kolom yang di-ambil first (untuk kolom non-numerik)
-                            first_cols = [c for c in product_data_df.columns if c not in sum_cols and c != 'ID PRODUK']
-                            
-                            agg_dict = {col: 'sum' for col in sum_cols if col in product_data_df.columns}
-                            agg_dict.update({col: 'first' for col in first_cols if col in product_data_df.columns})
-                            
-                            product_data_df = product_data_df.groupby('ID PRODUK', as_index=False).agg(agg_dict)
-                    else:
-                        product_data_df = pd.DataFrame()
-                        if is_file_optional_tiktok('product_data', store_choice):
-                            st.info("File Product Data tidak diupload (opsional untuk toko ini), menggunakan data kosong.")
-                    # Baca 'semua pesanan' dan langsung bersihkan kolomnya
-                    # 1. Baca file tanpa header, sehingga semua baris (termasuk header asli) menjadi data
-                    wb = load_workbook(uploaded_semua_pesanan, data_only=True)
-                    ws = wb.active
-                    # Ambil semua baris sebagai list of values
-                    data = [list(row) for row in ws.iter_rows(values_only=True)]
-                    data = [r for r in data if any(r)]  # hapus baris kosong
-                    # Gabungkan 2 baris pertama jadi header
-                    # Gunakan hanya baris pertama sebagai header asli (Order ID, Order Status, dst)
-                    final_header = [str(x).strip() if x else "" for x in data[0]]
-                    
-                    # Cek apakah baris kedua berisi "Platform unique order ID" → hapus kalau iya
-                    if len(data) > 1 and any("Platform unique order ID" in str(x) for x in data[1]):
-                        data_rows = data[2:]  # Lewati baris kedua
-                    else:
-                        data_rows = data[1:]
-                    # Buat DataFrame
-                    semua_pesanan_df = pd.DataFrame(data_rows, columns=final_header)
-                    # Bersihkan kolom (hapus spasi dan karakter aneh)
-                    semua_pesanan_df.columns = semua_pesanan_df.columns.str.strip()
-                    semua_pesanan_df = clean_columns(semua_pesanan_df)
-                    semua_pesanan_df.columns = [col.upper() for col in semua_pesanan_df.columns]
-                    # if uploaded_creator_order:
-                    #     # Jika file di-upload (Human Store), baca filenya
-                    #     creator_order_all_df = clean_columns(pd.read_excel(uploaded_creator_order))
-                    #     creator_order_all_df.columns = [col.upper() for col in creator_order_all_df.columns]
-                    # else:
-                    #     # Jika DAMA.ID STORE (file=None), buat DataFrame kosong
-                    #     # Tambahkan 'SKU' ke daftar kolom agar merge tidak error
-                    #     creator_order_all_df = pd.DataFrame(columns=['ID PESANAN', 'PRODUK', 'Variasi_Clean', 'PEMBAYARAN KOMISI AKTUAL', 'SKU'])
-                    if uploaded_creator_order:
-                        creator_order_all_df = clean_columns(pd.read_excel(uploaded_creator_order))
-                        creator_order_all_df.columns = [col.upper() for col in creator_order_all_df.columns]
-                    else:
-                        # Buat DataFrame kosong dengan kolom yang diperlukan
-                        creator_order_all_df = pd.DataFrame(columns=['ID PESANAN', 'PRODUK', 'Variasi_Clean', 'PEMBAYARAN KOMISI AKTUAL', 'PERKIRAAN PEMBAYARAN KOMISI STANDAR', 'SKU'])
-                        if is_file_optional_tiktok('creator_order', store_choice):
-                            st.info("File Creator Order tidak diupload (opsional untuk toko ini), menggunakan data kosong.")
-                    progress_bar.progress(20, text="File Excel TikTok dimuat dan kolom dibersihkan.")
-                    
-                    # status_text.text(f"Memproses {len(uploaded_pdfs)} file PDF nota resi...")
-                    # pdf_data = [parse_pdf_receipt(pdf) for pdf in uploaded_pdfs if pdf is not None]
-                    # pdf_data = [data for data in pdf_data if data is not None] # Hapus hasil yang gagal
-                    pdf_data = [] # Inisialisasi list kosong
-                    # if uploaded_pdfs: # Hanya proses jika PDF di-upload
-                    #     status_text.text(f"Memproses {len(uploaded_pdfs)} file PDF nota resi...")
-                    #     pdf_data = [parse_pdf_receipt(pdf) for pdf in uploaded_pdfs if pdf is not None]
-                    #     pdf_data = [data for data in pdf_data if data is not None] # Hapus hasil yang gagal
-                    # else:
-                    #     # Jika tidak ada PDF (kasus DAMA.ID STORE opsional)
-                    #     status_text.text("Melewati pemrosesan PDF nota resi...")
-                    ekspedisi_processed = pd.DataFrame()
-                    # progress_bar.progress(40, text="File PDF selesai diproses.")
+                        def progres(persen, teks):
+                            if persen is None:
+                                status_text.text(teks)
+                            else:
+                                progress_bar.progress(persen, text=teks)
 
-                    try:
-                        # Baca mentah sheet Reports cell F2
-                        df_date_raw = pd.read_excel(uploaded_income_tiktok, sheet_name='Reports', header=None, nrows=5)
-                        raw_val = str(df_date_raw.iloc[1, 5]) # F2
-                        # Format biasanya '2026/01/19-2026/01/25'
-                        split_tgl = raw_val.split('-')
-                        tgl_awal = split_tgl[0].replace('/', '-')
-                        tgl_akhir = split_tgl[1].replace('/', '-')
-                        date_range_str = get_pretty_date_range(tgl_awal, tgl_akhir)
-                    except:
-                        date_range_str = ""
-    
-                    status_text.text("Menyusun sheet 'REKAP' (TikTok)...")
-                    rekap_processed = process_rekap_tiktok(order_details_df, semua_pesanan_df, creator_order_all_df, store_choice)
-                    progress_bar.progress(60, text="Sheet 'REKAP' selesai.")
-                    
-                    # Untuk SUMMARY, kita perlu EKSPEDISI dulu, tapi EKSPEDISI perlu agregasi dari SUMMARY.
-                    # Jadi, kita buat summary sementara dulu.
-                    summary_temp_for_ekspedisi = rekap_processed.copy()
-                    
-                    # status_text.text("Menyusun sheet 'EKSPEDISI'...")
-                    # ekspedisi_processed = process_ekspedisi_tiktok(summary_temp_for_ekspedisi, pdf_data)
-                    # progress_bar.progress(70, text="Sheet 'EKSPEDISI' selesai.")
-                    progress_bar.progress(70, text="Melewati sheet EKSPEDISI...")
-    
-                    status_text.text("Menyusun sheet 'SUMMARY' (TikTok)...")
-                    # summary_processed = process_summary_tiktok(rekap_processed, katalog_df, harga_custom_tlj_df, ekspedisi_processed)
-                    summary_processed = process_summary_tiktok(rekap_processed, katalog_df, harga_custom_tlj_df, ekspedisi_processed, product_data_df, store_choice)
-                    progress_bar.progress(85, text="Sheet 'SUMMARY' selesai.")
-
-                    suffix_tgl = f" {date_range_str}" if date_range_str else ""
-    
-                    file_name_output = f"Rekapanku_TikTok_{store_choice}_{suffix_tgl}.xlsx"
-                    sheets = {
-                        'SUMMARY': summary_processed,
-                        'REKAP': rekap_processed,
-                        'EKSPEDISI': ekspedisi_processed,
-                        'sheet Order details': order_details_df,
-                        'sheet Reports': reports_df,
-                        'sheet semua pesanan': semua_pesanan_df,
-                        'sheet creator order-all': creator_order_all_df,
-                        'sheet Iklan': product_data_df
-                    }
-
-                # ... (Sisa kode untuk membuat file Excel dan tombol download tetap sama) ...
-                status_text.text("Menyiapkan file output untuk diunduh...")
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    
-                    # --- SEMUA FORMATTING VISUAL DIDEFINISIKAN DI SINI ---
-                    workbook = writer.book
-                    
-                    # --- PERUBAHAN 1: Format Judul diubah menjadi rata kiri (align: 'left') ---
-                    title_format = workbook.add_format({'bold': True, 'fg_color': '#4472C4', 'font_color': 'white', 'align': 'left', 'valign': 'vcenter', 'font_size': 14})
-                    
-                    # Format Header Kolom (biru muda, bold, border)
-                    header_format = workbook.add_format({'bold': True, 'fg_color': '#DDEBF7', 'border': 1, 'align': 'center', 'valign': 'vcenter'})
-
-                    header_name_format = workbook.add_format({
-                        'bold': True,
-                        'fg_color': '#DDEBF7',  # Warna sama dengan header
-                        'border': 1,
-                        'align': 'center',
-                        'valign': 'vcenter',
-                        'text_wrap': True       # Enable wrap text
-                    })
-
-                    # number_format_id = workbook.add_format({
-                    #     'num_format': '#,##0',  # Format ribuan dengan titik, tanpa desimal
-                    #     'border': 1,
-                    #     'align': 'right'
-                    # })
-                    # number_format_id_total = workbook.add_format({
-                    #     'num_format': '#,##0',
-                    #     'bold': True,
-                    #     'fg_color': '#FFFF00',
-                    #     'border': 1,
-                    #     'align': 'right'
-                    # })
-                    number_format_id = workbook.add_format({
-                        'num_format': '#,##0',  # Ribuan pakai koma, desimal pakai titik
-                        'border': 1,
-                        'align': 'right'
-                    })
-                    number_format_id_total = workbook.add_format({
-                        'num_format': '#,##0',
-                        'bold': True,
-                        'fg_color': '#FFFF00',
-                        'border': 1,
-                        'align': 'right'
-                    })
+                        catatan_tahap = [] # Waktu/CPU/memori per tahap, lihat ukur_tahap
 
-                    
-                    # --- PERUBAHAN 2: Tambahkan format border untuk sel data ---
-                    cell_border_format = workbook.add_format({'border': 1})
-                    
-                    # Format Persen (0.00%) DENGAN BORDER
-                    # percent_format = workbook.add_format({'num_format': '0.00%', 'border': 1})
-                    percent_format = workbook.add_format({
-                        'num_format': '0.0%',  # 1 angka desimal belakang
-                        'border': 1
-                    })
-                    
-                    # Format 1 Angka Desimal (0.0) DENGAN BORDER
-                    # one_decimal_format = workbook.add_format({'num_format': '0.0', 'border': 1})
-                    one_decimal_format = workbook.add_format({'num_format': '#,##0.0', 'border': 1})  # Tambah format ribuan
+                        # --- LOGIKA PEMBACAAN FILE ---
+                        if marketplace_choice == "Shopee":
+                            sheets, date_range_str = jalankan_rekap_shopee(
+                                uploaded_order, uploaded_income, uploaded_iklan, uploaded_seller, store_choice,
+                                katalog_df, katalog_dama_df, harga_custom_tlj_df,
+                                dama_index=dama_index, offline_rows=offline_rows, progres=progres,
+                                catatan_tahap=catatan_tahap
+                            )
+                        elif marketplace_choice == "TikTok":
+                            sheets, date_range_str = jalankan_rekap_tiktok(
+                                uploaded_income_tiktok, uploaded_semua_pesanan, uploaded_creator_order, product_data_file,
+                                store_choice, katalog_df, harga_custom_tlj_df, progres=progres,
+                                catatan_tahap=catatan_tahap
+                            )
+                        file_name_output = nama_file_output(marketplace_choice, store_choice, date_range_str)
+
+                        status_text.text("Menyiapkan file output untuk diunduh...")
+                        output = io.BytesIO()
+                        with ukur_tahap(catatan_tahap, "Export xlsx", baris_masuk=jumlah_baris(*sheets.values())) as tahap:
+                            tulis_excel_rekap(sheets, store_choice, marketplace_choice, date_range_str, output)
+                            tahap['Baris Keluar'] = tahap['Baris Masuk']
+                        simpan_run_log(catatan_tahap, marketplace_choice, store_choice, date_range_str)
+
+                        hasil = {
+                            'sheets': sheets, 'date_range_str': date_range_str, 'file_name': file_name_output,
+                            'xlsx': output.getvalue(), 'catatan_tahap': catatan_tahap,
+                        }
+                        simpan_hasil_pipeline(kunci_hasil, hasil)
+
+                        progress_bar.progress(100, text="Proses Selesai!")
+                        status_text.success("✅ Proses Selesai! File Anda siap diunduh.")
+                    except Exception as e:
+                        st.session_state.pop('kunci_hasil_aktif', None)
+                        st.error(f"Terjadi kesalahan saat pemrosesan: {e}")
+                        st.exception(e)
 
-                    
-                    # Format Baris Total (kuning, bold)
-                    total_fmt = workbook.add_format({'bold': True, 'fg_color': '#FFFF00', 'border': 1})
-                    total_fmt_percent = workbook.add_format({'bold': True, 'fg_color': '#FFFF00', 'num_format': '0.00%', 'border': 1})
-                    total_fmt_decimal = workbook.add_format({'bold': True, 'fg_color': '#FFFF00', 'num_format': '#,##0', 'border': 1})
-
-                    red_format = workbook.add_format({
-                        'bold': True, 
-                        'fg_color': '#FFFF00',  # Kuning tetap untuk baris total
-                        'font_color': '#FF0000',  # Merah untuk angka negatif
-                        'num_format': '#,##0',
-                        'border': 1,
-                        'align': 'right'
-                    })
-                    
-                    # Format untuk Margin negatif di baris biasa (bukan total)
-                    red_format_normal = workbook.add_format({
-                        'font_color': '#FF0000',  # Merah saja
-                        'num_format': '#,##0',
-                        'border': 1,
-                        'align': 'right'
-                    })
-
-                    red_number_format = workbook.add_format({
-                        'font_color': '#FF0000',
-                        'num_format': '#,##0;-#,##0',  # Format positif;negatif (dengan minus)
-                        'border': 1,
-                        'align': 'right'
-                    })
-                    
-                    red_percent_format = workbook.add_format({
-                        'font_color': '#FF0000',
-                        'num_format': '0.0%;-0.0%',  # Persen dengan minus
-                        'border': 1,
-                        'align': 'right'
-                    })
-                    
-                    red_decimal_format = workbook.add_format({
-                        'font_color': '#FF0000',
-                        'num_format': '#,##0.0;-#,##0.0',  # Desimal dengan minus
-                        'border': 1,
-                        'align': 'right'
-                    })
-
-                    # red_format_total_margin = workbook.add_format({
-                    #     'bold': True,
-                    #     'fg_color': '#FFFF00',      # Kuning tetap
-                    #     'font_color': '#FF0000',    # Merah untuk angka
-                    #     'num_format': '#,##0',       # Tanpa tanda minus
-                    #     'border': 1,
-                    #     'align': 'right'
-                    # })
-                    red_format_total_margin = workbook.add_format({
-                        'bold': True,
-                        'fg_color': '#FFFF00',
-                        'font_color': '#FF0000',
-                        'num_format': '#,##0;-#,##0',  # TETAP PAKAI TANDA MINUS
-                        'border': 1,
-                        'align': 'right'
-                    })
-                    
-                    # Tambahkan ini juga untuk total persen negatif
-                    red_total_percent = workbook.add_format({
-                        'bold': True,
-                        'fg_color': '#FFFF00',
-                        'font_color': '#FF0000',
-                        'num_format': '0.0%;-0.0%',
-                        'border': 1,
-                        'align': 'right'
-                    })
-                    
-                    # Tambahkan ini untuk total desimal negatif
-                    red_total_decimal = workbook.add_format({
-                        'bold': True,
-                        'fg_color': '#FFFF00',
-                        'font_color': '#FF0000',
-                        'num_format': '#,##0.0;-#,##0.0',
-                        'border': 1,
-                        'align': 'right'
-                    })
-
-                    # Format untuk baris penjualan offline (pink peach)
-                    offline_row_format = workbook.add_format({
-                        'fg_color': '#FFD1DC',  # Pink peach lembut
-                        'border': 1,
-                        'align': 'right'
-                    })
-
-                    # Format untuk baris penjualan offline (pink peach)
-                    offline_names_format = workbook.add_format({
-                        'fg_color': '#FFD1DC',  # Pink peach lembut
-                        'border': 1,
-                        'align': 'left'
-                    })
-                    
-                    # Format angka untuk baris offline (pink peach + align right)
-                    offline_number_format = workbook.add_format({
-                        'fg_color': '#FFD1DC',  # Pink peach lembut
-                        'num_format': '#,##0',
-                        'border': 1,
-                        'align': 'right'
-                    })
-                    
-                    # Format persen untuk baris offline
-                    offline_percent_format = workbook.add_format({
-                        'fg_color': '#FFD1DC',
-                        'num_format': '0.0%',
-                        'border': 1,
-                        'align': 'right'
-                    })
-
-                    # --- PROSES SETIAP SHEET ---
-                    for sheet_name, df in sheets.items():
-                    
-                        if sheet_name in ['SUMMARY', 'REKAP', 'IKLAN']:
-                            # ==========================================
-                            # SHEET HASIL PROSESING: Judul + Header merge 2 baris
-                            # ==========================================
-                            start_row_data = 4
-                            df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row_data, header=False)
-                            worksheet = writer.sheets[sheet_name]
-                            
-                            # --- Judul di baris 0-1 (merge) ---
-                            if marketplace_choice == "Shopee":
-                                try:
-                                    df_date_raw = pd.read_excel(uploaded_income, sheet_name='Summary', header=None, nrows=10, usecols="B")
-                                    tgl_awal = df_date_raw.iloc[6, 0]
-                                    tgl_akhir = df_date_raw.iloc[7, 0]
-                                    date_range_str = get_pretty_date_range(tgl_awal, tgl_akhir)
-                                except:
-                                    date_range_str = ""
-                                suffix_tgl = f" {date_range_str}" if date_range_str else ""
-                                judul_sheet = f"{sheet_name} {store_choice.upper()} {marketplace_choice} {suffix_tgl}"
-                            else:
-                                try:
-                                    df_date_raw = pd.read_excel(uploaded_income_tiktok, sheet_name='Reports', header=None, nrows=5)
-                                    raw_val = str(df_date_raw.iloc[1, 5])
-                                    split_tgl = raw_val.split('-')
-                                    tgl_awal = split_tgl[0].replace('/', '-')
-                                    tgl_akhir = split_tgl[1].replace('/', '-')
-                                    date_range_str = get_pretty_date_range(tgl_awal, tgl_akhir)
-                                except:
-                                    date_range_str = ""
-                                suffix_tgl = f" {date_range_str}" if date_range_str else ""
-                                judul_sheet = f"{sheet_name} {store_choice.upper()} {marketplace_choice} {suffix_tgl}"
-                            
-                            worksheet.merge_range(0, 0, 1, len(df.columns) - 1, judul_sheet, title_format)
-                            
-                            # --- Header kolom di baris 2-3 (merge 2 baris) ---
-                            for col_num, value in enumerate(df.columns.values):
-                                worksheet.merge_range(2, col_num, 3, col_num, value, header_name_format)
-                                
-                        else:
-                            # ==========================================
-                            # SHEET RAW DATA: Header di baris 0, data mulai baris 1
-                            # ==========================================
-                            start_row_data = 1
-                            df.to_excel(writer, sheet_name=sheet_name, index=False, startrow=start_row_data, header=False)
-                            worksheet = writer.sheets[sheet_name]
-                            
-                            # --- Header kolom di baris 0 (satu baris, tidak merge) ---
-                            for col_num, value in enumerate(df.columns.values):
-                                worksheet.write(0, col_num, value, header_format)
-
-                        # Terapkan formatting KHUSUS untuk sheet SUMMARY, REKAP, dan IKLAN
-                        if sheet_name in ['SUMMARY', 'REKAP', 'IKLAN']:
-                            # --- PERUBAHAN 5: Terapkan border ke semua sel data ---
-                            # (row_start, col_start, row_end, col_end, format)
-                            worksheet.conditional_format(start_row_data, 0, start_row_data + len(df) - 1, len(df.columns) - 1, 
-                                                         {'type': 'no_blanks', 'format': cell_border_format})
-
-                        if sheet_name == 'SUMMARY':
-                            # Daftar kolom yang pakai format angka ribuan
-                            if store_choice in ['Raka Bookstore', 'Toko Kaliba', 'Toko Monang', 'Toko Serayu']:
-                                label_adm_format = 'Biaya Adm 9%'
-                            else:
-                                label_adm_format = 'Biaya Adm 9%'
-                                
-                            number_columns = [
-                                'Jumlah Terjual', 'Jumlah Eksemplar', 'Jumlah Pesanan',
-                                'Harga Satuan', 'Total Penjualan', 'Voucher Ditanggung Penjual',
-                                'Biaya Komisi AMS + PPN Shopee', label_adm_format,
-                                'Biaya Layanan Gratis Ongkir Xtra 4,5%', 'Biaya Proses Pesanan',
-                                'Penjualan Netto', 'Iklan Klik', 'Biaya Packing', 'Biaya Ekspedisi',
-                                'Harga Beli', 'Harga Custom TLJ', 'Total Pembelian', 'Margin'
-                            ]
-                            
-                            for col_name in number_columns:
-                                if col_name in df.columns:
-                                    col_idx = df.columns.get_loc(col_name)
-                                    for row_idx in range(len(df) - 1):
-                                        excel_row = start_row_data + row_idx
-                                        cell_value = df.iloc[row_idx, col_idx]
-                                        if pd.notna(cell_value):
-                                            # Cek jika nilai negatif
-                                            if isinstance(cell_value, (int, float)) and cell_value < 0:
-                                                worksheet.write(excel_row, col_idx, cell_value, red_number_format)
-                                            else:
-                                                worksheet.write(excel_row, col_idx, cell_value, number_format_id)
-                                            
-                        if sheet_name == 'SUMMARY':
-                            persen_col = df.columns.get_loc('Persentase')
-                            penjualan_hari_col = df.columns.get_loc('Penjualan Per Hari')
-                            buku_pesanan_col = df.columns.get_loc('Jumlah buku per pesanan')
-                            margin_col = df.columns.get_loc('Margin')
-                            
-                            # --- PERUBAHAN 6: Terapkan format persen ke seluruh kolom, bukan hanya baris total ---
-                            # Terapkan format mulai dari baris data pertama hingga baris sebelum total
-                            # (worksheet.set_column(col_start, col_end, width, format))
-                            # worksheet.set_column(persen_col, persen_col, 12, percent_format) # Format ini sudah termasuk border
-                            # for row_idx in range(len(df) - 1): # -1 agar tidak menyentuh baris 'Total'
-                            #     excel_row = start_row_data + row_idx
-                            #     cell_value = df.iloc[row_idx, persen_col]
-                            #     worksheet.write(excel_row, persen_col, cell_value, percent_format)
-                            for row_idx in range(len(df) - 1):
-                                excel_row = start_row_data + row_idx
-                                cell_value = df.iloc[row_idx, persen_col]
-                                if pd.notna(cell_value) and isinstance(cell_value, (int, float)) and cell_value < 0:
-                                    worksheet.write(excel_row, persen_col, cell_value, red_percent_format)
-                                else:
-                                    worksheet.write(excel_row, persen_col, cell_value, percent_format)
-                            
-                            # Atur lebar kolomnya secara terpisah
-                            worksheet.set_column(persen_col, persen_col, 12)
-                            for row_idx in range(len(df) - 1):
-                                excel_row = start_row_data + row_idx
-                                
-                                # Penjualan Per Hari
-                                cell_val_hari = df.iloc[row_idx, penjualan_hari_col]
-                                if pd.notna(cell_val_hari):
-                                    if isinstance(cell_val_hari, (int, float)) and cell_val_hari < 0:
-                                        worksheet.write(excel_row, penjualan_hari_col, cell_val_hari, red_decimal_format)
-                                    else:
-                                        worksheet.write(excel_row, penjualan_hari_col, cell_val_hari, one_decimal_format)
-                                
-                                # Jumlah buku per pesanan
-                                cell_val_buku = df.iloc[row_idx, buku_pesanan_col]
-                                if pd.notna(cell_val_buku):
-                                    if isinstance(cell_val_buku, (int, float)) and cell_val_buku < 0:
-                                        worksheet.write(excel_row, buku_pesanan_col, cell_val_buku, red_decimal_format)
-                                    else:
-                                        worksheet.write(excel_row, buku_pesanan_col, cell_val_buku, one_decimal_format)
-                            
-                            worksheet.set_column(penjualan_hari_col, penjualan_hari_col, 18)
-                            worksheet.set_column(buku_pesanan_col, buku_pesanan_col, 22)
-                            
-                            # last_row = len(df) + start_row_header
-                            last_row = start_row_data + len(df) - 1
-                            for col_num in range(len(df.columns)):
-                                cell_value = df.iloc[-1, col_num]
-                                current_fmt = total_fmt
-                                col_name = df.columns[col_num]
-                                
-                                # Cek negatif untuk setiap kolom
-                                is_negative = pd.notna(cell_value) and isinstance(cell_value, (int, float)) and cell_value < 0
-                                
-                                if is_negative:
-                                    if col_num == persen_col:
-                                        current_fmt = red_total_percent
-                                    elif col_num in [penjualan_hari_col, buku_pesanan_col]:
-                                        current_fmt = red_total_decimal
-                                    elif col_name in number_columns:
-                                        current_fmt = red_format_total_margin
-                                    else:
-                                        current_fmt = total_fmt  # fallback
-                                else:
-                                    if col_num == persen_col:
-                                        current_fmt = total_fmt_percent
-                                    elif col_num in [penjualan_hari_col, buku_pesanan_col]:
-                                        current_fmt = total_fmt_decimal
-                                    elif col_name in number_columns:
-                                        current_fmt = number_format_id_total
-                                    else:
-                                        current_fmt = total_fmt
-                                
-                                if pd.notna(cell_value):
-                                    worksheet.write(last_row, col_num, cell_value, current_fmt)
-                                else:
-                                    worksheet.write_blank(last_row, col_num, None, current_fmt)
-
-                            margin_col_idx = df.columns.get_loc('Margin')
-                            for row_idx in range(len(df) - 1):
-                                excel_row = start_row_data + row_idx
-                                cell_value = df.iloc[row_idx, margin_col_idx]
-                                if pd.notna(cell_value) and cell_value < 0:
-                                    worksheet.write(excel_row, margin_col_idx, cell_value, red_number_format)  # Tidak pakai abs()
-
-                            offline_mask = df['Nama Produk'].astype(str).str.startswith('[OFFLINE]')
-                            # Terapkan format pink untuk baris offline (kecuali baris total)
-                            for row_idx in range(len(df)):
-                                excel_row = start_row_data + row_idx
-                                
-                                # Skip jika ini baris total
-                                if row_idx == len(df) - 1 and df.iloc[row_idx]['Nama Produk'] == 'Total':
-                                    continue
-                                
-                                if offline_mask.iloc[row_idx]:
-                                    for col_num in range(len(df.columns)):
-                                        col_name = df.columns[col_num]
-                                        cell_value = df.iloc[row_idx, col_num]
-                                        
-                                        # Cek negatif
-                                        is_neg = pd.notna(cell_value) and isinstance(cell_value, (int, float)) and cell_value < 0
-                                        
-                                        if is_neg:
-                                            if col_name == 'Persentase':
-                                                fmt = red_percent_format
-                                            elif col_name in [penjualan_hari_col_name, buku_pesanan_col_name]:  # tambahkan cek nama kolom
-                                                fmt = red_decimal_format
-                                            elif col_name in number_columns:
-                                                fmt = red_number_format
-                                            elif col_name == 'Nama Produk':
-                                                fmt = offline_names_format
-                                            else:
-                                                fmt = offline_row_format
-                                        else:
-                                            if col_name == 'Persentase':
-                                                fmt = offline_percent_format
-                                            elif col_name in number_columns:
-                                                fmt = offline_number_format
-                                            elif col_name == 'Nama Produk':
-                                                fmt = offline_names_format
-                                            else:
-                                                fmt = offline_row_format
-                                        
-                                        if pd.notna(cell_value):
-                                            worksheet.write(excel_row, col_num, cell_value, fmt)
-                                        else:
-                                            worksheet.write_blank(excel_row, col_num, None, fmt)
-                                            
-                        # TAMBAHKAN BLOK BARU INI
-                        if sheet_name == 'IKLAN':
-                            # Cek jika baris terakhir adalah baris TOTAL
-                            last_row_idx = len(df) - 1
-                            if not df.empty and df.iloc[last_row_idx]['Nama Iklan'] == 'TOTAL':
-                                # Terapkan format total (kuning, bold, border) ke setiap sel di baris ini
-                                for col_num in range(len(df.columns)):
-                                    cell_value = df.iloc[last_row_idx, col_num]
-                                    worksheet.write(start_row_data + last_row_idx, col_num, cell_value, total_fmt)
-                        
-                        # Atur lebar kolom otomatis untuk semua sheet
-                        # for i, col in enumerate(df.columns):
-                        #     column_len = max(df[col].astype(str).map(len).max(), len(col))
-                        #     worksheet.set_column(i, i, column_len + 2)
-                        for i, col in enumerate(df.columns):
-                            # Hitung panjang rata-rata kata
-                            words = str(col).split()
-                            if len(words) >= 3:
-                                # Ambil 2 kata pertama untuk lebar dasar
-                                base_width = len(' '.join(words[:2])) + 2  # +2 untuk padding
-                            elif len(words) == 2:
-                                base_width = len(col) + 2
-                            else:
-                                base_width = len(col) + 3
-                            
-                            # Minimal 8, maksimal 15 (biar tidak terlalu lebar)
-                            final_width = max(8, min(base_width, 15))
-                            worksheet.set_column(i, i, final_width)
-                
-                output.seek(0)
-                progress_bar.progress(100, text="Proses Selesai!")
-                status_text.success("✅ Proses Selesai! File Anda siap diunduh.")
+            # Ditampilkan lagi di setiap rerun selama input tidak berubah (hasil dari cache)
+            if hasil is not None and st.session_state.get('kunci_hasil_aktif') == kunci_hasil:
+                catatan_tahap = hasil['catatan_tahap']
+                with st.expander(f"⏱️ Waktu per tahap (total {sum(t['Detik'] for t in catatan_tahap):.1f} detik)"):
+                    st.dataframe(pd.DataFrame(catatan_tahap), hide_index=True)
+                    st.caption("CPU & Peak RSS dihitung untuk seluruh proses server: sesi lain yang berjalan bersamaan ikut terhitung.")
 
                 st.header("3. Download Hasil")
                 st.download_button(
-                    label=f"📥 Download File Output ({file_name_output})",
-                    data=output,
-                    file_name=file_name_output,
+                    label=f"📥 Download File Output ({hasil['file_name']})",
+                    data=hasil['xlsx'],
+                    file_name=hasil['file_name'],
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
-            except Exception as e:
-                st.error(f"Terjadi kesalahan saat pemrosesan: {e}")
-                st.exception(e)
-else:
-    st.info("Silakan pilih toko terlebih dahulu untuk melanjutkan.")
+    else:
+        st.info("Silakan pilih toko terlebih dahulu untuk melanjutkan.")
@@ -0,0 +1,120 @@
+"""
+Worker OCR penjualan offline.
+Dipisah dari main.py agar proses worker (process pool) bisa meng-import fungsi OCR
+tanpa ikut menjalankan UI Streamlit. Tiap proses memuat satu easyocr.Reader sendiri.
+"""
+import io
+import multiprocessing
+import sys
+import threading
+import types
+
+# Preproses sebelum OCR: screenshot HP (1080x2400+) sebagian besar latar chat kosong
+OCR_MAX_LEBAR = 720 # Piksel; gambar lebih lebar di-downscale proporsional (teks chat tetap terbaca)
+OCR_AUTO_CROP = False # True = potong ke area bubble chat WhatsApp sebelum OCR
+WARNA_BUBBLE_WHATSAPP = [
+    (0xDC, 0xF8, 0xC6), (0xD9, 0xFD, 0xD3), (0xFF, 0xFF, 0xFF), # Mode terang: bubble keluar (hijau) & masuk (putih)
+    (0x00, 0x5C, 0x4B), (0x20, 0x2C, 0x33), # Mode gelap
+]
+TOLERANSI_WARNA_BUBBLE = 12
+PADDING_CROP = 16
+
+# Masuk ke kunci cache OCR: ubah preproses → teks lama tidak dipakai lagi
+VERSI_PREPROSES = f"gray:w{OCR_MAX_LEBAR}:crop{int(OCR_AUTO_CROP)}"
+
+_reader = None
+
+# Di bawah Streamlit, sys.modules['__main__'] adalah main.py (ada __file__, tanpa __spec__), sehingga
+# multiprocessing menjalankan ulang seluruh main.py sebagai __mp_main__ di proses forkserver & tiap worker.
+# Selama start() worker, __main__ diganti modul kosong: worker benar-benar mulai dari modul ini saja.
+_kunci_main = threading.Lock()
+
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    class ProsesOCR(multiprocessing.context.ForkServerProcess):
+        def start(self):
+            with _kunci_main:
+                main_asli = sys.modules['__main__']
+                sys.modules['__main__'] = types.ModuleType('__main__')
+                try:
+                    super().start()
+                finally:
+                    sys.modules['__main__'] = main_asli
+
+    class KonteksOCR(multiprocessing.context.ForkServerContext):
+        """Context 'forkserver' untuk pool OCR, worker dibuat lewat ProsesOCR."""
+        Process = ProsesOCR
+
+def get_reader():
+    # Satu reader per proses (dimuat sekali, dipakai untuk semua gambar berikutnya)
+    global _reader
+    if _reader is None:
+        import easyocr
+        _reader = easyocr.Reader(['id', 'en'], gpu=False)
+    return _reader
+
+def init_worker():
+    """Initializer process pool: batasi thread torch per worker lalu muat reader."""
+    try:
+        import torch
+        torch.set_num_threads(1) # Paralelisme sudah dari jumlah proses, hindari oversubscription CPU
+    except ImportError:
+        pass
+    get_reader()
+
+def siap():
+    """Tugas kosong untuk warm-up: memastikan reader proses ini sudah dimuat."""
+    get_reader()
+    return True
+
+def crop_area_bubble(image):
+    """
+    Potong gambar ke kotak yang memuat bubble chat (berdasarkan warna bubble WhatsApp).
+    Gambar dikembalikan utuh jika bubble tidak terdeteksi dengan yakin.
+    """
+    import numpy as np
+
+    rgb = np.asarray(image.convert('RGB'), dtype=np.int16)
+    mask = np.zeros(rgb.shape[:2], dtype=bool)
+    for warna in WARNA_BUBBLE_WHATSAPP:
+        mask |= np.abs(rgb - np.array(warna, dtype=np.int16)).max(axis=2) <= TOLERANSI_WARNA_BUBBLE
+
+    # Baris/kolom dihitung bubble hanya jika cukup banyak pikselnya (abaikan noise wallpaper)
+    rows = np.flatnonzero(mask.mean(axis=1) > 0.05)
+    cols = np.flatnonzero(mask.mean(axis=0) > 0.02)
+    if len(rows) == 0 or len(cols) == 0:
+        return image
+
+    tinggi, lebar = mask.shape
+    box = (
+        max(int(cols[0]) - PADDING_CROP, 0), max(int(rows[0]) - PADDING_CROP, 0),
+        min(int(cols[-1]) + PADDING_CROP + 1, lebar), min(int(rows[-1]) + PADDING_CROP + 1, tinggi)
+    )
+    return image.crop(box)
+
+def preproses_gambar(image, max_lebar=OCR_MAX_LEBAR, auto_crop=OCR_AUTO_CROP):
+    """Crop (opsional) → grayscale → downscale ke max_lebar. Return numpy array 2D untuk EasyOCR."""
+    import numpy as np
+    from PIL import Image
+
+    if auto_crop:
+        image = crop_area_bubble(image)
+    image = image.convert('L')
+    if max_lebar and image.width > max_lebar:
+        tinggi_baru = max(1, round(image.height * max_lebar / image.width))
+        image = image.resize((max_lebar, tinggi_baru), Image.LANCZOS)
+    return np.asarray(image)
+
+def jalankan_ocr(image_bytes):
+    """OCR satu gambar (bytes) → seluruh teks digabung spasi, urut sesuai hasil EasyOCR."""
+    from PIL import Image
+
+    # Buka gambar lalu preproses (lebih sedikit piksel = OCR CPU jauh lebih cepat)
+    image = Image.open(io.BytesIO(image_bytes))
+    image_np = preproses_gambar(image)
+
+    # OCR dengan bounding box untuk deteksi posisi
+    results = get_reader().readtext(image_np, detail=1, paragraph=False)
+
+    # Gabungkan text dengan posisi
+    texts_with_bbox = [(r[1], r[0]) for r in results]  # (text, bbox)
+    return ' '.join([t[0] for t in texts_with_bbox])
@@ -0,0 +1,184 @@
+"""
+Rekap mingguan tanpa UI Streamlit: semua kombinasi toko × marketplace dalam satu perintah.
+Tiap kombinasi diproses di worker process terpisah (pakai semua core), hasilnya file xlsx
+yang sama persis dengan tombol download di UI.
+
+Struktur folder input (nama toko sama dengan pilihan di UI):
+    <folder_input>/<Nama Toko>/Shopee/   order-all*.xlsx, income*.xlsx, *iklan*.csv, *seller*.csv
+    <folder_input>/<Nama Toko>/TikTok/   income*.xlsx, *semua pesanan*.xlsx, *creator*.xlsx, *product*.xlsx
+Kombinasi yang foldernya tidak ada atau file wajibnya kurang dilewati (dilaporkan di akhir).
+Peringatan data input (mis. kolom biaya tidak ada, dihitung 0) dan catatan info (mis. jumlah pesanan
+Cancel/Return yang dibuang) dicetak di bawah baris tokonya; hanya peringatan yang memengaruhi exit code.
+Exit code: 0 semua berhasil, 1 ada yang gagal, 2 berhasil tapi ada peringatan.
+
+Contoh:
+    python rekap_batch.py data/minggu-03 --output hasil/minggu-03
+"""
+import argparse
+import fnmatch
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import streamlit.logger
+from streamlit import config as st_config
+
+# main.py di-import tanpa server Streamlit (bare mode): matikan peringatan "missing ScriptRunContext".
+# Config di-parse dulu, kalau tidak level log di-reset lagi saat st.* pertama dipanggil
+st_config.get_config_options()
+streamlit.logger.set_log_level('error')
+
+import main
+
+# Pola nama file per peran (dicocokkan tanpa beda huruf besar/kecil)
+POLA_FILE = {
+    'Shopee': {
+        'order': 'order*.xlsx',
+        'income': 'income*.xlsx',
+        'iklan': '*iklan*.csv',
+        'seller': '*seller*.csv',
+    },
+    'TikTok': {
+        'income': 'income*.xlsx',
+        'semua_pesanan': '*semua*pesanan*.xlsx',
+        'creator_order': '*creator*.xlsx',
+        'product_data': '*product*.xlsx',
+    },
+}
+
+def cari_file(folder, pola):
+    """Semua file di folder yang cocok dengan pola, urut nama."""
+    return sorted(
+        os.path.join(folder, nama) for nama in os.listdir(folder)
+        if fnmatch.fnmatch(nama.lower(), pola) and not nama.startswith('~$') # ~$ = file lock Excel
+    )
+
+def siapkan_tugas(folder_input):
+    """
+    Cek kelengkapan file tiap kombinasi toko × marketplace.
+    Return (tugas, dilewati): tugas = [(marketplace, toko, files)], dilewati = [(marketplace, toko, alasan)].
+    """
+    tugas, dilewati = [], []
+    for marketplace, daftar_toko in main.TOKO_PER_MARKETPLACE.items():
+        for toko in daftar_toko:
+            folder = os.path.join(folder_input, toko, marketplace)
+            if not os.path.isdir(folder):
+                dilewati.append((marketplace, toko, "folder tidak ada"))
+                continue
+
+            ditemukan = {peran: cari_file(folder, pola) for peran, pola in POLA_FILE[marketplace].items()}
+            if marketplace == "Shopee":
+                wajib = ['order', 'income']
+                wajib += [peran for peran, jenis in [('iklan', 'iklan'), ('seller', 'seller_conversion')]
+                          if not main.is_file_optional_shopee(jenis, toko)]
+            else:
+                wajib = ['income', 'semua_pesanan']
+                wajib += [peran for peran in ['creator_order', 'product_data']
+                          if not main.is_file_optional_tiktok(peran, toko)]
+
+            kurang = [peran for peran in wajib if not ditemukan[peran]]
+            if kurang:
+                dilewati.append((marketplace, toko, f"file wajib tidak ada: {', '.join(kurang)}"))
+                continue
+
+            # Product Data TikTok boleh banyak file, peran lain cukup satu file
+            files = {peran: (daftar if peran == 'product_data' else (daftar[0] if daftar else None))
+                     for peran, daftar in ditemukan.items()}
+            tugas.append((marketplace, toko, files))
+    return tugas, dilewati
+
+def jalankan_satu(marketplace, toko, files, folder_output):
+    """
+    Proses satu kombinasi (di worker process) lalu tulis xlsx-nya.
+    Return (path output, durasi detik, date_range_str, catatan_tahap, pesan_peringatan, pesan_info).
+    """
+    mulai = time.perf_counter()
+    catatan_tahap = []
+    # Di bare mode st.warning/st.info tidak tampil di mana pun, jadi pesannya dikumpulkan untuk dicetak main_cli
+    pesan_peringatan, pesan_info = [], []
+    katalog_df = main.get_katalog_harga_online()
+    harga_custom_tlj_df = main.get_harga_custom_tlj()
+
+    if marketplace == "Shopee":
+        sheets, date_range_str = main.jalankan_rekap_shopee(
+            files['order'], files['income'], files['iklan'], files['seller'], toko,
+            katalog_df, main.get_katalog_dama(), harga_custom_tlj_df, dama_index=main.get_dama_index(),
+            catatan_tahap=catatan_tahap, peringatan=pesan_peringatan.append, info=pesan_info.append
+        )
+    else:
+        sheets, date_range_str = main.jalankan_rekap_tiktok(
+            files['income'], files['semua_pesanan'], files['creator_order'], files['product_data'], toko,
+            katalog_df, harga_custom_tlj_df, catatan_tahap=catatan_tahap,
+            peringatan=pesan_peringatan.append, info=pesan_info.append
+        )
+
+    path_output = os.path.join(folder_output, main.nama_file_output(marketplace, toko, date_range_str))
+    with main.ukur_tahap(catatan_tahap, "Export xlsx", baris_masuk=main.jumlah_baris(*sheets.values())) as tahap:
+        main.tulis_excel_rekap(sheets, toko, marketplace, date_range_str, path_output)
+        tahap['Baris Keluar'] = tahap['Baris Masuk']
+    return path_output, time.perf_counter() - mulai, date_range_str, catatan_tahap, pesan_peringatan, pesan_info
+
+def buat_executor(jumlah_worker):
+    # 'fork' agar worker mewarisi katalog yang sudah dimuat proses utama (aman: dibuat dari thread utama CLI)
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=jumlah_worker, mp_context=multiprocessing.get_context('fork'))
+    return ProcessPoolExecutor(max_workers=jumlah_worker)
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Rekap mingguan semua toko × marketplace tanpa UI Streamlit.")
+    parser.add_argument('folder_input', help="Folder berisi <Nama Toko>/<Shopee|TikTok>/file export")
+    parser.add_argument('--output', default='hasil_rekap', help="Folder tujuan file xlsx (default: hasil_rekap)")
+    parser.add_argument('--workers', type=int, default=main.jumlah_worker_ocr(),
+                        help="Jumlah worker process (default: jumlah core yang tersedia)")
+    args = parser.parse_args(argv)
+
+    folder_input = os.path.abspath(args.folder_input)
+    folder_output = os.path.abspath(args.output)
+    os.makedirs(folder_output, exist_ok=True)
+    # Katalog & match_cache.sqlite dibaca relatif terhadap folder aplikasi, sama seperti saat streamlit run
+    os.chdir(os.path.dirname(os.path.abspath(main.__file__)))
+
+    tugas, dilewati = siapkan_tugas(folder_input)
+    if not tugas:
+        print("Tidak ada kombinasi toko × marketplace yang filenya lengkap.")
+        for marketplace, toko, alasan in dilewati:
+            print(f"  - {marketplace} - {toko}: {alasan}")
+        return 1
+
+    main.warmup_katalog() # Dimuat sekali di sini, worker hasil fork tinggal memakai cache-nya
+
+    gagal, ada_peringatan = [], []
+    mulai = time.perf_counter()
+    with buat_executor(max(1, min(args.workers, len(tugas)))) as executor:
+        futures = {executor.submit(jalankan_satu, marketplace, toko, files, folder_output): (marketplace, toko)
+                   for marketplace, toko, files in tugas}
+        for selesai, future in enumerate(as_completed(futures), start=1):
+            marketplace, toko = futures[future]
+            try:
+                path_output, durasi, date_range_str, catatan_tahap, pesan_peringatan, pesan_info = future.result()
+                # Run log ditulis dari proses utama saja, worker tidak berebut file yang sama
+                main.simpan_run_log(catatan_tahap, marketplace, toko, date_range_str, sumber='cli')
+                status = "⚠️" if pesan_peringatan else "✅"
+                print(f"[{selesai}/{len(tugas)}] {status} {marketplace} - {toko}: {os.path.basename(path_output)} ({durasi:.1f} dtk)")
+                for teks in pesan_info:
+                    print(f"      ℹ️ {teks}")
+                for teks in pesan_peringatan:
+                    print(f"      ⚠️ {teks}")
+                if pesan_peringatan:
+                    ada_peringatan.append((marketplace, toko))
+            except Exception as e:
+                gagal.append((marketplace, toko, e))
+                print(f"[{selesai}/{len(tugas)}] ❌ {marketplace} - {toko}: {e}")
+
+    print(f"\nSelesai dalam {time.perf_counter() - mulai:.1f} dtk: {len(tugas) - len(gagal)} berhasil, "
+          f"{len(gagal)} gagal, {len(ada_peringatan)} dengan peringatan, {len(dilewati)} dilewati. Output: {folder_output}")
+    for marketplace, toko, alasan in dilewati:
+        print(f"  - dilewati {marketplace} - {toko}: {alasan}")
+    if gagal:
+        return 1
+    return 2 if ada_peringatan else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())